@@ -16,5 +16,52 @@ ENCRYPTION_KEY = os.getenv(
     "ENCRYPTION_KEY"
 )  # Генерируется один раз и хранится в безопасности
 
+# Прежние ключи шифрования через запятую: нужны только для расшифровки
+# при смене ключа (см. extra_scripts/rotate_encryption_key.py)
+ENCRYPTION_OLD_KEYS = [
+    key for key in os.getenv("ENCRYPTION_OLD_KEYS", "").split(",") if key
+]
+
 # Настройки логирования
 LOGGING_LEVEL = os.getenv("LOGGING_LEVEL", "DEBUG")
+
+# Версия VK API для асинхронного клиента
+VK_API_VERSION = os.getenv("VK_API_VERSION", "5.131")
+
+# Время ожидания ответа long poll сервера (в секундах)
+LONGPOLL_WAIT = int(os.getenv("LONGPOLL_WAIT", "25"))
+
+# Максимальное число одновременных HTTP-соединений в общем пуле
+HTTP_POOL_SIZE = int(os.getenv("HTTP_POOL_SIZE", "100"))
+
+# Обработка событий: число воркеров, длина очереди одного воркера
+# и политика переполнения (block / drop_oldest / shed)
+EVENT_WORKERS = int(os.getenv("EVENT_WORKERS", "8"))
+EVENT_QUEUE_SIZE = int(os.getenv("EVENT_QUEUE_SIZE", "1000"))
+EVENT_OVERFLOW_POLICY = os.getenv("EVENT_OVERFLOW_POLICY", "block")
+
+# Лимит запросов к VK API от имени группы (запросов в секунду)
+SEND_RATE_LIMIT = float(os.getenv("SEND_RATE_LIMIT", "20"))
+
+# Количество потоков-читателей на одну базу SQLite
+DB_READERS = int(os.getenv("DB_READERS", "4"))
+
+# Кэш расшифрованных токенов авто бафа: максимум записей и время жизни (в секундах)
+CREDENTIAL_CACHE_SIZE = int(os.getenv("CREDENTIAL_CACHE_SIZE", "1000"))
+CREDENTIAL_CACHE_TTL = int(os.getenv("CREDENTIAL_CACHE_TTL", "600"))
+
+# Пакетная запись новых пользователей: не реже чем раз в USER_FLUSH_INTERVAL_MS миллисекунд
+# или сразу при накоплении USER_FLUSH_ROWS пользователей
+USER_FLUSH_INTERVAL_MS = int(os.getenv("USER_FLUSH_INTERVAL_MS", "500"))
+USER_FLUSH_ROWS = int(os.getenv("USER_FLUSH_ROWS", "100"))
+
+# История профилей: сколько дней хранить все снимки, после этого — один снимок в день,
+# и сколько дней хранить историю вообще
+PROFILE_HISTORY_FULL_DAYS = int(os.getenv("PROFILE_HISTORY_FULL_DAYS", "7"))
+PROFILE_HISTORY_DAYS = int(os.getenv("PROFILE_HISTORY_DAYS", "365"))
+
+# Кэш заметок: для скольких чатов держать все заметки в памяти (вытесняются давно не использованные)
+NOTE_CACHE_CHATS = int(os.getenv("NOTE_CACHE_CHATS", "200"))
+
+# Сколько названий заметок показывать на одной странице списка
+NOTES_PAGE_SIZE = int(os.getenv("NOTES_PAGE_SIZE", "50"))
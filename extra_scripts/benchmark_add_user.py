@@ -0,0 +1,78 @@
+# benchmark_add_user.py
+# Пропускная способность UserManager.add_user на таблице из 100 000 пользователей:
+# прежний INSERT OR IGNORE с коммитом на каждое сообщение против кэша
+# известных пользователей с пакетной записью новых.
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from services.database import close_databases
+from services.user_manager import UserManager
+
+TABLE_USERS = 100_000
+MESSAGES = 20_000
+# Доля сообщений от пользователей, которых ещё нет в базе
+NEW_USER_SHARE = 0.01
+SEED = 42
+
+
+def make_stream(rng):
+    stream = []
+    next_new_id = TABLE_USERS + 1
+    for _ in range(MESSAGES):
+        if rng.random() < NEW_USER_SHARE:
+            stream.append(next_new_id)
+            next_new_id += 1
+        else:
+            stream.append(rng.randint(1, TABLE_USERS))
+    return stream
+
+
+def fill_users(user_manager):
+    user_manager.db.write_sync(
+        lambda conn: conn.executemany(
+            "INSERT OR IGNORE INTO users (user_id) VALUES (?)",
+            ((user_id,) for user_id in range(1, TABLE_USERS + 1)),
+        )
+    )
+
+
+async def add_user_per_message(user_manager, user_id):
+    """
+    Прежняя реализация add_user: запрос и коммит на каждое сообщение.
+    """
+    await user_manager.db.execute(
+        "INSERT OR IGNORE INTO users (user_id, role_name) VALUES (?, ?)",
+        (user_id, "user"),
+    )
+
+
+async def run(label, db_path, stream, add_user):
+    user_manager = UserManager(db_path=db_path)
+    start = time.perf_counter()
+    for user_id in stream:
+        await add_user(user_manager, user_id)
+    await user_manager.flush_users()
+    elapsed = time.perf_counter() - start
+    count = (await user_manager.db.fetchone("SELECT COUNT(*) FROM users"))[0]
+    print(f"{label:<28} {len(stream) / elapsed:>12.0f} сообщений/с, пользователей в базе: {count}")
+
+
+async def main():
+    rng = random.Random(SEED)
+    stream = make_stream(rng)
+    with tempfile.TemporaryDirectory() as directory:
+        for label, add_user in (
+            ("INSERT + COMMIT на сообщение", add_user_per_message),
+            ("кэш в памяти + пакетная запись", UserManager.add_user),
+        ):
+            db_path = os.path.join(directory, f"users_{add_user.__name__}.db")
+            fill_users(UserManager(db_path=db_path))
+            await run(label, db_path, stream, add_user)
+        close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,116 @@
+# benchmark_buff_assigner.py
+# Сравнение назначения апо паросочетанием (assign_buffs) с прежним жадным
+# способом на синтетических составах из 10–500 баферов.
+
+import itertools
+import random
+import time
+from modules.auto_buff import APO_BUFFS_MAPPING
+from modules.buff_assigner import assign_buffs
+from utils.buff_letters import buff_mask
+
+LETTERS = "".join(APO_BUFFS_MAPPING)
+# Частые бафы есть почти у всех, расовые — у немногих
+COMMON_LETTERS = "азу"
+ROSTER_SIZES = (10, 50, 100, 500)
+REQUESTS = 2000
+SEED = 42
+
+
+def make_roster(rng, size):
+    # Каждый расовый баф есть в среднем у трёх баферов независимо от размера состава,
+    # универсальные баферы (несколько расовых бафов) встречаются в начале списка чаще
+    users = []
+    for user_id in range(1, size + 1):
+        buffs = {letter for letter in COMMON_LETTERS if rng.random() < 0.5}
+        rare_chance = min(1.0, 3 / size * (3 if user_id <= size // 5 else 0.5))
+        buffs.update(letter for letter in LETTERS[3:] if rng.random() < rare_chance)
+        buff_list = "".join(sorted(buffs))
+        users.append({"user_id": user_id, "buff_list": buff_list, "buff_mask": buff_mask(buff_list)})
+    cooldowns_left = {
+        user["user_id"]: rng.choice((0, 0, rng.uniform(1, 60))) for user in users
+    }
+    return users, cooldowns_left
+
+
+def make_request(rng):
+    letters = rng.sample(LETTERS[3:], rng.randint(1, 3))
+    letters += rng.sample(COMMON_LETTERS, rng.randint(0, 4 - len(letters)))
+    # Тот же порядок, что в handle_apo_buff_request: а, з, у — в конце
+    rng.shuffle(letters)
+    letters.sort(key=lambda letter: letter in COMMON_LETTERS)
+    return "".join(letters)
+
+
+def assign_greedy(letters, users, cooldowns_left):
+    """
+    Прежний алгоритм handle_apo_buff_request: каждая буква достаётся первому
+    свободному баферу, у которого она есть.
+    """
+    busy = set()
+    result = []
+    for letter in letters:
+        chosen = None
+        for user in users:
+            if letter not in user["buff_list"] or user["user_id"] in busy:
+                continue
+            if cooldowns_left[user["user_id"]] <= 0:
+                chosen = user
+                busy.add(user["user_id"])
+                break
+        result.append(chosen)
+    return result
+
+
+def served_now(assignment, cooldowns_left):
+    return sum(
+        1 for user in assignment if user is not None and cooldowns_left[user["user_id"]] <= 0
+    )
+
+
+def best_possible(letters, users, cooldowns_left):
+    """
+    Полный перебор для проверки оптимальности на небольших составах.
+    """
+    ready = [user for user in users if cooldowns_left[user["user_id"]] <= 0]
+    best = 0
+    for size in range(len(letters), 0, -1):
+        for chosen in itertools.permutations(ready, size):
+            for positions in itertools.combinations(range(len(letters)), size):
+                if all(letters[p] in u["buff_list"] for p, u in zip(positions, chosen)):
+                    return size
+    return best
+
+
+def main():
+    rng = random.Random(SEED)
+
+    # Проверка оптимальности на маленьких составах
+    for _ in range(200):
+        users, cooldowns_left = make_roster(rng, 6)
+        letters = make_request(rng)
+        assignment = assign_buffs(letters, users, cooldowns_left)
+        assert served_now(assignment, cooldowns_left) == best_possible(letters, users, cooldowns_left)
+        assert assignment == assign_buffs(letters, users, cooldowns_left)
+        ids = [user["user_id"] for user in assignment if user]
+        assert len(ids) == len(set(ids))
+    print("Проверка оптимальности: OK\n")
+
+    print(f"{'баферов':>8} {'жадно выдано':>13} {'паросоч. выдано':>16} {'жадно, мкс':>11} {'паросоч., мкс':>14}")
+    for size in ROSTER_SIZES:
+        users, cooldowns_left = make_roster(rng, size)
+        requests = [make_request(rng) for _ in range(REQUESTS)]
+
+        start = time.perf_counter()
+        greedy = sum(served_now(assign_greedy(r, users, cooldowns_left), cooldowns_left) for r in requests)
+        greedy_time = (time.perf_counter() - start) / REQUESTS * 1e6
+
+        start = time.perf_counter()
+        matching = sum(served_now(assign_buffs(r, users, cooldowns_left), cooldowns_left) for r in requests)
+        matching_time = (time.perf_counter() - start) / REQUESTS * 1e6
+
+        print(f"{size:>8} {greedy:>13} {matching:>16} {greedy_time:>11.1f} {matching_time:>14.1f}")
+
+
+if __name__ == "__main__":
+    main()
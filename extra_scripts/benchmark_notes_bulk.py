@@ -0,0 +1,72 @@
+# benchmark_notes_bulk.py
+# Пропускная способность импорта и выгрузки 1 000 000 заметок:
+# прежний импорт по одной заметке через NoteManager.add_note (замер на части данных)
+# против пакетного импорта частями в одной транзакции (с обновлением поискового
+# индекса триггерами и с перестроением индекса после импорта), потоковая выгрузка
+# и копирование чата одним INSERT ... SELECT.
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from services.database import close_databases
+from modules.notes import NoteManager
+
+NOTES = 1_000_000
+# Сколько заметок импортировать прежним способом (дальше — оценка по скорости)
+ADD_NOTE_SAMPLE = 5_000
+CHATS = 1000
+SEED = 42
+
+
+def make_notes(rng):
+    for i in range(NOTES):
+        yield 2000000000 + rng.randrange(CHATS), f"Заметка {i}", f"Текст заметки номер {i} " * 5
+
+
+def report(label, count, elapsed):
+    print(f"{label:<36} {count:>9} заметок за {elapsed:7.1f} с, {count / elapsed:>9.0f} заметок/с")
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        note_manager = NoteManager(db_path=os.path.join(directory, "add_note.db"))
+        notes = make_notes(random.Random(SEED))
+        start = time.perf_counter()
+        for _ in range(ADD_NOTE_SAMPLE):
+            peer_id, keyword, text = next(notes)
+            await note_manager.add_note(keyword, text, peer_id)
+        elapsed = time.perf_counter() - start
+        report("add_note по одной", ADD_NOTE_SAMPLE, elapsed)
+        print(f"{'':<36} оценка для {NOTES} заметок: {elapsed * NOTES / ADD_NOTE_SAMPLE / 60:.0f} мин")
+
+        for label, defer_search_index in (
+            ("bulk_import_notes", False),
+            ("bulk_import_notes + перестроение FTS", True),
+        ):
+            note_manager = NoteManager(db_path=os.path.join(directory, f"bulk_{int(defer_search_index)}.db"))
+            start = time.perf_counter()
+            imported = await note_manager.bulk_import_notes(
+                make_notes(random.Random(SEED)), defer_search_index=defer_search_index
+            )
+            report(label, imported, time.perf_counter() - start)
+
+        start = time.perf_counter()
+        exported = 0
+        async for _ in note_manager.export_notes():
+            exported += 1
+        report("export_notes", exported, time.perf_counter() - start)
+
+        # Самый большой чат копируется в новый
+        peer_id, count = await note_manager.db.fetchone(
+            "SELECT peer_id, COUNT(*) AS notes FROM notes GROUP BY peer_id ORDER BY notes DESC LIMIT 1"
+        )
+        start = time.perf_counter()
+        copied = await note_manager.import_notes(peer_id, 2000000000 + CHATS)
+        report("import_notes (INSERT ... SELECT)", copied, time.perf_counter() - start)
+        close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
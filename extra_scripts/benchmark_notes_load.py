@@ -0,0 +1,110 @@
+# benchmark_notes_load.py
+# Задержка команды "заметка X" при смешанной нагрузке чтения и записи из 500 чатов:
+# прежняя глобальная блокировка NoteManager (все операции по одной) против
+# параллельных читателей и одного писателя базы. Замер делается без кэша заметок
+# (каждое чтение идёт в базу) и с кэшем на все чаты.
+
+import asyncio
+import os
+import random
+import tempfile
+import time
+from services.database import close_databases
+from modules.notes import NoteManager
+
+CHATS = 500
+NOTES_PER_CHAT = 50
+MESSAGES_PER_CHAT = 40
+# Доля сообщений, создающих или обновляющих заметку
+WRITE_SHARE = 0.1
+SEED = 42
+
+
+class LockedDatabase:
+    """
+    Обёртка базы, повторяющая прежнее поведение NoteManager:
+    каждое чтение и запись выполняются под одной общей блокировкой.
+    """
+
+    def __init__(self, db):
+        self.db = db
+        self.lock = asyncio.Lock()
+
+    async def read(self, fn, *args):
+        async with self.lock:
+            return await self.db.read(fn, *args)
+
+    async def write(self, fn, *args):
+        async with self.lock:
+            return await self.db.write(fn, *args)
+
+
+def fill_notes(note_manager):
+    note_manager.db.write_sync(
+        lambda conn: conn.executemany(
+            "INSERT INTO notes (peer_id, keyword, keyword_norm, text) VALUES (?, ?, ?, ?)",
+            (
+                (2000000000 + chat, f"Заметка{i}", f"заметка{i}", f"Текст заметки {i} " * 20)
+                for chat in range(CHATS)
+                for i in range(NOTES_PER_CHAT)
+            ),
+        )
+    )
+
+
+async def chat_traffic(note_manager, peer_id, rng, read_latencies, write_latencies):
+    for _ in range(MESSAGES_PER_CHAT):
+        await asyncio.sleep(rng.random() * 0.01)
+        note = rng.randrange(NOTES_PER_CHAT * 2)
+        if rng.random() < WRITE_SHARE:
+            text, latencies = f"новая заметка Заметка{note} обновлённый текст", write_latencies
+        else:
+            text, latencies = f"заметка Заметка{note}", read_latencies
+        start = time.perf_counter()
+        await note_manager.check_note_events({"text": text, "peer_id": peer_id})
+        latencies.append(time.perf_counter() - start)
+
+
+def percentile(values, share):
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * share))] * 1000
+
+
+async def run(label, db_path, locked, cache_chats):
+    note_manager = NoteManager(db_path=db_path, cache_chats=cache_chats)
+    if locked:
+        note_manager.db = LockedDatabase(note_manager.db)
+    rng = random.Random(SEED)
+    read_latencies, write_latencies = [], []
+    start = time.perf_counter()
+    await asyncio.gather(
+        *(
+            chat_traffic(note_manager, 2000000000 + chat, random.Random(rng.random()), read_latencies, write_latencies)
+            for chat in range(CHATS)
+        )
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"{label:<32} чтение p50 {percentile(read_latencies, 0.5):7.2f} мс, "
+        f"p99 {percentile(read_latencies, 0.99):7.2f} мс; "
+        f"запись p99 {percentile(write_latencies, 0.99):7.2f} мс; "
+        f"{(len(read_latencies) + len(write_latencies)) / elapsed:8.0f} сообщений/с"
+    )
+
+
+async def main():
+    with tempfile.TemporaryDirectory() as directory:
+        for cache_chats in (0, CHATS):
+            print(f"Кэш заметок на {cache_chats} чатов:")
+            for label, locked in (
+                ("глобальная блокировка (прежняя)", True),
+                ("параллельные читатели", False),
+            ):
+                db_path = os.path.join(directory, f"notes_{cache_chats}_{int(locked)}.db")
+                fill_notes(NoteManager(db_path=db_path))
+                await run(label, db_path, locked, cache_chats)
+        close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,107 @@
+# benchmark_notes_search.py
+# Поиск заметок на базе из 100 000 заметок в 20 чатах: полнотекстовый индекс FTS5
+# (NoteManager.search_notes) против прежнего способа — LIKE '%запрос%' по тексту.
+
+import asyncio
+import itertools
+import os
+import random
+import tempfile
+import time
+from services.database import close_databases
+from modules.notes import NoteManager
+
+NOTES = 100_000
+CHATS = 20
+QUERIES = 200
+SEED = 42
+# Словарь из VOCABULARY слов с частотами по закону Ципфа, как в живых текстах
+VOCABULARY = 20_000
+SYLLABLES = "ка ро ми ла ту не зо бра дра ги ве сто лю ша пе кри мо да ры жу".split()
+
+
+def make_vocabulary(rng):
+    words = set()
+    while len(words) < VOCABULARY:
+        words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))))
+    return sorted(words)
+
+
+def make_text(rng, words, cum_weights, size):
+    return " ".join(rng.choices(words, cum_weights=cum_weights, k=size))
+
+
+def make_notes(rng, words, cum_weights):
+    rows = []
+    for i in range(NOTES):
+        keyword = f"{rng.choice(words)}{i}"
+        rows.append((2000000000 + rng.randrange(CHATS), keyword, keyword.casefold(), make_text(rng, words, cum_weights, 60)))
+    return rows
+
+
+def fill_notes(note_manager, rows):
+    note_manager.db.write_sync(
+        lambda conn: conn.executemany(
+            "INSERT INTO notes (peer_id, keyword, keyword_norm, text) VALUES (?, ?, ?, ?)", rows
+        )
+    )
+
+
+def search_like(conn, query, peer_id, limit):
+    """
+    Поиск без индекса: полный просмотр заметок чата с LIKE по каждому слову.
+    """
+    words = query.split()
+    where = " AND ".join("(keyword LIKE ? OR text LIKE ?)" for _ in words)
+    params = [pattern for word in words for pattern in (f"%{word}%", f"%{word}%")]
+    return conn.execute(
+        f"SELECT keyword, text FROM notes WHERE peer_id = ? AND {where} LIMIT ?",
+        (peer_id, *params, limit),
+    ).fetchall()
+
+
+def report(label, latencies):
+    latencies = sorted(latencies)
+    p50 = latencies[len(latencies) // 2] * 1000
+    p99 = latencies[int(len(latencies) * 0.99)] * 1000
+    print(f"{label:<18} p50 {p50:8.3f} мс, p99 {p99:8.3f} мс")
+
+
+async def main():
+    rng = random.Random(SEED)
+    words = make_vocabulary(rng)
+    cum_weights = list(itertools.accumulate(1 / rank for rank in range(1, VOCABULARY + 1)))
+    # Запросы из одного-двух слов средней частоты
+    queries = [
+        (" ".join(rng.sample(words[100:5000], rng.randint(1, 2))), 2000000000 + rng.randrange(CHATS))
+        for _ in range(QUERIES)
+    ]
+    with tempfile.TemporaryDirectory() as directory:
+        note_manager = NoteManager(db_path=os.path.join(directory, "notes.db"))
+        rows = make_notes(rng, words, cum_weights)
+        start = time.perf_counter()
+        fill_notes(note_manager, rows)
+        print(f"Заполнение {NOTES} заметок (с индексом): {time.perf_counter() - start:.1f} с")
+
+        latencies = []
+        for query, peer_id in queries:
+            start = time.perf_counter()
+            note_manager.db.read_sync(search_like, query, peer_id, 10)
+            latencies.append(time.perf_counter() - start)
+        report("LIKE '%запрос%'", latencies)
+
+        latencies = []
+        for query, peer_id in queries:
+            start = time.perf_counter()
+            await note_manager.search_notes(query, peer_id)
+            latencies.append(time.perf_counter() - start)
+        report("FTS5 + bm25", latencies)
+
+        start = time.perf_counter()
+        await note_manager.rebuild_search_index()
+        print(f"Перестроение индекса: {time.perf_counter() - start:.1f} с")
+        close_databases()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
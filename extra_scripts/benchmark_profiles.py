@@ -0,0 +1,98 @@
+# benchmark_profiles.py
+# Сравнение прежнего разбора профиля (семь регулярных выражений, компиляция
+# на каждый вызов) с однопроходным ProfileManager.parse_profile.
+
+import re
+import time
+from modules.profiles import ProfileManager
+
+ITERATIONS = 20_000
+
+# Профили игрового бота и обычные сообщения чата
+PROFILES = [
+    "👑[id620722769|Михаил], Ваш профиль:\n"
+    "👤Класс: апостол (66), гоблин-гном\n"
+    "👥Гильдия: Сердце Дракона⭐\n"
+    "😇Очень положительная карма\n"
+    "💀Уровень: 669\n"
+    "🎉Достижений: 71\n"
+    "👊1950 🖐1693 ❤2040 🍀124 🗡1190 🛡710",
+    "👑[id620722769|Михаил], Ваш профиль:\n"
+    "👤Класс: апостол (66), гоблин-гном\n"
+    "👥Гильдия: Сердце Дракона⭐\n"
+    "😇Очень положительная карма\n"
+    "💀Уровень: 670\n"
+    "🎉Достижений: 72\n"
+    "👊2000 🖐1700 ❤2050 🍀130 🗡1200 🛡720",
+    "[id1234567|Анна], Ваш профиль:\n"
+    "👤Класс: паладин (12), эльф-человек\n"
+    "👥Гильдия: Северный Ветер\n"
+    "😐Нейтральная карма\n"
+    "💀Уровень: 154\n"
+    "🎉Достижений: 18\n"
+    "👊310 🖐285 ❤402 🍀35 🗡260 🛡198",
+    "👑[id98765|Ворон], Ваш профиль:\n"
+    "👤Класс: некромант (40), нежить\n"
+    "💀Уровень: 412\n"
+    "👊1020 🖐980 ❤1133 🍀77 🗡840 🛡512",
+]
+# Профиль с другим порядком характеристик (запасной разбор)
+PROFILES.append(
+    "[id555|Тест], Ваш профиль:\n💀Уровень: 10\n🍀5 👊20 🖐15 ❤30 🛡8 🗡12"
+)
+CHATTER = [
+    "[id620722769|Михаил], на вас наложено благословение атаки!",
+    "[id1234567|Анна], вы получили 15 золота",
+    "Привет! Как дела?",
+    "👊 Атака: ваш удар нанёс 120 урона",
+]
+CORPUS = PROFILES + CHATTER
+
+
+def parse_old(text):
+    """
+    Прежний разбор из check_profile_events.
+    """
+    user_id_match = re.search(r'\[id(\d+)\|', text)
+    if not user_id_match:
+        return None
+    patterns = {
+        "level": re.compile(r'💀Уровень:\s*(\d+)'),
+        "strength": re.compile(r'👊(\d+)'),
+        "agility": re.compile(r'🖐(\d+)'),
+        "endurance": re.compile(r'❤(\d+)'),
+        "attack": re.compile(r'🗡(\d+)'),
+        "defense": re.compile(r'🛡(\d+)'),
+        "luck": re.compile(r'🍀(\d+)'),
+    }
+    profile = {"user_id": int(user_id_match.group(1))}
+    for stat, pattern in patterns.items():
+        match = pattern.search(text)
+        if not match:
+            return None
+        profile[stat] = int(match.group(1))
+    return profile
+
+
+def bench(label, parse, corpus):
+    start = time.perf_counter()
+    for _ in range(ITERATIONS):
+        for text in corpus:
+            parse(text)
+    elapsed = time.perf_counter() - start
+    per_message = elapsed / (ITERATIONS * len(corpus)) * 1e6
+    print(f"{label:<20} {per_message:>8.2f} мкс/сообщение")
+
+
+def main():
+    for text in CORPUS:
+        assert parse_old(text) == ProfileManager.parse_profile(text), text
+    print("Результаты разбора совпадают\n")
+    for corpus_label, corpus in (("профили и сообщения чата", CORPUS), ("только профили", PROFILES)):
+        print(corpus_label)
+        bench("  прежний разбор", parse_old, corpus)
+        bench("  parse_profile", ProfileManager.parse_profile, corpus)
+
+
+if __name__ == "__main__":
+    main()
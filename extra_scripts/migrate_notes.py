@@ -1,92 +1,207 @@
+import argparse
 import asyncio
 import json
 import os
-import sys
-from typing import Optional
+import time
+from typing import Iterator, Optional, Tuple
 from modules.notes import NoteManager
+from services.database import close_databases
+
+# peer_id беседы = номер чата + 2000000000 (в старом JSON ключи — номера чатов)
+PEER_ID_OFFSET = 2000000000
 
-async def migrate_notes(json_path: str, db_path: str):
-    """
-    Миграция заметок из JSON в SQLite базу данных.
 
-    :param json_path: Путь к файлу notes.json.
-    :param db_path: Путь к новой базе данных SQLite.
+class ImportStats:
+    """
+    Счётчики импорта для итогового отчёта.
     """
-    # Проверка существования файла JSON
-    if not os.path.exists(json_path):
-        print(f"Файл {json_path} не найден.")
-        return
 
-    # Чтение данных из notes.json
-    try:
-        with open(json_path, 'r', encoding='utf-8') as f:
-            all_notes = json.load(f)
-    except json.JSONDecodeError as e:
-        print(f"Ошибка декодирования JSON: {e}")
-        return
-    except Exception as e:
-        print(f"Ошибка чтения файла {json_path}: {e}")
-        return
+    def __init__(self):
+        self.total = 0
+        self.skipped = 0
 
-    # Инициализация NoteManager
-    note_manager = NoteManager(db_path=db_path)
-    # self.lock is already initialized, _create_table was called in __init__
 
-    # Счётчики для отчёта
-    total_notes = 0
-    added_notes = 0
-    updated_notes = 0
-    skipped_notes = 0
+def read_legacy_json(json_path: str, stats: ImportStats) -> Iterator[Tuple[int, str, str]]:
+    """
+    Чтение заметок из старого JSON: {"номер чата": [{"keyword": ..., "text": ...}, ...]}.
+    """
+    with open(json_path, 'r', encoding='utf-8') as f:
+        all_notes = json.load(f)
 
-    # Проход по всем чатам и заметкам
     for peer_id_str, notes in all_notes.items():
         try:
-            peer_id = int(peer_id_str) + 2000000000
+            peer_id = int(peer_id_str) + PEER_ID_OFFSET
         except ValueError:
             print(f"Некорректный peer_id: {peer_id_str}. Пропуск.")
-            skipped_notes += len(notes) if isinstance(notes, list) else 1
+            skipped = len(notes) if isinstance(notes, list) else 1
+            stats.total += skipped
+            stats.skipped += skipped
             continue
 
         if not isinstance(notes, list):
             print(f"Некорректный формат заметок для peer_id {peer_id}. Ожидался список. Пропуск.")
-            skipped_notes += len(notes) if isinstance(notes, list) else 1
+            stats.total += 1
+            stats.skipped += 1
             continue
 
         for note in notes:
-            total_notes += 1
-            keyword = note.get("keyword")
-            text = note.get("text")
+            yield from check_note(peer_id, note, stats)
+
 
-            if not keyword or not text:
-                print(f"Некорректная заметка в peer_id {peer_id}: {note}. Пропуск.")
-                skipped_notes += 1
+def read_ndjson(ndjson_path: str, stats: ImportStats) -> Iterator[Tuple[int, str, str]]:
+    """
+    Потоковое чтение заметок из NDJSON: по объекту {"peer_id", "keyword", "text"} на строку.
+    """
+    with open(ndjson_path, 'r', encoding='utf-8') as f:
+        for line_number, line in enumerate(f, start=1):
+            if not line.strip():
                 continue
+            try:
+                note = json.loads(line)
+                peer_id = int(note["peer_id"])
+            except (ValueError, KeyError, TypeError) as e:
+                print(f"Некорректная строка {line_number}: {e}. Пропуск.")
+                stats.total += 1
+                stats.skipped += 1
+                continue
+            yield from check_note(peer_id, note, stats)
 
-            # Добавление или обновление заметки
-            updated = await note_manager.add_note(keyword, text, peer_id)
-            if updated:
-                updated_notes += 1
-                print(f"Обновлена заметка '{keyword}' в peer_id {peer_id}.")
-            else:
-                added_notes += 1
-                print(f"Добавлена новая заметка '{keyword}' в peer_id {peer_id}.")
+
+def check_note(peer_id: int, note, stats: ImportStats) -> Iterator[Tuple[int, str, str]]:
+    stats.total += 1
+    keyword = note.get("keyword") if isinstance(note, dict) else None
+    text = note.get("text") if isinstance(note, dict) else None
+    if not keyword or not text:
+        print(f"Некорректная заметка в peer_id {peer_id}: {note}. Пропуск.")
+        stats.skipped += 1
+        return
+    yield peer_id, keyword, text
+
+
+def print_progress(start: float):
+    def progress(done: int):
+        elapsed = time.perf_counter() - start
+        print(f"\rЗаписано заметок: {done} ({done / elapsed:.0f}/с)", end="", flush=True)
+    return progress
+
+
+async def import_notes(path: str, db_path: str):
+    """
+    Пакетный импорт заметок из старого JSON (*.json) или NDJSON (остальные файлы).
+
+    :param path: Путь к файлу с заметками.
+    :param db_path: Путь к базе данных SQLite.
+    """
+    # Проверка существования файла
+    if not os.path.exists(path):
+        print(f"Файл {path} не найден.")
+        return
+
+    note_manager = NoteManager(db_path=db_path)
+    stats = ImportStats()
+    reader = read_legacy_json if path.endswith(".json") else read_ndjson
+    start = time.perf_counter()
+    try:
+        written = await note_manager.bulk_import_notes(
+            reader(path, stats),
+            progress=print_progress(start),
+            defer_search_index=True,
+        )
+    except json.JSONDecodeError as e:
+        print(f"Ошибка декодирования JSON: {e}")
+        return
+    elapsed = time.perf_counter() - start
 
     # Итоговый отчёт
-    print("\nМиграция завершена.")
-    print(f"Всего заметок в JSON: {total_notes}")
-    print(f"Добавлено новых заметок: {added_notes}")
-    print(f"Обновлено существующих заметок: {updated_notes}")
-    print(f"Пропущено некорректных заметок: {skipped_notes}")
+    print("\nИмпорт завершён.")
+    print(f"Всего заметок в файле: {stats.total}")
+    print(f"Добавлено или обновлено заметок: {written}")
+    print(f"Пропущено некорректных заметок: {stats.skipped}")
+    print(f"Время: {elapsed:.1f} с ({written / elapsed if elapsed else 0:.0f} заметок/с)")
 
-if __name__ == "__main__":
-    # Путь к старой JSON-базе
-    json_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'notes.json')
-    
-    # Путь к новой SQLite-базе
-    db_file_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'notes.db')
+
+async def export_notes(path: str, db_path: str, peer_id: Optional[int] = None):
+    """
+    Потоковая выгрузка заметок в старый JSON (*.json) или NDJSON (остальные файлы).
+
+    :param path: Путь к файлу для выгрузки.
+    :param db_path: Путь к базе данных SQLite.
+    :param peer_id: Выгрузить только заметки этого чата.
+    """
+    note_manager = NoteManager(db_path=db_path)
+    legacy = path.endswith(".json")
+    progress = print_progress(time.perf_counter())
+    exported = 0
+    with open(path, 'w', encoding='utf-8') as f:
+        current_peer_id = None
+        if legacy:
+            f.write("{")
+        async for note_peer_id, keyword, text in note_manager.export_notes(peer_id):
+            if legacy:
+                # Заметки приходят сгруппированными по чату: открываем список при смене чата
+                if note_peer_id != current_peer_id:
+                    if current_peer_id is not None:
+                        f.write("],")
+                    f.write(f'{json.dumps(str(note_peer_id - PEER_ID_OFFSET))}:[')
+                    current_peer_id = note_peer_id
+                else:
+                    f.write(",")
+                f.write(json.dumps({"keyword": keyword, "text": text}, ensure_ascii=False))
+            else:
+                f.write(json.dumps({"peer_id": note_peer_id, "keyword": keyword, "text": text}, ensure_ascii=False))
+                f.write("\n")
+            exported += 1
+            if exported % 10000 == 0:
+                progress(exported)
+        if legacy:
+            f.write("]}" if current_peer_id is not None else "}")
+    print(f"\nВыгружено заметок: {exported} в {path}")
+
+
+async def copy_notes(from_chat: int, to_chat: int, db_path: str):
+    """
+    Копирование заметок между чатами одним INSERT ... SELECT.
+
+    :param from_chat: Номер исходного чата (без префикса 2000000000).
+    :param to_chat: Номер целевого чата (без префикса 2000000000).
+    :param db_path: Путь к базе данных SQLite.
+    """
+    note_manager = NoteManager(db_path=db_path)
+    copied = await note_manager.import_notes(from_chat + PEER_ID_OFFSET, to_chat + PEER_ID_OFFSET)
+    print(f"Скопировано заметок: {copied} из чата {from_chat} в чат {to_chat}.")
+
+
+async def main():
+    script_dir = os.path.dirname(os.path.abspath(__file__))
+    parser = argparse.ArgumentParser(description="Пакетный импорт, выгрузка и копирование заметок.")
+    parser.add_argument("--db", default=os.path.join(script_dir, 'data', 'notes.db'), help="Путь к базе заметок")
+    commands = parser.add_subparsers(dest="command")
+    import_parser = commands.add_parser("import", help="Импорт из старого JSON (*.json) или NDJSON")
+    import_parser.add_argument("path")
+    export_parser = commands.add_parser("export", help="Выгрузка в старый JSON (*.json) или NDJSON")
+    export_parser.add_argument("path")
+    export_parser.add_argument("--chat", type=int, help="Номер чата (без префикса 2000000000)")
+    copy_parser = commands.add_parser("copy", help="Копирование заметок из чата в чат")
+    copy_parser.add_argument("from_chat", type=int)
+    copy_parser.add_argument("to_chat", type=int)
+    args = parser.parse_args()
 
     # Создание директории для базы данных, если не существует
-    os.makedirs(os.path.dirname(db_file_path), exist_ok=True)
+    os.makedirs(os.path.dirname(args.db) or ".", exist_ok=True)
+
+    try:
+        if args.command == "export":
+            peer_id = args.chat + PEER_ID_OFFSET if args.chat is not None else None
+            await export_notes(args.path, args.db, peer_id)
+        elif args.command == "copy":
+            await copy_notes(args.from_chat, args.to_chat, args.db)
+        else:
+            # Без команды — миграция notes.json рядом со скриптом, как раньше
+            path = args.path if args.command == "import" else os.path.join(script_dir, 'notes.json')
+            await import_notes(path, args.db)
+    finally:
+        close_databases()
+
 
-    # Запуск миграции
-    asyncio.run(migrate_notes(json_file_path, db_file_path))
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,24 @@
+import asyncio
+from services.user_manager import UserManager
+from services.database import close_databases
+
+
+async def main():
+    """
+    Перешифровывает токены авто бафа новым ключом.
+
+    Порядок смены ключа:
+    1. В .env указать новый ENCRYPTION_KEY, а прежний добавить в ENCRYPTION_OLD_KEYS,
+       и перезапустить бота. Ключи читаются только при запуске, поэтому бот со старыми
+       настройками не расшифрует перешифрованные токены, а новые токены сохранит старым ключом.
+    2. Запустить этот скрипт (перезапущенный бот при этом может работать).
+    3. Убрать прежний ключ из ENCRYPTION_OLD_KEYS и снова перезапустить бота.
+    """
+    user_manager = UserManager()
+    total = await user_manager.rotate_auto_buff_tokens()
+    print(f"Перешифровано токенов: {total}")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
+    close_databases()
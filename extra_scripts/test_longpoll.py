@@ -0,0 +1,105 @@
+# test_longpoll.py
+# Проверка AsyncBotLongPoll на локальном поддельном long poll сервере.
+
+import asyncio
+from aiohttp import web
+from vk_api.bot_longpoll import VkBotEventType
+from services.async_vk_api import AsyncVkApi, close_http_session
+from services.longpoll import AsyncBotLongPoll
+
+HOST = "127.0.0.1"
+PORT = 8765
+BASE_URL = f"http://{HOST}:{PORT}"
+
+
+def make_message_event(peer_id, text):
+    return {
+        "type": "message_new",
+        "group_id": 1,
+        "object": {
+            "message": {"peer_id": peer_id, "from_id": 1, "text": text},
+            "client_info": {},
+        },
+    }
+
+
+class FakeLongPollServer:
+    """
+    Поддельный сервер: отдаёт заранее заготовленные ответы по очереди,
+    в конце — пустые ответы с задержкой, как настоящий long poll.
+    """
+
+    def __init__(self):
+        self.key_requests = 0
+        self.check_requests = []  # (key, ts) каждого запроса a_check
+        self.script = [
+            {"ts": "2", "updates": [make_message_event(2000000001, "раз"), make_message_event(2000000002, "два")]},
+            {"failed": 1, "ts": "5"},
+            {"failed": 2},
+            {"ts": "6", "updates": [make_message_event(2000000001, "три")]},
+            {"failed": 3},
+            {"ts": "101", "updates": [make_message_event(2000000003, "четыре")]},
+        ]
+
+    async def get_server(self, request):
+        self.key_requests += 1
+        return web.json_response({
+            "response": {"server": f"{BASE_URL}/lp", "key": f"key{self.key_requests}", "ts": str(100 * self.key_requests)}
+        })
+
+    async def check(self, request):
+        self.check_requests.append((request.query["key"], request.query["ts"]))
+        if self.script:
+            return web.json_response(self.script.pop(0))
+        await asyncio.sleep(float(request.query.get("wait", 1)))
+        return web.json_response({"ts": request.query["ts"], "updates": []})
+
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/method/groups.getLongPollServer", self.get_server)
+        app.router.add_get("/lp", self.check)
+        return app
+
+
+async def test_longpoll():
+    fake = FakeLongPollServer()
+    runner = web.AppRunner(fake.make_app())
+    await runner.setup()
+    await web.TCPSite(runner, HOST, PORT).start()
+
+    api = AsyncVkApi("fake-token", api_url=f"{BASE_URL}/method/")
+    longpoll = AsyncBotLongPoll(api, group_id=1, wait=1)
+
+    received = []
+
+    async def collect():
+        async for event in longpoll.listen():
+            received.append(event)
+            if len(received) == 4:
+                return
+
+    await asyncio.wait_for(collect(), timeout=10)
+    await close_http_session()
+    await runner.cleanup()
+
+    print(f"Получено событий: {[e.obj.message['text'] for e in received]}")
+    print(f"Запросов ключа: {fake.key_requests}")
+    print(f"Запросы a_check (key, ts): {fake.check_requests}")
+
+    assert all(e.type == VkBotEventType.MESSAGE_NEW for e in received)
+    assert [e.obj.message["text"] for e in received] == ["раз", "два", "три", "четыре"]
+    # Первый ключ при старте, второй после failed=2, третий после failed=3
+    assert fake.key_requests == 3
+    assert fake.check_requests == [
+        ("key1", "100"),
+        ("key1", "2"),
+        ("key1", "5"),  # failed=1: тот же ключ, новый ts
+        ("key2", "5"),  # failed=2: новый ключ, ts сохранён
+        ("key2", "6"),
+        ("key3", "300"),  # failed=3: новые ключ и ts
+    ]
+    print("OK")
+
+
+if __name__ == "__main__":
+    asyncio.run(test_longpoll())
@@ -1,7 +1,8 @@
 # test_profiles.py
 
 import asyncio
-from services.user_manager import UserManager
+import time
+from services.user_manager import UserManager, DAY_SECONDS
 from modules.profiles import ProfileManager
 
 async def test_profile_manager():
@@ -71,5 +72,42 @@ async def test_profile_manager():
     response = await profile_manager.check_profile_events(message_non_profile)
     print(f"Ответ на не профильное сообщение:\n{response}\n")  # Должно быть None
 
+async def test_profile_change_window():
+    user_manager = UserManager()
+    user_id = 999000001  # Тестовый пользователь без настоящего профиля
+    now = int(time.time())
+
+    # Профиль прислан 10 дней назад и сегодня: изменение за 7 дней считается
+    # от снимка 10-дневной давности, а не пропадает из-за пустого окна
+    def fill(conn):
+        conn.execute("DELETE FROM profile_history WHERE user_id = ?", (user_id,))
+        conn.executemany(
+            """
+            INSERT INTO profile_history (user_id, ts, strength, agility, endurance, level, attack, defense, luck)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+            [
+                (user_id, now - 10 * DAY_SECONDS, 1950, 1693, 2040, 669, 1190, 710, 124),
+                (user_id, now, 2000, 1700, 2050, 670, 1200, 720, 130),
+            ],
+        )
+
+    await user_manager.db.write(fill)
+    try:
+        change = await user_manager.get_profile_change(user_id, 7)
+        print(f"Изменение за 7 дней при снимках 10 дней назад и сегодня:\n{change}\n")
+        assert change is not None, "Изменение за 7 дней не найдено"
+        assert change["from_ts"] == now - 10 * DAY_SECONDS
+        assert change["strength"] == 50 and change["level"] == 1
+
+        growth = await user_manager.get_profile_growth(user_id, 7)
+        print(f"Прирост в день за 7 дней:\n{growth}\n")
+        assert growth is not None and abs(growth["strength"] - 5) < 1e-9
+    finally:
+        await user_manager.db.write(
+            lambda conn: conn.execute("DELETE FROM profile_history WHERE user_id = ?", (user_id,))
+        )
+
 if __name__ == "__main__":
     asyncio.run(test_profile_manager())
+    asyncio.run(test_profile_change_window())
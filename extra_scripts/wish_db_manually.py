@@ -1,312 +1,286 @@
+import asyncio
 from modules.wishes import WishManager
 
 
-if __name__ == "__main__":
+async def main():
     wish_manager = WishManager()
-    wish_manager.add_item("ошеломление")
-    wish_manager.add_alias("ошеломление", "оше")
-
-    wish_manager.add_item("непоколебимый")
-    wish_manager.add_alias("непоколебимый", "неп")
-
-    wish_manager.add_item("угроза")
-    wish_manager.add_alias("угроза", "угроза")
-
-    wish_manager.add_item("мощный удар")
-    wish_manager.add_alias("мощный удар", "му")
-
-    wish_manager.add_item("кровотечение")
-    wish_manager.add_alias("кровотечение", "кровь")
-
-    wish_manager.add_item("грязный удар")
-    wish_manager.add_alias("грязный удар", "гу")
-
-    wish_manager.add_item("слабое исцеление")
-    wish_manager.add_alias("слабое исцеление", "си")
-
-    wish_manager.add_item("удар вампира")
-    wish_manager.add_alias("удар вампира", "ув")
-
-    wish_manager.add_item("сила теней")
-    wish_manager.add_alias("сила теней", "ст")
-
-    wish_manager.add_item("расправа")
-    wish_manager.add_alias("расправа", "расп")
-
-    wish_manager.add_item("слепота")
-    wish_manager.add_alias("слепота", "слепа")
-
-    wish_manager.add_item("рассечение")
-    wish_manager.add_alias("рассечение", "сеча")
-
-    wish_manager.add_item("берсеркер")
-    wish_manager.add_alias("берсеркер", "берс")
-
-    wish_manager.add_item("таран")
-
-    wish_manager.add_item("проклятие тьмы")
-    wish_manager.add_alias("проклятие тьмы", "пт")
-
-    wish_manager.add_item("огонек надежды")
-    wish_manager.add_alias("огонек надежды", "он")
+    await wish_manager.add_item("ошеломление")
+    await wish_manager.add_alias("ошеломление", "оше")
 
-    wish_manager.add_item("целебный огонь")
-    wish_manager.add_alias("целебный огонь", "цо")
+    await wish_manager.add_item("непоколебимый")
+    await wish_manager.add_alias("непоколебимый", "неп")
 
-    wish_manager.add_item("заражение")
-    wish_manager.add_alias("заражение", "зараза")
+    await wish_manager.add_item("угроза")
+    await wish_manager.add_alias("угроза", "угроза")
 
-    wish_manager.add_item("раскол")
+    await wish_manager.add_item("мощный удар")
+    await wish_manager.add_alias("мощный удар", "му")
 
-    wish_manager.add_item("быстрое восстановление")
-    wish_manager.add_alias("быстрое восстановление", "бв")
+    await wish_manager.add_item("кровотечение")
+    await wish_manager.add_alias("кровотечение", "кровь")
 
-    wish_manager.add_item("мародер")
-    wish_manager.add_alias("мародер", "маро")
+    await wish_manager.add_item("грязный удар")
+    await wish_manager.add_alias("грязный удар", "гу")
 
-    wish_manager.add_item("внимательность")
-    wish_manager.add_alias("внимательность", "вни")
+    await wish_manager.add_item("слабое исцеление")
+    await wish_manager.add_alias("слабое исцеление", "си")
 
-    wish_manager.add_item("инициативность")
-    wish_manager.add_alias("инициативность", "ини")
+    await wish_manager.add_item("удар вампира")
+    await wish_manager.add_alias("удар вампира", "ув")
 
-    wish_manager.add_item("исследователь")
-    wish_manager.add_alias("исследователь", "исс")
+    await wish_manager.add_item("сила теней")
+    await wish_manager.add_alias("сила теней", "ст")
 
-    wish_manager.add_item("ведьмак")
-    wish_manager.add_alias("ведьмак", "вед")
+    await wish_manager.add_item("расправа")
+    await wish_manager.add_alias("расправа", "расп")
 
-    wish_manager.add_item("собиратель")
-    wish_manager.add_alias("собиратель", "соб")
+    await wish_manager.add_item("слепота")
+    await wish_manager.add_alias("слепота", "слепа")
 
-    wish_manager.add_item("запасливость")
-    wish_manager.add_alias("запасливость", "запаска")
+    await wish_manager.add_item("рассечение")
+    await wish_manager.add_alias("рассечение", "сеча")
 
-    wish_manager.add_item("охотник за головами")
-    wish_manager.add_alias("охотник за головами", "охо")
-    wish_manager.add_alias("охотник за головами", "озг")
+    await wish_manager.add_item("берсеркер")
+    await wish_manager.add_alias("берсеркер", "берс")
 
-    wish_manager.add_item("подвижность")
-    wish_manager.add_alias("подвижность", "под")
-    wish_manager.add_alias("подвижность", "подвига")
+    await wish_manager.add_item("таран")
 
-    wish_manager.add_item("упорность")
-    wish_manager.add_alias("упорность", "упо")
+    await wish_manager.add_item("проклятие тьмы")
+    await wish_manager.add_alias("проклятие тьмы", "пт")
 
-    wish_manager.add_item("регенерация")
-    wish_manager.add_alias("регенерация", "рег")
-    wish_manager.add_alias("регенерация", "реген")
+    await wish_manager.add_item("огонек надежды")
+    await wish_manager.add_alias("огонек надежды", "он")
 
-    wish_manager.add_item("расчетливость")
-    wish_manager.add_alias("расчетливость", "расчетка")
-    wish_manager.add_alias("расчетливость", "рас")
-    wish_manager.add_alias("расчетливость", "расчет")
+    await wish_manager.add_item("целебный огонь")
+    await wish_manager.add_alias("целебный огонь", "цо")
 
-    wish_manager.add_item("презрение к боли")
-    wish_manager.add_alias("презрение к боли", "пкб")
+    await wish_manager.add_item("заражение")
+    await wish_manager.add_alias("заражение", "зараза")
 
-    wish_manager.add_item("рыбак")
-    wish_manager.add_alias("рыбак", "рыба")
+    await wish_manager.add_item("раскол")
 
-    wish_manager.add_item("неуязвимый")
-    wish_manager.add_alias("неуязвимый", "неу")
+    await wish_manager.add_item("быстрое восстановление")
+    await wish_manager.add_alias("быстрое восстановление", "бв")
 
-    wish_manager.add_item("колющий удар")
-    wish_manager.add_alias("колющий удар", "ку")
-    wish_manager.add_alias("колющий удар", "кол")
+    await wish_manager.add_item("мародер")
+    await wish_manager.add_alias("мародер", "маро")
 
-    wish_manager.add_item("бесстрашие")
-    wish_manager.add_alias("бесстрашие", "бес")
+    await wish_manager.add_item("внимательность")
+    await wish_manager.add_alias("внимательность", "вни")
 
-    wish_manager.add_item("режущий удар")
-    wish_manager.add_alias("режущий удар", "ру")
-    wish_manager.add_alias("режущий удар", "реж")
+    await wish_manager.add_item("инициативность")
+    await wish_manager.add_alias("инициативность", "ини")
 
+    await wish_manager.add_item("исследователь")
+    await wish_manager.add_alias("исследователь", "исс")
 
-    wish_manager.add_item("феникс")
-    wish_manager.add_alias("феникс", "фен")
+    await wish_manager.add_item("ведьмак")
+    await wish_manager.add_alias("ведьмак", "вед")
 
-    wish_manager.add_item("суеверность")
-    wish_manager.add_alias("суеверность", "суе")
+    await wish_manager.add_item("собиратель")
+    await wish_manager.add_alias("собиратель", "соб")
 
-    wish_manager.add_item("гладиатор")
-    wish_manager.add_alias("гладиатор", "глад")
+    await wish_manager.add_item("запасливость")
+    await wish_manager.add_alias("запасливость", "запаска")
 
-    wish_manager.add_item("воздаяние")
-    wish_manager.add_alias("воздаяние", "возд")
+    await wish_manager.add_item("охотник за головами")
+    await wish_manager.add_alias("охотник за головами", "охо")
+    await wish_manager.add_alias("охотник за головами", "озг")
 
-    wish_manager.add_item("ученик")
-    wish_manager.add_alias("ученик", "уче")
+    await wish_manager.add_item("подвижность")
+    await wish_manager.add_alias("подвижность", "под")
+    await wish_manager.add_alias("подвижность", "подвига")
 
-    wish_manager.add_item("прочность")
-    wish_manager.add_alias("прочность", "про")
+    await wish_manager.add_item("упорность")
+    await wish_manager.add_alias("упорность", "упо")
 
-    wish_manager.add_item("расторопность")
-    wish_manager.add_alias("расторопность", "раст")
+    await wish_manager.add_item("регенерация")
+    await wish_manager.add_alias("регенерация", "рег")
+    await wish_manager.add_alias("регенерация", "реген")
 
-    wish_manager.add_item("устрашение")
-    wish_manager.add_alias("устрашение", "устр")
+    await wish_manager.add_item("расчетливость")
+    await wish_manager.add_alias("расчетливость", "расчетка")
+    await wish_manager.add_alias("расчетливость", "рас")
+    await wish_manager.add_alias("расчетливость", "расчет")
 
-    wish_manager.add_item("устойчивость")
-    wish_manager.add_alias("устойчивость", "уст")
+    await wish_manager.add_item("презрение к боли")
+    await wish_manager.add_alias("презрение к боли", "пкб")
 
-    wish_manager.add_item("контратака")
-    wish_manager.add_alias("контратака", "контр")
+    await wish_manager.add_item("рыбак")
+    await wish_manager.add_alias("рыбак", "рыба")
 
-    wish_manager.add_item("дробящий удар")
-    wish_manager.add_alias("дробящий удар", "ду")
-    wish_manager.add_alias("дробящий удар", "дробь")
+    await wish_manager.add_item("неуязвимый")
+    await wish_manager.add_alias("неуязвимый", "неу")
 
-    wish_manager.add_item("защитная стойка")
-    wish_manager.add_alias("защитная стойка", "зс")
-    wish_manager.add_alias("защитная стойка", "защитка")
+    await wish_manager.add_item("колющий удар")
+    await wish_manager.add_alias("колющий удар", "ку")
+    await wish_manager.add_alias("колющий удар", "кол")
 
-    wish_manager.add_item("стойка сосредоточения")
-    wish_manager.add_alias("стойка сосредоточения", "сс")
-    wish_manager.add_alias("стойка сосредоточения", "сосред")
+    await wish_manager.add_item("бесстрашие")
+    await wish_manager.add_alias("бесстрашие", "бес")
 
-    wish_manager.add_item("водохлеб")
-    wish_manager.add_alias("водохлеб", "водо")
+    await wish_manager.add_item("режущий удар")
+    await wish_manager.add_alias("режущий удар", "ру")
+    await wish_manager.add_alias("режущий удар", "реж")
 
-    wish_manager.add_item("картограф")
-    wish_manager.add_alias("картограф", "карто")
-    wish_manager.add_alias("картограф", "карт")
-    wish_manager.add_alias("картограф", "карта")
 
-    wish_manager.add_item("браконьер")
-    wish_manager.add_alias("браконьер", "брако")
+    await wish_manager.add_item("феникс")
+    await wish_manager.add_alias("феникс", "фен")
 
-    wish_manager.add_item("парирование")
-    wish_manager.add_alias("парирование", "парир")
+    await wish_manager.add_item("суеверность")
+    await wish_manager.add_alias("суеверность", "суе")
 
-    wish_manager.add_item("ловкость рук")
-    wish_manager.add_alias("ловкость рук", "лр")
-    wish_manager.add_alias("ловкость рук", "лорук")
+    await wish_manager.add_item("гладиатор")
+    await wish_manager.add_alias("гладиатор", "глад")
 
-    wish_manager.add_item("незаметность")
-    wish_manager.add_alias("незаметность", "незам")
-    wish_manager.add_alias("незаметность", "нез")
+    await wish_manager.add_item("воздаяние")
+    await wish_manager.add_alias("воздаяние", "возд")
 
-    wish_manager.add_item("атлетика")
-    wish_manager.add_alias("атлетика", "атлет")
+    await wish_manager.add_item("ученик")
+    await wish_manager.add_alias("ученик", "уче")
 
-    wish_manager.add_item("знания древних")
-    wish_manager.add_alias("знания древних", "зд")
+    await wish_manager.add_item("прочность")
+    await wish_manager.add_alias("прочность", "про")
 
-    wish_manager.add_item("эссенция адмов")
-    wish_manager.add_alias("эссенция адмов", "эска")
+    await wish_manager.add_item("расторопность")
+    await wish_manager.add_alias("расторопность", "раст")
 
-    wish_manager.add_item("кровь адмов")
-    wish_manager.add_alias("кровь адмов", "кровь адмов")
+    await wish_manager.add_item("устрашение")
+    await wish_manager.add_alias("устрашение", "устр")
 
-    wish_manager.add_item("жемчужина адмов")
-    wish_manager.add_alias("жемчужина адмов", "жем")
+    await wish_manager.add_item("устойчивость")
+    await wish_manager.add_alias("устойчивость", "уст")
 
-    wish_manager.add_item("цветок адмов")
-    wish_manager.add_alias("цветок адмов", "цветок")
+    await wish_manager.add_item("контратака")
+    await wish_manager.add_alias("контратака", "контр")
 
-    wish_manager.add_item("обломок сердца")
-    wish_manager.add_alias("обломок сердца", "обл")
+    await wish_manager.add_item("дробящий удар")
+    await wish_manager.add_alias("дробящий удар", "ду")
+    await wish_manager.add_alias("дробящий удар", "дробь")
 
-    wish_manager.add_item("малое кольцо концентрации")
-    wish_manager.add_alias("малое кольцо концентрации", "мкк")
+    await wish_manager.add_item("защитная стойка")
+    await wish_manager.add_alias("защитная стойка", "зс")
+    await wish_manager.add_alias("защитная стойка", "защитка")
 
-    wish_manager.add_item("малое кольцо силы")
-    wish_manager.add_alias("малое кольцо силы", "мкс")
+    await wish_manager.add_item("стойка сосредоточения")
+    await wish_manager.add_alias("стойка сосредоточения", "сс")
+    await wish_manager.add_alias("стойка сосредоточения", "сосред")
 
-    wish_manager.add_item("малое кольцо выносливости")
-    wish_manager.add_alias("малое кольцо выносливости", "мкв")
+    await wish_manager.add_item("водохлеб")
+    await wish_manager.add_alias("водохлеб", "водо")
 
-    wish_manager.add_item("малое кольцо ловкости")
-    wish_manager.add_alias("малое кольцо ловкости", "мкл")
+    await wish_manager.add_item("картограф")
+    await wish_manager.add_alias("картограф", "карто")
+    await wish_manager.add_alias("картограф", "карт")
+    await wish_manager.add_alias("картограф", "карта")
 
-    wish_manager.add_item("малое кольцо точности")
-    wish_manager.add_alias("малое кольцо точности", "мкт")
+    await wish_manager.add_item("браконьер")
+    await wish_manager.add_alias("браконьер", "брако")
 
-    wish_manager.add_item("кольцо древних")
-    wish_manager.add_alias("кольцо древних", "древка")
+    await wish_manager.add_item("парирование")
+    await wish_manager.add_alias("парирование", "парир")
 
-    wish_manager.add_item("рунное кольцо")
-    wish_manager.add_alias("рунное кольцо", "рунка")
+    await wish_manager.add_item("ловкость рук")
+    await wish_manager.add_alias("ловкость рук", "лр")
+    await wish_manager.add_alias("ловкость рук", "лорук")
 
-    wish_manager.add_item("карта озера")
-    wish_manager.add_alias("карта озера", "ко")
+    await wish_manager.add_item("незаметность")
+    await wish_manager.add_alias("незаметность", "незам")
+    await wish_manager.add_alias("незаметность", "нез")
 
-    wish_manager.add_item("карта угодий")
-    wish_manager.add_alias("карта угодий", "ку")
+    await wish_manager.add_item("атлетика")
+    await wish_manager.add_alias("атлетика", "атлет")
 
-    wish_manager.add_item("карта источника")
-    wish_manager.add_alias("карта источника", "ки")
+    await wish_manager.add_item("знания древних")
+    await wish_manager.add_alias("знания древних", "зд")
 
-    wish_manager.add_item("карта испытания")
-    wish_manager.add_alias("карта испытания", "испыт")
-
-    wish_manager.add_item("карта руин")
-    wish_manager.add_alias("карта руин", "кр")
-
-    wish_manager.add_item("карта сокровищ")
-    wish_manager.add_alias("карта сокровищ", "кс")
-
-    wish_manager.add_item("карта окрестностей")
-    wish_manager.add_alias("карта окрестностей", "окрестности")
-
-    wish_manager.add_item("камень")
-
-    wish_manager.add_item("бревно")
-
-    wish_manager.add_item("лен")
-
-    wish_manager.add_item("железная руда")
-    wish_manager.add_alias("железная руда", "железо")
-
-    wish_manager.add_item("душа смерти")
-    wish_manager.add_alias("душа смерти", "дс")
-
-    wish_manager.add_item("душа крови")
-    wish_manager.add_alias("душа крови", "дк")
-
-    wish_manager.add_item("душа огня")
-    wish_manager.add_alias("душа огня", "до")
-
-    wish_manager.add_item("душа времени")
-    wish_manager.add_alias("душа времени", "дв")
-
-    wish_manager.add_item("душа змея")
-    wish_manager.add_alias("душа змея", "дз")
-
-    wish_manager.add_item("душа проклятых")
-    wish_manager.add_alias("душа проклятых", "дп")
-
-    wish_manager.add_item("душа ярости")
-    wish_manager.add_alias("душа ярости", "дя")
+    await wish_manager.add_item("эссенция адмов")
+    await wish_manager.add_alias("эссенция адмов", "эска")
 
+    await wish_manager.add_item("кровь адмов")
+    await wish_manager.add_alias("кровь адмов", "кровь адмов")
 
+    await wish_manager.add_item("жемчужина адмов")
+    await wish_manager.add_alias("жемчужина адмов", "жем")
 
+    await wish_manager.add_item("цветок адмов")
+    await wish_manager.add_alias("цветок адмов", "цветок")
 
+    await wish_manager.add_item("обломок сердца")
+    await wish_manager.add_alias("обломок сердца", "обл")
 
+    await wish_manager.add_item("малое кольцо концентрации")
+    await wish_manager.add_alias("малое кольцо концентрации", "мкк")
 
+    await wish_manager.add_item("малое кольцо силы")
+    await wish_manager.add_alias("малое кольцо силы", "мкс")
 
+    await wish_manager.add_item("малое кольцо выносливости")
+    await wish_manager.add_alias("малое кольцо выносливости", "мкв")
 
+    await wish_manager.add_item("малое кольцо ловкости")
+    await wish_manager.add_alias("малое кольцо ловкости", "мкл")
 
+    await wish_manager.add_item("малое кольцо точности")
+    await wish_manager.add_alias("малое кольцо точности", "мкт")
 
+    await wish_manager.add_item("кольцо древних")
+    await wish_manager.add_alias("кольцо древних", "древка")
 
+    await wish_manager.add_item("рунное кольцо")
+    await wish_manager.add_alias("рунное кольцо", "рунка")
 
+    await wish_manager.add_item("карта озера")
+    await wish_manager.add_alias("карта озера", "ко")
 
+    await wish_manager.add_item("карта угодий")
+    await wish_manager.add_alias("карта угодий", "ку")
 
+    await wish_manager.add_item("карта источника")
+    await wish_manager.add_alias("карта источника", "ки")
 
+    await wish_manager.add_item("карта испытания")
+    await wish_manager.add_alias("карта испытания", "испыт")
 
+    await wish_manager.add_item("карта руин")
+    await wish_manager.add_alias("карта руин", "кр")
 
+    await wish_manager.add_item("карта сокровищ")
+    await wish_manager.add_alias("карта сокровищ", "кс")
 
+    await wish_manager.add_item("карта окрестностей")
+    await wish_manager.add_alias("карта окрестностей", "окрестности")
 
+    await wish_manager.add_item("камень")
 
+    await wish_manager.add_item("бревно")
 
+    await wish_manager.add_item("лен")
 
+    await wish_manager.add_item("железная руда")
+    await wish_manager.add_alias("железная руда", "железо")
 
+    await wish_manager.add_item("душа смерти")
+    await wish_manager.add_alias("душа смерти", "дс")
 
+    await wish_manager.add_item("душа крови")
+    await wish_manager.add_alias("душа крови", "дк")
 
+    await wish_manager.add_item("душа огня")
+    await wish_manager.add_alias("душа огня", "до")
 
+    await wish_manager.add_item("душа времени")
+    await wish_manager.add_alias("душа времени", "дв")
 
+    await wish_manager.add_item("душа змея")
+    await wish_manager.add_alias("душа змея", "дз")
 
+    await wish_manager.add_item("душа проклятых")
+    await wish_manager.add_alias("душа проклятых", "дп")
 
+    await wish_manager.add_item("душа ярости")
+    await wish_manager.add_alias("душа ярости", "дя")
 
 
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,9 +1,15 @@
-import asyncio
+import json
 import time
+from typing import Optional
 from utils.logger import logger
 from services.user_manager import UserManager
 from services.chat_manager import ChatManager
-import vk_api
+from services.credential_cache import CredentialCache
+from services.command_router import CommandRouter
+from modules.buff_scheduler import BuffScheduler
+from modules.buff_assigner import assign_buffs
+from utils.buff_letters import letter_bit
+from services.async_vk_api import AsyncVkApiError
 from vk_api.utils import get_random_id
 
 BUFF_PEER_ID = -183040898
@@ -42,13 +48,18 @@ class AutoBuffManager:
         self.user_manager = user_manager
         self.chat_manager = chat_manager
         self.cooldowns = {}  # Структура: {user_id: timestamp}
-        self.active_tasks = []
+        self.credentials = CredentialCache(user_manager)
+        self.scheduler = BuffScheduler(self._retry_request)
 
-    def is_on_cooldown(self, user_id, role):
-        current_time = time.time()
-        cooldown_period = self.get_cooldown_period(role)
+    def get_cooldown_left(self, user_id, role):
+        """
+        Сколько секунд осталось до конца кулдауна пользователя (0 — готов).
+        """
         last_used = self.cooldowns.get(user_id, 0)
-        on_cd = (current_time - last_used) < cooldown_period
+        return max(0.0, self.get_cooldown_period(role) - (time.time() - last_used))
+
+    def is_on_cooldown(self, user_id, role):
+        on_cd = self.get_cooldown_left(user_id, role) > 0
         logger.debug(
             f"Проверка кулдауна для пользователя {user_id} с ролью '{role}': {'на кулдауне' if on_cd else 'готов'}"
         )
@@ -64,18 +75,75 @@ class AutoBuffManager:
         else:
             return 0
 
+    def register_commands(self, router: CommandRouter, module: Optional[str] = "auto_buff"):
+        """
+        Регистрация команд бафов в маршрутизаторе.
+        :param router: Общий маршрутизатор команд.
+        :param module: Название модуля чата.
+        """
+        router.add(module, "баф ", self._command_buff)
+        for command in list(DEB_BUFFS_MAPPING) + list(VOPL_BUFFS_MAPPING):
+            router.add(module, command, self._command_buff, exact=True)
+
+    async def _command_buff(self, message, _):
+        await self.process_message(
+            message["peer_id"], message["conversation_message_id"], message["text"]
+        )
+
     async def process_message(self, chat_id, conversation_message_id, text):
         if text.lower().startswith("баф "):
-            await self.handle_apo_buff_request(chat_id, conversation_message_id, text)
+            role = "апо"
         elif text.lower() in DEB_BUFFS_MAPPING:
-            await self.handle_deb_buff_request(
-                chat_id, conversation_message_id, text.lower()
-            )
+            role, text = "деб", text.lower()
         elif text.lower() in VOPL_BUFFS_MAPPING:
-            await self.handle_vopl_buff_request(
-                chat_id, conversation_message_id, text.lower()
+            role, text = "вопла", text.lower()
+        else:
+            return
+
+        if self.scheduler.has_pending(chat_id, role):
+            # Новый запрос встаёт в очередь за уже ожидающими, чтобы бафы выдавались по порядку.
+            # Очередь будится раньше назначенного только если бафер для него свободен сейчас
+            delay = await self._get_request_delay(role, chat_id, text)
+            self.scheduler.schedule(chat_id, role, conversation_message_id, text, delay)
+            return
+        await self.handle_buff_request(role, chat_id, conversation_message_id, text)
+
+    async def handle_buff_request(
+        self, role: str, chat_id: int, conversation_message_id: int, text: str
+    ):
+        """
+        Обрабатывает запрос бафа; то, что выдать сейчас нельзя из-за кулдаунов,
+        откладывается в планировщик.
+        """
+        result = await self._try_buff_request(role, chat_id, conversation_message_id, text)
+        if result:
+            remaining_text, delay = result
+            self.scheduler.schedule(
+                chat_id, role, conversation_message_id, remaining_text, delay
             )
 
+    async def _retry_request(self, request):
+        return await self._try_buff_request(
+            request["role"],
+            request["chat_id"],
+            request["conversation_message_id"],
+            request["text"],
+        )
+
+    async def _try_buff_request(
+        self, role: str, chat_id: int, conversation_message_id: int, text: str
+    ):
+        """
+        :return: (текст невыполненной части запроса, секунд до освобождения бафера)
+                 или None, если ждать нечего.
+        """
+        if role == "апо":
+            return await self.handle_apo_buff_request(chat_id, conversation_message_id, text)
+        elif role == "деб":
+            return await self.handle_deb_buff_request(chat_id, conversation_message_id, text)
+        elif role == "вопла":
+            return await self.handle_vopl_buff_request(chat_id, conversation_message_id, text)
+
     async def handle_apo_buff_request(
         self, chat_id: int, conversation_message_id: int, text: str
     ):
@@ -88,40 +156,44 @@ class AutoBuffManager:
                     requested_buffs.replace(priority_buff, "", 1) + priority_buff
                 )
 
-        apo_users = self.user_manager.get_users_by_role_in_chat("апо", chat_id)
+        apo_users = await self.user_manager.get_users_by_role_in_chat("апо", chat_id)
         if not apo_users:
             logger.debug(f"В чате {chat_id} нет пользователей с ролью 'апо'.")
             return
 
+        # Назначение баферов паросочетанием: максимум бафов выдаётся сразу,
+        # редкие бафы не остаются без бафера из-за того, что универсальный
+        # бафер ушёл на частый баф
+        cooldowns_left = {
+            user["user_id"]: self.get_cooldown_left(user["user_id"], "апо")
+            for user in apo_users
+        }
+        assignment = assign_buffs(requested_buffs, apo_users, cooldowns_left)
+
         remaining_buffs = ""
-        for buff in requested_buffs:
-            assigned = False
-            for user in apo_users:
-                if buff not in user["buff_list"]:
-                    continue
-                if not self.is_on_cooldown(user["user_id"], "апо"):
-                    await self.send_buff(
-                        user["user_id"],
-                        chat_id,
-                        APO_BUFFS_MAPPING[buff],
-                        "апо",
-                        conversation_message_id,
-                    )
-                    assigned = True
-                    break
+        for buff, user in zip(requested_buffs, assignment):
+            if user is None:
+                if any(apo_user["buff_mask"] & letter_bit(buff) for apo_user in apo_users):
+                    # Все умеющие этот баф уже выдают другие бафы запроса
+                    remaining_buffs += buff
                 else:
-                    assigned = "on_cooldown"
-
-            if assigned == "on_cooldown":
+                    logger.debug(
+                        f"Баф '{buff}' не может быть выдан — нет апо с таким бафом."
+                    )
+            elif cooldowns_left[user["user_id"]] > 0:
                 remaining_buffs += buff
-            elif not assigned:
-                logger.debug(
-                    f"Баф '{buff}' не может быть выдан — нет апо с таким бафом."
+            else:
+                await self.send_buff(
+                    user["user_id"],
+                    chat_id,
+                    APO_BUFFS_MAPPING[buff],
+                    "апо",
+                    conversation_message_id,
                 )
 
         if remaining_buffs:
-            await self.schedule_delayed_buff_request(
-                chat_id, conversation_message_id, remaining_buffs, apo_users
+            return self._delayed_request(
+                "апо", "баф " + remaining_buffs, remaining_buffs, apo_users
             )
 
     async def handle_deb_buff_request(
@@ -132,24 +204,19 @@ class AutoBuffManager:
             logger.debug(f"Некорректный запрос деба: {text}")
             return
 
-        deb_users = self.user_manager.get_users_by_role_in_chat("деб", chat_id)
+        deb_users = await self.user_manager.get_users_by_role_in_chat("деб", chat_id)
         if not deb_users:
             logger.debug(f"В чате {chat_id} нет пользователей с ролью 'деб'.")
             return
 
-        assigned = False
         for user in deb_users:
             if not self.is_on_cooldown(user["user_id"], "деб"):
                 await self.send_buff(
                     user["user_id"], chat_id, buff_name, "деб", conversation_message_id
                 )
-                assigned = True
-                break
+                return
 
-        if not assigned:
-            await self.schedule_delayed_deb_request(
-                chat_id, conversation_message_id, text, deb_users
-            )
+        return self._delayed_request("деб", text, text, deb_users)
 
     async def handle_vopl_buff_request(
         self, chat_id: int, conversation_message_id: int, text: str
@@ -159,12 +226,11 @@ class AutoBuffManager:
             logger.debug(f"Некорректный запрос вопла: {text}")
             return
 
-        vopl_users = self.user_manager.get_users_by_role_in_chat("вопла", chat_id)
+        vopl_users = await self.user_manager.get_users_by_role_in_chat("вопла", chat_id)
         if not vopl_users:
             logger.debug(f"В чате {chat_id} нет пользователей с ролью 'вопла'.")
             return
 
-        assigned = False
         for user in vopl_users:
             if not self.is_on_cooldown(user["user_id"], "вопла"):
                 await self.send_buff(
@@ -174,113 +240,40 @@ class AutoBuffManager:
                     "вопла",
                     conversation_message_id,
                 )
-                assigned = True
-                break
+                return
 
-        if not assigned:
-            await self.schedule_delayed_vopl_request(
-                chat_id, conversation_message_id, text, vopl_users
-            )
+        return self._delayed_request("вопла", text, text, vopl_users)
 
-    async def schedule_delayed_buff_request(
-        self,
-        chat_id: int,
-        conversation_message_id: int,
-        remaining_buffs: str,
-        apo_users: list,
-    ):
-        min_cooldown = self._calculate_min_cooldown("апо", remaining_buffs, apo_users)
+    def _delayed_request(self, role: str, text: str, buffs: str, users: list):
+        """
+        :return: (текст запроса для повтора, задержка) или None, если ни один
+                 подходящий бафер не освободится.
+        """
+        min_cooldown = self._calculate_min_cooldown(role, buffs, users)
         if min_cooldown < float("inf"):
-            logger.debug(
-                f"Назначение отложенного вызова для бафов '{remaining_buffs}' через {min_cooldown} секунд."
-            )
-            task = asyncio.create_task(
-                self._delayed_buff_handler(
-                    chat_id,
-                    conversation_message_id,
-                    "баф " + remaining_buffs,
-                    min_cooldown,
-                    "апо",
-                ),
-                name=f"buff_{chat_id}_{conversation_message_id}",
-            )
-            self.active_tasks.append(task)
-            task.add_done_callback(
-                lambda t: (
-                    self.active_tasks.remove(t) if t in self.active_tasks else None
-                )
-            )
-
-    async def schedule_delayed_deb_request(
-        self,
-        chat_id: int,
-        conversation_message_id: int,
-        buff_name: str,
-        deb_users: list,
-    ):
-        min_cooldown = self._calculate_min_cooldown("деб", buff_name, deb_users)
-        if min_cooldown < float("inf"):
-            logger.debug(
-                f"Назначение отложенного вызова для бафа '{buff_name}' через {min_cooldown} секунд."
-            )
-            asyncio.create_task(
-                self._delayed_buff_handler(
-                    chat_id, conversation_message_id, buff_name, min_cooldown, "деб"
-                )
-            )
-
-    async def schedule_delayed_vopl_request(
-        self,
-        chat_id: int,
-        conversation_message_id: int,
-        buff_name: str,
-        vopl_users: list,
-    ):
-        min_cooldown = self._calculate_min_cooldown("вопла", buff_name, vopl_users)
-        if min_cooldown < float("inf"):
-            logger.debug(
-                f"Назначение отложенного вызова для бафа '{buff_name}' через {min_cooldown} секунд."
-            )
-            asyncio.create_task(
-                self._delayed_buff_handler(
-                    chat_id, conversation_message_id, buff_name, min_cooldown, "вопла"
-                )
-            )
-
-    async def _delayed_buff_handler(
-        self,
-        chat_id: int,
-        conversation_message_id: int,
-        remaining_buffs: str,
-        delay: float,
-        role: str,
-    ):
-        logger.debug(
-            f"Отложенный вызов для бафов '{remaining_buffs}' активирован. Ожидание {delay} секунд."
-        )
-        await asyncio.wait_for(asyncio.sleep(delay), timeout=delay + 1)
-
-        logger.debug(
-            f"Отложенный вызов для бафов '{remaining_buffs}' завершен. Повторная попытка."
-        )
-        if role == "апо":
-            await self.handle_apo_buff_request(
-                chat_id, conversation_message_id, remaining_buffs
-            )
-        elif role == "деб":
-            await self.handle_deb_buff_request(
-                chat_id, conversation_message_id, remaining_buffs
-            )
-        elif role == "вопла":
-            await self.handle_vopl_buff_request(
-                chat_id, conversation_message_id, remaining_buffs
-            )
+            return text, min_cooldown
+        return None
+
+    async def _get_request_delay(self, role: str, chat_id: int, text: str) -> float:
+        """
+        Через сколько секунд освободится бафер, способный выполнить запрос.
+        :return: 0, если такой бафер свободен сейчас или баферов нет вовсе.
+        """
+        users = await self.user_manager.get_users_by_role_in_chat(role, chat_id)
+        buffs = text[4:].lower() if role == "апо" else (text,)
+        delay = float("inf")
+        for buff in buffs:
+            for user in users:
+                if role == "апо" and not user["buff_mask"] & letter_bit(buff):
+                    continue
+                delay = min(delay, self.get_cooldown_left(user["user_id"], role))
+        return delay if delay < float("inf") else 0
 
     def _calculate_min_cooldown(self, role: str, buffs: str, users: list):
         min_cooldown = float("inf")
         for buff in buffs:
             for user in users:
-                if role == "апо" and buff not in user["buff_list"]:
+                if role == "апо" and not user["buff_mask"] & letter_bit(buff):
                     continue
                 cooldown = self.get_cooldown_period(role) - (
                     time.time() - self.cooldowns.get(user["user_id"], 0)
@@ -292,56 +285,85 @@ class AutoBuffManager:
     async def send_buff(
         self, user_id, group_chat_id, buff_name, role, conversation_message_id
     ):
-        auto_buffs = self.user_manager.get_all_auto_buffs(user_id)
-        target_auto_buff = None
+        # Кулдаун занимается до первого await: параллельные обработчики чатов
+        # и планировщик не должны выбрать этого же бафера, пока идёт отправка
+        previous_used = self.cooldowns.get(user_id)
+        self.cooldowns[user_id] = time.time()
+        sent = False
+        try:
+            sent = await self._send_buff(
+                user_id, group_chat_id, buff_name, role, conversation_message_id
+            )
+        finally:
+            # Баф не отправлен (в том числе при отмене задачи) — бафер снова свободен
+            if not sent:
+                self._release_cooldown(user_id, previous_used)
+        if not sent:
+            return
+        logger.debug(
+            f"Кулдаун для пользователя {user_id} с ролью '{role}' установлен на {self.get_cooldown_period(role)} секунд."
+        )
 
-        for auto_buff in auto_buffs:
-            if auto_buff["group_chat_id"] == group_chat_id:
-                target_auto_buff = auto_buff
-                break
+    def _release_cooldown(self, user_id, previous_used):
+        """
+        Возвращает кулдаун бафера к значению до неудачной отправки.
+        """
+        if previous_used is None:
+            self.cooldowns.pop(user_id, None)
+        else:
+            self.cooldowns[user_id] = previous_used
 
-        if not target_auto_buff:
+    async def _send_buff(
+        self, user_id, group_chat_id, buff_name, role, conversation_message_id
+    ):
+        """
+        :return: True, если баф отправлен.
+        """
+        try:
+            credentials = await self.credentials.get(user_id, group_chat_id)
+        except Exception as e:
+            logger.error(f"Ошибка при чтении авто бафа пользователя {user_id}: {e}")
+            return False
+        if not credentials:
             logger.error(f"Авто баф для пользователя {user_id} не найден.")
-            return
-
-        token = target_auto_buff["token"]
-        user_chat_id = target_auto_buff["chat_id"]
+            return False
+
+        # Поиск пересылаемого сообщения и отправка бафа за один запрос
+        code = (
+            "var items = API.messages.getByConversationMessageId("
+            f'{{"peer_id": {credentials["chat_id"]}, "conversation_message_ids": {conversation_message_id}}}'
+            ").items;"
+            "if (items.length == 0) { return 0; }"
+            "return API.messages.send("
+            f'{{"peer_id": {BUFF_PEER_ID}, "message": {json.dumps(buff_name, ensure_ascii=False)}, '
+            f'"random_id": {get_random_id()}, "forward_messages": items[0].id}}'
+            ");"
+        )
 
         try:
-            vk_session = vk_api.VkApi(token=token)
-            vk = vk_session.get_api()
-            response = vk_session.method(
-                "messages.getByConversationMessageId",
-                {
-                    "peer_id": user_chat_id,
-                    "conversation_message_ids": conversation_message_id,
-                    "access_token": token,
-                },
-            )
-            if not response["items"]:
+            data = await credentials["api"].execute(code)
+            response = data.get("response")
+            if response == 0:
                 logger.error(
                     f"Не удалось найти сообщение по conversation_message_id: {conversation_message_id}"
                 )
-                return
-            message_id = response["items"][0]["id"]
-
-            vk_session.method(
-                "messages.send",
-                {
-                    "peer_id": BUFF_PEER_ID,
-                    "message": buff_name,
-                    "random_id": get_random_id(),
-                    "forward_messages": message_id,
-                },
-            )
+                return False
+            if not response:
+                errors = data.get("execute_errors") or [{}]
+                raise AsyncVkApiError(
+                    errors[0].get("error_code", 0),
+                    errors[0].get("error_msg", ""),
+                    errors[0].get("method"),
+                )
             logger.debug(
                 f"{role.upper()} {user_id} отправил баф '{buff_name}'"
             )
-            self.cooldowns[user_id] = time.time()
-            logger.debug(
-                f"Кулдаун для пользователя {user_id} с ролью '{role}' установлен на {self.get_cooldown_period(role)} секунд."
-            )
+            return True
         except Exception as e:
+            if isinstance(e, AsyncVkApiError) and e.code == 5:
+                # Токен отозван — при следующем бафе он будет перечитан из базы
+                self.credentials.invalidate(user_id, group_chat_id)
             logger.error(
                 f"Ошибка при отправке бафа от {user_id}: {e}"
             )
+            return False
@@ -0,0 +1,99 @@
+from typing import Dict, List, Optional
+from utils.buff_letters import letter_bit
+
+# Стоимость назначения бафера на кулдауне: больше любой суммы стоимостей
+# свободных баферов, поэтому сначала максимизируется число бафов, выдаваемых сразу
+_ON_COOLDOWN_COST = 10**12
+# Остаток кулдауна учитывается с точностью до миллисекунды
+_COOLDOWN_SCALE = 1000
+# Множитель для остатка кулдауна: младшие разряды занимает «универсальность» бафера
+_VERSATILITY_SCALE = 100
+
+
+def _assignment_cost(user: dict, cooldown_left: float) -> int:
+    """
+    Стоимость назначения бафера (целое число, чтобы сравнения были точными).
+    Свободные баферы дешевле баферов на кулдауне, среди баферов на кулдауне
+    дешевле тот, кто освободится раньше. При прочих равных выбирается бафер
+    с меньшим набором бафов, чтобы универсальные оставались для других букв.
+    """
+    cost = bin(user["buff_mask"]).count("1")
+    if cooldown_left > 0:
+        cost += _ON_COOLDOWN_COST + int(cooldown_left * _COOLDOWN_SCALE) * _VERSATILITY_SCALE
+    return cost
+
+
+def assign_buffs(
+    letters: str, users: List[dict], cooldowns_left: Dict[int, float]
+) -> List[Optional[dict]]:
+    """
+    Назначает баферов на буквы запроса: паросочетание минимальной стоимости
+    в двудольном графе «буквы × баферы» (каждый бафер выдаёт не больше одного бафа).
+    Сначала максимизируется число букв, которые свободные баферы выдадут сразу,
+    затем минимизируется ожидание остальных. Результат детерминирован: при равной
+    стоимости выбирается бафер, стоящий раньше в списке.
+
+    :param letters: Буквы бафов в порядке выдачи.
+    :param users: Баферы, словари с ключами user_id и buff_mask.
+    :param cooldowns_left: Остаток кулдауна по user_id (0 — бафер свободен).
+    :return: Для каждой буквы назначенный бафер или None, если назначить некого.
+    """
+    # Баферы, умеющие каждую букву
+    bits = [letter_bit(letter) for letter in letters]
+    candidates = [
+        [index for index, user in enumerate(users) if user["buff_mask"] & bit]
+        for bit in bits
+    ]
+    costs = {
+        index: _assignment_cost(users[index], cooldowns_left.get(users[index]["user_id"], 0))
+        for letter_candidates in candidates
+        for index in letter_candidates
+    }
+    letter_match: List[Optional[int]] = [None] * len(letters)
+    user_match: Dict[int, int] = {}
+
+    for start in range(len(letters)):
+        if not candidates[start]:
+            continue
+        # Кратчайший увеличивающий путь от новой буквы (Беллман — Форд по остаточному графу:
+        # буква -> бафер по свободному ребру, бафер -> буква по ребру паросочетания)
+        letter_dist = {start: 0}
+        user_dist: Dict[int, int] = {}
+        user_prev: Dict[int, int] = {}
+        changed = True
+        while changed:
+            changed = False
+            for letter, dist in list(letter_dist.items()):
+                for index in candidates[letter]:
+                    if letter_match[letter] == index:
+                        continue
+                    new_dist = dist + costs[index]
+                    if new_dist < user_dist.get(index, new_dist + 1):
+                        user_dist[index] = new_dist
+                        user_prev[index] = letter
+                        changed = True
+            for index, dist in user_dist.items():
+                letter = user_match.get(index)
+                if letter is None:
+                    continue
+                new_dist = dist - costs[index]
+                if new_dist < letter_dist.get(letter, new_dist + 1):
+                    letter_dist[letter] = new_dist
+                    changed = True
+
+        free = [index for index in user_dist if index not in user_match]
+        if not free:
+            continue
+        index = min(free, key=lambda index: (user_dist[index], index))
+
+        # Перестановка назначений вдоль найденного пути
+        while True:
+            letter = user_prev[index]
+            previous = letter_match[letter]
+            letter_match[letter] = index
+            user_match[index] = letter
+            if letter == start:
+                break
+            index = previous
+
+    return [users[index] if index is not None else None for index in letter_match]
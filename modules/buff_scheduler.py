@@ -0,0 +1,211 @@
+import asyncio
+import heapq
+import itertools
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+from utils.logger import logger
+
+
+class BuffScheduler:
+    """
+    Общий планировщик отложенных запросов бафов.
+    Ожидающие запросы хранятся по ключу (chat_id, role) в порядке поступления,
+    время пробуждения каждого ключа — момент, когда освободится ближайший бафер.
+    Один таймер будит планировщик к ближайшему такому моменту, после чего
+    запросы ключа обрабатываются по очереди (FIFO), поэтому они не соревнуются
+    за одного и того же бафера. Каждый ключ обрабатывается отдельной задачей,
+    чтобы медленный чат не задерживал остальные.
+    """
+
+    def __init__(
+        self,
+        handler: Callable[[dict], Awaitable[Optional[Tuple[str, float]]]],
+    ):
+        """
+        :param handler: Корутина повторной обработки запроса. Возвращает
+                        (оставшийся текст запроса, задержка до повтора) или None,
+                        если запрос выполнен или его выполнить невозможно.
+        """
+        self.handler = handler
+        # {(chat_id, role): {conversation_message_id: запрос}}
+        self.pending: Dict[Tuple[int, str], Dict[int, dict]] = {}
+        # Актуальное время пробуждения ключа; записи кучи с другим временем устарели
+        self.wake_at: Dict[Tuple[int, str], float] = {}
+        self.heap: List[Tuple[float, int, Tuple[int, str]]] = []
+        # Запросы ключа, которые обрабатываются прямо сейчас
+        self.in_progress: Dict[Tuple[int, str], Dict[int, dict]] = {}
+        # Задачи обработки ключей; у ключа не больше одной задачи одновременно
+        self.tasks: Dict[Tuple[int, str], asyncio.Task] = {}
+        self._counter = itertools.count()
+        self._wakeup = asyncio.Event()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self._run(), name="buff_scheduler")
+
+    async def stop(self):
+        tasks = list(self.tasks.values())
+        if self.task:
+            tasks.append(self.task)
+            self.task = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.tasks.clear()
+
+    def has_pending(self, chat_id: int, role: str) -> bool:
+        key = (chat_id, role)
+        return bool(self.pending.get(key) or self.in_progress.get(key))
+
+    def schedule(
+        self,
+        chat_id: int,
+        role: str,
+        conversation_message_id: int,
+        text: str,
+        delay: float,
+    ):
+        """
+        Добавляет запрос в очередь. Повторный запрос на то же сообщение
+        не дублируется, а обновляет текст уже ожидающего.
+        :param delay: Через сколько секунд освободится ближайший бафер.
+        """
+        key = (chat_id, role)
+        requests = self.pending.setdefault(key, {})
+        request = requests.get(conversation_message_id)
+        if request:
+            request["text"] = text
+        else:
+            requests[conversation_message_id] = {
+                "chat_id": chat_id,
+                "role": role,
+                "conversation_message_id": conversation_message_id,
+                "text": text,
+                "seq": next(self._counter),
+                "created": time.time(),
+            }
+
+        self._set_wake(key, delay)
+        logger.debug(
+            f"Запрос '{text}' ({role}) в чате {chat_id} отложен на {delay:.1f} секунд, в очереди {len(requests)}"
+        )
+        self.start()
+
+    def _set_wake(self, key: Tuple[int, str], delay: float):
+        wake = time.monotonic() + max(0.0, delay)
+        if key not in self.wake_at or wake < self.wake_at[key]:
+            self.wake_at[key] = wake
+            heapq.heappush(self.heap, (wake, next(self._counter), key))
+            self._wakeup.set()
+
+    def cancel(
+        self,
+        chat_id: int,
+        role: Optional[str] = None,
+        conversation_message_id: Optional[int] = None,
+    ) -> int:
+        """
+        Отменяет ожидающие запросы чата.
+        :param role: Только запросы этой роли (по умолчанию все).
+        :param conversation_message_id: Только запрос на это сообщение.
+        :return: Количество отменённых запросов.
+        """
+        cancelled = 0
+        for storage in (self.pending, self.in_progress):
+            for key in [key for key in storage if key[0] == chat_id]:
+                if role is not None and key[1] != role:
+                    continue
+                requests = storage[key]
+                if conversation_message_id is None:
+                    cancelled += len(requests)
+                    requests.clear()
+                elif requests.pop(conversation_message_id, None):
+                    cancelled += 1
+                if not requests and storage is self.pending:
+                    del self.pending[key]
+                    self.wake_at.pop(key, None)
+        return cancelled
+
+    def get_backlog(self, chat_id: Optional[int] = None) -> List[dict]:
+        """
+        Ожидающие запросы (всех чатов или одного) в порядке поступления.
+        """
+        # Запрос, возвращённый в очередь во время обработки, учитывается один раз
+        requests = {
+            (key, conversation_message_id): request
+            for storage in (self.in_progress, self.pending)
+            for key, items in storage.items()
+            if chat_id is None or key[0] == chat_id
+            for conversation_message_id, request in items.items()
+        }
+        return sorted(requests.values(), key=lambda request: request["seq"])
+
+    def get_backlog_string(self, chat_id: int) -> str:
+        backlog = self.get_backlog(chat_id)
+        if not backlog:
+            return "Очередь бафов пуста"
+        now = time.monotonic()
+        lines = [f"Очередь бафов ({len(backlog)}):"]
+        for request in backlog:
+            wake = self.wake_at.get((chat_id, request["role"]), now)
+            waiting = int(time.time() - request["created"])
+            lines.append(
+                f"{request['role']}: {request['text']} — ждёт {waiting} с, повтор через {max(0, int(wake - now))} с"
+            )
+        return "\n".join(lines)
+
+    async def _run(self):
+        while True:
+            if not self.heap:
+                await self._wakeup.wait()
+            else:
+                timeout = self.heap[0][0] - time.monotonic()
+                if timeout > 0:
+                    try:
+                        await asyncio.wait_for(self._wakeup.wait(), timeout)
+                    except asyncio.TimeoutError:
+                        pass
+            self._wakeup.clear()
+
+            now = time.monotonic()
+            while self.heap and self.heap[0][0] <= now:
+                wake, _, key = heapq.heappop(self.heap)
+                if self.wake_at.get(key) != wake:
+                    continue
+                del self.wake_at[key]
+                if key in self.tasks:
+                    # Ключ ещё обрабатывается — новые запросы возьмёт следующий запуск
+                    continue
+                self.tasks[key] = asyncio.create_task(
+                    self._process(key), name=f"buff_scheduler_{key[0]}_{key[1]}"
+                )
+
+    async def _process(self, key: Tuple[int, str]):
+        requests = self.pending.pop(key, {})
+        self.in_progress[key] = requests
+        try:
+            for request in sorted(requests.values(), key=lambda request: request["seq"]):
+                await self._process_request(key, requests, request)
+        finally:
+            del self.in_progress[key]
+            self.tasks.pop(key, None)
+            # Запросы, пришедшие во время обработки без своего времени пробуждения
+            if self.pending.get(key) and key not in self.wake_at:
+                self._set_wake(key, 0)
+
+    async def _process_request(self, key: Tuple[int, str], requests: Dict[int, dict], request: dict):
+        conversation_message_id = request["conversation_message_id"]
+        # Запрос мог быть отменён, пока обрабатывались предыдущие
+        if conversation_message_id not in requests:
+            return
+        try:
+            result = await self.handler(request)
+        except Exception as e:
+            logger.error(f"Ошибка при повторной обработке бафа '{request['text']}': {e}")
+            return
+        if result and conversation_message_id in requests:
+            # Невыполненный запрос возвращается в очередь со своим местом
+            request["text"], delay = result
+            self.pending.setdefault(key, {}).setdefault(conversation_message_id, request)
+            self._set_wake(key, delay)
@@ -0,0 +1,97 @@
+# modules/leaderboards.py
+
+from bisect import bisect_left, insort
+from typing import Dict, List, Optional, Tuple
+from services.user_manager import PROFILE_STATS
+from utils.logger import logger
+
+
+class LeaderboardManager:
+    """
+    Рейтинги чатов по характеристикам профилей.
+    Для каждого загруженного чата и характеристики хранится отсортированный
+    список ключей (-значение, user_id): топ — срез списка, место пользователя —
+    двоичный поиск, обновление профиля — удаление и вставка одного ключа.
+    Чат загружается из базы при первом обращении к его рейтингу.
+    """
+
+    def __init__(self, user_manager):
+        """
+        :param user_manager: Экземпляр UserManager для загрузки профилей.
+        """
+        self.user_manager = user_manager
+        # {user_id: {"name": ..., характеристика: значение}} пользователей загруженных чатов
+        self.profiles: Dict[int, dict] = {}
+        # {chat_id: {характеристика: [(-значение, user_id), ...]}}
+        self.boards: Dict[int, Dict[str, List[Tuple[int, int]]]] = {}
+        # {user_id: {chat_id, ...}} — в каких загруженных чатах есть пользователь
+        self.user_chats: Dict[int, set] = {}
+
+    async def _get_board(self, chat_id: int) -> Dict[str, List[Tuple[int, int]]]:
+        board = self.boards.get(chat_id)
+        if board is not None:
+            return board
+        profiles = await self.user_manager.get_chat_profiles(chat_id)
+        # Пока шла загрузка, рейтинг мог появиться через update
+        board = self.boards.get(chat_id)
+        if board is not None:
+            return board
+        board = {stat: [] for stat in PROFILE_STATS}
+        for profile in profiles:
+            user_id = profile["user_id"]
+            self.profiles.setdefault(user_id, profile)
+            self.user_chats.setdefault(user_id, set()).add(chat_id)
+            current = self.profiles[user_id]
+            for stat in PROFILE_STATS:
+                board[stat].append(self._key(current, stat, user_id))
+        for keys in board.values():
+            keys.sort()
+        self.boards[chat_id] = board
+        logger.debug(f"Загружен рейтинг чата {chat_id}: {len(profiles)} профилей")
+        return board
+
+    @staticmethod
+    def _key(profile: dict, stat: str, user_id: int) -> Tuple[int, int]:
+        return -(profile.get(stat) or 0), user_id
+
+    def update(self, chat_id: int, user_id: int, name: Optional[str], stats: Dict[str, int]):
+        """
+        Обновляет профиль во всех загруженных рейтингах и добавляет пользователя
+        в рейтинг чата, куда прислан профиль.
+        """
+        old = self.profiles.get(user_id)
+        new = {"user_id": user_id, "name": name, **stats}
+        chats = self.user_chats.setdefault(user_id, set())
+        for board_chat_id in chats:
+            board = self.boards[board_chat_id]
+            for stat in PROFILE_STATS:
+                keys = board[stat]
+                del keys[bisect_left(keys, self._key(old, stat, user_id))]
+                insort(keys, self._key(new, stat, user_id))
+        self.profiles[user_id] = new
+
+        board = self.boards.get(chat_id)
+        if board is not None and chat_id not in chats:
+            chats.add(chat_id)
+            for stat in PROFILE_STATS:
+                insort(board[stat], self._key(new, stat, user_id))
+
+    async def get_top(self, chat_id: int, stat: str, limit: int = 10) -> List[dict]:
+        """
+        Лучшие игроки чата по характеристике.
+        :return: Профили по убыванию значения.
+        """
+        board = await self._get_board(chat_id)
+        return [self.profiles[user_id] for _, user_id in board[stat][:limit]]
+
+    async def get_rank(self, chat_id: int, user_id: int, stat: str) -> Optional[Tuple[int, int]]:
+        """
+        Место пользователя в рейтинге чата.
+        :return: (место, число игроков в рейтинге) или None, если пользователя нет в рейтинге.
+        """
+        board = await self._get_board(chat_id)
+        if chat_id not in self.user_chats.get(user_id, ()):
+            return None
+        keys = board[stat]
+        position = bisect_left(keys, self._key(self.profiles[user_id], stat, user_id))
+        return position + 1, len(keys)
@@ -1,108 +1,377 @@
-import asyncio
+import json
 import sqlite3
 import re
-from typing import Optional, Tuple, List
+from collections import OrderedDict
+from itertools import islice
+from typing import AsyncIterator, Callable, Dict, Iterable, Optional, Tuple, List, Union
+from config.settings import NOTE_CACHE_CHATS, NOTES_PAGE_SIZE
+from services.database import get_database
+from services.command_router import CommandRouter
+from utils.keyboard import create_keyboard
+from utils.trigram_index import TrigramIndex
 from utils.logger import logger
 
+# Сколько заметок показывать в результатах поиска
+SEARCH_RESULTS = 10
+# Сколько похожих названий предлагать, если заметка не нашлась
+SUGGESTIONS = 3
+# Ограничение длины страницы списка заметок (лимит сообщения VK — 4096 символов)
+MESSAGE_LIMIT = 4000
+# Ограничение длины курсора страницы в payload кнопки
+CURSOR_BYTES = 200
+# Сколько заметок записывается одной транзакцией при пакетном импорте
+IMPORT_CHUNK_SIZE = 5000
+
+
+def normalize_keyword(keyword: str) -> str:
+    """
+    Нормализация ключевого слова заметки для поиска без учёта регистра
+    (casefold работает и с кириллицей, в отличие от LOWER в SQLite).
+    """
+    return keyword.strip().casefold()
+
+
+def fold_yo(text: str) -> str:
+    """
+    Замена "ё" на "е" для полнотекстового поиска: токенизатор FTS5 различает
+    эти буквы, поэтому запрос и индексируемый текст приводятся одинаково.
+    """
+    return text.replace("ё", "е").replace("Ё", "Е")
+
+
+def _fold_yo_sql(column: str) -> str:
+    """
+    SQL-выражение, приводящее столбец так же, как fold_yo.
+    """
+    return f"replace(replace({column}, 'ё', 'е'), 'Ё', 'Е')"
+
+
 class NoteManager:
-    def __init__(self, db_path: str = 'data/notes.db'):
+    # "!удалить X" / "/удалить X", кроме "/удалить модуль X"
+    DELETE_PATTERN = re.compile(r'^[!/]удалить (?!.*модуль)(.*)', re.IGNORECASE | re.DOTALL)
+    # Слова поискового запроса (кавычки и операторы FTS5 отбрасываются)
+    SEARCH_WORD_PATTERN = re.compile(r'\w+')
+
+    def __init__(self, db_path: str = 'data/notes.db', cache_chats: int = NOTE_CACHE_CHATS):
         """
         Инициализация менеджера заметок.
         :param db_path: Путь к файлу базы данных SQLite.
+        :param cache_chats: Для скольких чатов держать заметки в памяти.
         """
         self.db_path = db_path
-        self.lock = asyncio.Lock()
-        self._create_table()
-
-    def _create_table(self):
+        self.db = get_database(db_path)
+        # Заметки недавно использованных чатов: {peer_id: {keyword_norm: text}},
+        # порядок — от давно использованных к недавним
+        self.note_cache: "OrderedDict[int, Dict[str, str]]" = OrderedDict()
+        self.cache_chats = cache_chats
+        # Индексы триграмм названий заметок для подсказок при опечатках: {peer_id: TrigramIndex},
+        # вытесняются так же, как кэш заметок
+        self.suggestion_indexes: "OrderedDict[int, TrigramIndex]" = OrderedDict()
+        # Версии заметок чатов, увеличиваются при каждой записи: результат загрузки,
+        # во время которой заметки чата изменились, не кэшируется
+        self._cache_versions: Dict[int, int] = {}
+        self.db.write_sync(self._create_table)
+        # Собственный маршрутизатор для check_note_events
+        self.router = CommandRouter()
+        self.register_commands(self.router)
+
+    def _create_table(self, conn: sqlite3.Connection):
         """
         Синхронное создание таблицы заметок в базе данных.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        # keyword_norm — ключевое слово после normalize_keyword,
+        # все поиски заметок идут по уникальному индексу (peer_id, keyword_norm)
         cursor.execute("""
             CREATE TABLE IF NOT EXISTS notes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 peer_id INTEGER NOT NULL,
                 keyword TEXT NOT NULL,
-                text TEXT NOT NULL,
-                UNIQUE(peer_id, keyword)
+                keyword_norm TEXT NOT NULL,
+                text TEXT NOT NULL
             )
         """)
-        conn.commit()
-        conn.close()
+        if cursor.execute("PRAGMA user_version").fetchone()[0] < 1:
+            columns = {row[1] for row in cursor.execute("PRAGMA table_info(notes)")}
+            if "keyword_norm" not in columns:
+                self._migrate_keyword_norm(conn)
+            cursor.execute("PRAGMA user_version = 1")
+        cursor.execute("""
+            CREATE UNIQUE INDEX IF NOT EXISTS idx_notes_peer_keyword_norm
+            ON notes (peer_id, keyword_norm)
+        """)
+        # user_version 2 — индекс без приведения "ё" к "е", 3 — с приведением
+        if cursor.execute("PRAGMA user_version").fetchone()[0] < 3:
+            self._drop_search_triggers(conn)
+            self._create_search_index(conn)
+            self._rebuild_search_index_sync(conn)
+            cursor.execute("PRAGMA user_version = 3")
         logger.debug("База данных и таблица 'notes' инициализированы.")
 
-    async def get_note_text(self, keyword: str, peer_id: int) -> Optional[str]:
+    def _create_search_index(self, conn: sqlite3.Connection):
         """
-        Получение текста заметки по ключевому слову и peer_id.
-        :param keyword: Ключевое слово заметки.
-        :param peer_id: Идентификатор чата (peer_id).
-        :return: Текст заметки или None, если не найдено.
+        Полнотекстовый индекс FTS5 по названиям и текстам заметок.
+        Индекс хранит только токены (содержимое берётся из notes) и
+        обновляется триггерами при любом изменении таблицы notes.
+        peer_id тоже индексируется: поиск сразу ограничивается заметками чата.
+        Название и текст индексируются с заменой "ё" на "е" (fold_yo); число слов
+        при этом не меняется, поэтому snippet выделяет совпадения в исходном тексте.
         """
-        async with self.lock:
-            result = await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._get_note_text_sync,
-                keyword,
-                peer_id
+        cursor = conn.cursor()
+        cursor.execute("""
+            CREATE VIRTUAL TABLE IF NOT EXISTS notes_fts USING fts5(
+                peer_id, keyword, text,
+                content='notes', content_rowid='id',
+                tokenize='unicode61 remove_diacritics 2'
             )
-        return result
+        """)
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS notes_fts_insert AFTER INSERT ON notes BEGIN
+                INSERT INTO notes_fts (rowid, peer_id, keyword, text)
+                VALUES (new.id, new.peer_id, {new_keyword}, {new_text});
+            END
+        """.format(new_keyword=_fold_yo_sql("new.keyword"), new_text=_fold_yo_sql("new.text")))
+        # При удалении из индекса передаются те же значения, что были проиндексированы
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS notes_fts_delete AFTER DELETE ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, peer_id, keyword, text)
+                VALUES ('delete', old.id, old.peer_id, {old_keyword}, {old_text});
+            END
+        """.format(old_keyword=_fold_yo_sql("old.keyword"), old_text=_fold_yo_sql("old.text")))
+        cursor.execute("""
+            CREATE TRIGGER IF NOT EXISTS notes_fts_update AFTER UPDATE ON notes BEGIN
+                INSERT INTO notes_fts (notes_fts, rowid, peer_id, keyword, text)
+                VALUES ('delete', old.id, old.peer_id, {old_keyword}, {old_text});
+                INSERT INTO notes_fts (rowid, peer_id, keyword, text)
+                VALUES (new.id, new.peer_id, {new_keyword}, {new_text});
+            END
+        """.format(
+            old_keyword=_fold_yo_sql("old.keyword"),
+            old_text=_fold_yo_sql("old.text"),
+            new_keyword=_fold_yo_sql("new.keyword"),
+            new_text=_fold_yo_sql("new.text"),
+        ))
+
+    def _rebuild_search_index_sync(self, conn: sqlite3.Connection):
+        """
+        Синхронное перестроение полнотекстового индекса по таблице notes.
+        Команда 'rebuild' читала бы notes без замены "ё" на "е", поэтому индекс
+        очищается и заполняется заново.
+        """
+        conn.execute("INSERT INTO notes_fts (notes_fts) VALUES ('delete-all')")
+        conn.execute(f"""
+            INSERT INTO notes_fts (rowid, peer_id, keyword, text)
+            SELECT id, peer_id, {_fold_yo_sql("keyword")}, {_fold_yo_sql("text")} FROM notes
+        """)
+        logger.debug("Полнотекстовый индекс заметок перестроен.")
 
-    def _get_note_text_sync(self, keyword: str, peer_id: int) -> Optional[str]:
+    def _migrate_keyword_norm(self, conn: sqlite3.Connection):
         """
-        Синхронное получение текста заметки из базы данных.
+        Перестраивает таблицу заметок старого формата (UNIQUE(peer_id, keyword),
+        поиск через LOWER) с заполнением keyword_norm.
+        Заметки, которые после нормализации совпали с более ранней заметкой того же чата,
+        переносятся в таблицу notes_duplicates для ручного разбора.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        cursor.execute("DROP TABLE IF EXISTS notes_new")
         cursor.execute("""
-            SELECT text FROM notes
-            WHERE peer_id = ? AND LOWER(keyword) = LOWER(?)
-            """,
-            (peer_id, keyword)
+            CREATE TABLE notes_new (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                peer_id INTEGER NOT NULL,
+                keyword TEXT NOT NULL,
+                keyword_norm TEXT NOT NULL,
+                text TEXT NOT NULL
+            )
+        """)
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS notes_duplicates (
+                id INTEGER PRIMARY KEY,
+                peer_id INTEGER NOT NULL,
+                keyword TEXT NOT NULL,
+                text TEXT NOT NULL,
+                duplicate_of INTEGER NOT NULL
+            )
+        """)
+        kept = {}
+        notes, duplicates = [], []
+        for note_id, peer_id, keyword, text in conn.execute(
+            "SELECT id, peer_id, keyword, text FROM notes ORDER BY id"
+        ):
+            keyword_norm = normalize_keyword(keyword)
+            original_id = kept.setdefault((peer_id, keyword_norm), note_id)
+            if original_id == note_id:
+                notes.append((note_id, peer_id, keyword, keyword_norm, text))
+            else:
+                duplicates.append((note_id, peer_id, keyword, text, original_id))
+        cursor.executemany(
+            "INSERT INTO notes_new (id, peer_id, keyword, keyword_norm, text) VALUES (?, ?, ?, ?, ?)",
+            notes,
         )
-        row = cursor.fetchone()
-        conn.close()
-        if row:
-            logger.debug(f"Заметка найдена для ключевого слова '{keyword}' и peer_id '{peer_id}'.")
-            return row[0]
-        logger.debug(f"Заметка не найдена для ключевого слова '{keyword}' и peer_id '{peer_id}'.")
-        return None
+        cursor.executemany(
+            "INSERT INTO notes_duplicates (id, peer_id, keyword, text, duplicate_of) VALUES (?, ?, ?, ?, ?)",
+            duplicates,
+        )
+        cursor.execute("DROP TABLE notes")
+        cursor.execute("ALTER TABLE notes_new RENAME TO notes")
+        logger.info(f"Таблица 'notes' перестроена: заметок {len(notes)}, дубликатов {len(duplicates)}.")
+        for note_id, peer_id, keyword, _, original_id in duplicates:
+            logger.warning(
+                f"Заметка '{keyword}' (id {note_id}) в peer_id '{peer_id}' совпадает с заметкой id {original_id} "
+                f"и перенесена в notes_duplicates."
+            )
 
-    async def get_keywords(self, peer_id: int) -> Optional[str]:
+    async def get_note_text(self, keyword: str, peer_id: int) -> Optional[str]:
         """
-        Получение списка доступных ключевых слов для заметок.
+        Получение текста заметки по ключевому слову и peer_id.
+        Ответ берётся из кэша заметок чата; при первом обращении к чату
+        все его заметки загружаются одним запросом.
+        :param keyword: Ключевое слово заметки.
         :param peer_id: Идентификатор чата (peer_id).
-        :return: Строка со списком ключевых слов или None, если заметок нет.
+        :return: Текст заметки или None, если не найдено.
         """
-        async with self.lock:
-            keywords = await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._get_keywords_sync,
-                peer_id
-            )
-        if keywords:
-            formatted_keywords = "\n- " + "\n- ".join(keywords)
-            return f"Доступные заметки:{formatted_keywords}"
-        return None
+        notes = await self._get_peer_notes(peer_id)
+        return notes.get(normalize_keyword(keyword))
+
+    async def _get_peer_notes(self, peer_id: int) -> Dict[str, str]:
+        notes = self.note_cache.get(peer_id)
+        if notes is not None:
+            self.note_cache.move_to_end(peer_id)
+            return notes
+        version = self._cache_versions.get(peer_id, 0)
+        notes = await self.db.read(self._load_peer_notes_sync, peer_id)
+        if version == self._cache_versions.get(peer_id, 0):
+            self.note_cache[peer_id] = notes
+            if len(self.note_cache) > self.cache_chats:
+                self.note_cache.popitem(last=False)
+        return notes
 
-    def _get_keywords_sync(self, peer_id: int) -> List[str]:
+    def _load_peer_notes_sync(self, conn: sqlite3.Connection, peer_id: int) -> Dict[str, str]:
         """
-        Синхронное получение всех ключевых слов заметок из базы данных.
+        Синхронная загрузка всех заметок чата.
         """
-        conn = sqlite3.connect(self.db_path)
-        cursor = conn.cursor()
-        cursor.execute("""
-            SELECT keyword FROM notes
+        notes = dict(conn.execute(
+            "SELECT keyword_norm, text FROM notes WHERE peer_id = ?",
+            (peer_id,)
+        ).fetchall())
+        logger.debug(f"Загружено заметок для peer_id '{peer_id}': {len(notes)}.")
+        return notes
+
+    def _invalidate_peer(self, peer_id: int, keep_suggestions: bool = False):
+        """
+        Сбрасывает кэш чата после записи; чат перечитывается при следующем обращении.
+        :param keep_suggestions: Не сбрасывать индекс подсказок (вызывающий обновит его сам).
+        """
+        self._cache_versions[peer_id] = self._cache_versions.get(peer_id, 0) + 1
+        self.note_cache.pop(peer_id, None)
+        if not keep_suggestions:
+            self.suggestion_indexes.pop(peer_id, None)
+
+    async def get_suggestions(self, keyword: str, peer_id: int, limit: int = SUGGESTIONS) -> List[str]:
+        """
+        Названия заметок чата, похожие на keyword (для ответа "возможно, вы имели в виду").
+        :param keyword: Ключевое слово, заметки с которым не нашлось.
+        :param peer_id: Идентификатор чата (peer_id).
+        :param limit: Максимальное количество подсказок.
+        :return: Названия заметок по убыванию похожести.
+        """
+        index = self.suggestion_indexes.get(peer_id)
+        if index is not None:
+            self.suggestion_indexes.move_to_end(peer_id)
+        else:
+            version = self._cache_versions.get(peer_id, 0)
+            rows = await self.db.fetchall(
+                "SELECT keyword_norm, keyword FROM notes WHERE peer_id = ?",
+                (peer_id,)
+            )
+            index = TrigramIndex()
+            for keyword_norm, note_keyword in rows:
+                index.add(keyword_norm, note_keyword)
+            if version == self._cache_versions.get(peer_id, 0):
+                self.suggestion_indexes[peer_id] = index
+                if len(self.suggestion_indexes) > self.cache_chats:
+                    self.suggestion_indexes.popitem(last=False)
+        return index.search(normalize_keyword(keyword), limit)
+
+    async def get_keywords_page(
+        self,
+        peer_id: int,
+        after: Optional[str] = None,
+        before: Optional[str] = None,
+        start: Optional[str] = None,
+    ) -> Tuple[List[Tuple[str, str]], bool, bool]:
+        """
+        Страница ключевых слов заметок в алфавитном порядке (keyset-пагинация
+        по индексу (peer_id, keyword_norm): страница читается одним проходом по индексу
+        независимо от её номера).
+        Страница содержит не больше NOTES_PAGE_SIZE названий и не длиннее MESSAGE_LIMIT символов.
+        :param peer_id: Идентификатор чата (peer_id).
+        :param after: Нормализованное слово, после которого начинается страница.
+        :param before: Нормализованное слово, перед которым заканчивается страница.
+        :param start: Начало страницы: первое слово, не меньшее start.
+        :return: ([(ключевое слово, нормализованное слово)], есть предыдущая страница,
+                 есть следующая страница).
+        """
+        rows = await self.db.read(
+            self._get_keywords_page_sync,
+            peer_id,
+            after,
+            before,
+            start
+        )
+        keywords = []
+        length = 0
+        for keyword, keyword_norm in rows[:NOTES_PAGE_SIZE]:
+            length += len(keyword) + 3
+            if length > MESSAGE_LIMIT and keywords:
+                break
+            keywords.append((keyword, keyword_norm))
+        more = len(rows) > len(keywords)
+        if before is not None:
+            keywords.reverse()
+            return keywords, more, True
+        return keywords, after is not None or start is not None, more
+
+    def _get_keywords_page_sync(
+        self,
+        conn: sqlite3.Connection,
+        peer_id: int,
+        after: Optional[str],
+        before: Optional[str],
+        start: Optional[str],
+    ) -> List[Tuple[str, str]]:
+        """
+        Синхронное чтение страницы ключевых слов (на одну строку больше страницы,
+        чтобы узнать, есть ли следующая). Для before строки идут в обратном порядке.
+        """
+        if before is not None:
+            query = "WHERE peer_id = ? AND keyword_norm < ? ORDER BY keyword_norm DESC"
+            params = (peer_id, before)
+        elif after is not None:
+            query = "WHERE peer_id = ? AND keyword_norm > ? ORDER BY keyword_norm"
+            params = (peer_id, after)
+        elif start is not None:
+            query = "WHERE peer_id = ? AND keyword_norm >= ? ORDER BY keyword_norm"
+            params = (peer_id, start)
+        else:
+            query = "WHERE peer_id = ? ORDER BY keyword_norm"
+            params = (peer_id,)
+        return conn.execute(
+            f"SELECT keyword, keyword_norm FROM notes {query} LIMIT ?",
+            (*params, NOTES_PAGE_SIZE + 1)
+        ).fetchall()
+
+    async def get_keyword_index(self, peer_id: int) -> List[Tuple[str, int]]:
+        """
+        Алфавитный указатель заметок чата: первая буква и количество заметок на неё.
+        """
+        return await self.db.fetchall(
+            """
+            SELECT substr(keyword_norm, 1, 1) AS letter, COUNT(*) FROM notes
             WHERE peer_id = ?
+            GROUP BY letter ORDER BY letter
             """,
             (peer_id,)
         )
-        rows = cursor.fetchall()
-        conn.close()
-        if rows:
-            return [row[0] for row in rows]
-        return []
 
     async def add_note(self, keyword: str, text: str, peer_id: int) -> bool:
         """
@@ -112,49 +381,48 @@ class NoteManager:
         :param peer_id: Идентификатор чата (peer_id).
         :return: True, если заметка была обновлена, False если создана новая.
         """
-        async with self.lock:
-            updated = await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._add_note_sync,
-                keyword,
-                text,
-                peer_id
-            )
+        updated = await self.db.write(
+            self._add_note_sync,
+            keyword,
+            text,
+            peer_id
+        )
+        self._invalidate_peer(peer_id, keep_suggestions=True)
+        index = self.suggestion_indexes.get(peer_id)
+        if index is not None:
+            index.add(normalize_keyword(keyword), keyword)
         return updated
 
-    def _add_note_sync(self, keyword: str, text: str, peer_id: int) -> bool:
+    def _add_note_sync(self, conn: sqlite3.Connection, keyword: str, text: str, peer_id: int) -> bool:
         """
         Синхронное добавление или обновление заметки в базе данных.
         :return: True, если обновлена, False если добавлена новая.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
+        keyword_norm = normalize_keyword(keyword)
         try:
             # Проверяем, существует ли уже заметка с таким ключевым словом
             cursor.execute("""
                 SELECT 1 FROM notes
-                WHERE peer_id = ? AND LOWER(keyword) = LOWER(?)
+                WHERE peer_id = ? AND keyword_norm = ?
             """,
-            (peer_id, keyword)
+            (peer_id, keyword_norm)
             )
             exists = cursor.fetchone() is not None
 
             # Вставляем новую заметку или обновляем существующую
             cursor.execute("""
-                INSERT INTO notes (peer_id, keyword, text)
-                VALUES (?, ?, ?)
-                ON CONFLICT(peer_id, keyword) DO UPDATE SET text=excluded.text
+                INSERT INTO notes (peer_id, keyword, keyword_norm, text)
+                VALUES (?, ?, ?, ?)
+                ON CONFLICT(peer_id, keyword_norm) DO UPDATE SET text=excluded.text
             """,
-            (peer_id, keyword, text)
+            (peer_id, keyword, keyword_norm, text)
             )
-            conn.commit()
-            conn.close()
 
             logger.debug(f"Заметка '{keyword}' для peer_id '{peer_id}' {'обновлена' if exists else 'создана'}.")
             return exists
         except sqlite3.Error as e:
             logger.error(f"Ошибка при добавлении/обновлении заметки '{keyword}' для peer_id '{peer_id}': {e}")
-            conn.close()
             return False
 
     async def delete_note(self, keyword: str, peer_id: int) -> bool:
@@ -164,32 +432,31 @@ class NoteManager:
         :param peer_id: Идентификатор чата (peer_id).
         :return: True, если заметка была удалена, False иначе.
         """
-        async with self.lock:
-            deleted = await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._delete_note_sync,
-                keyword,
-                peer_id
-            )
+        deleted = await self.db.write(
+            self._delete_note_sync,
+            keyword,
+            peer_id
+        )
+        self._invalidate_peer(peer_id, keep_suggestions=True)
+        index = self.suggestion_indexes.get(peer_id)
+        if index is not None and deleted:
+            index.remove(normalize_keyword(keyword))
         return deleted
 
-    def _delete_note_sync(self, keyword: str, peer_id: int) -> bool:
+    def _delete_note_sync(self, conn: sqlite3.Connection, keyword: str, peer_id: int) -> bool:
         """
         Синхронное удаление заметки из базы данных.
         :return: True, если заметка была удалена, False иначе.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute("""
                 DELETE FROM notes
-                WHERE peer_id = ? AND LOWER(keyword) = LOWER(?)
+                WHERE peer_id = ? AND keyword_norm = ?
             """,
-            (peer_id, keyword)
+            (peer_id, normalize_keyword(keyword))
             )
-            conn.commit()
             deleted = cursor.rowcount > 0
-            conn.close()
             if deleted:
                 logger.debug(f"Заметка '{keyword}' удалена для peer_id '{peer_id}'.")
             else:
@@ -197,7 +464,6 @@ class NoteManager:
             return deleted
         except sqlite3.Error as e:
             logger.error(f"Ошибка при удалении заметки '{keyword}' для peer_id '{peer_id}': {e}")
-            conn.close()
             return False
 
     async def delete_all_notes(self, peer_id: int) -> None:
@@ -205,18 +471,16 @@ class NoteManager:
         Удаление всех заметок для заданного чата.
         :param peer_id: Идентификатор чата (peer_id).
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._delete_all_notes_sync,
-                peer_id
-            )
+        await self.db.write(
+            self._delete_all_notes_sync,
+            peer_id
+        )
+        self._invalidate_peer(peer_id)
 
-    def _delete_all_notes_sync(self, peer_id: int) -> None:
+    def _delete_all_notes_sync(self, conn: sqlite3.Connection, peer_id: int) -> None:
         """
         Синхронное удаление всех заметок из базы данных для заданного peer_id.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute("""
@@ -225,56 +489,192 @@ class NoteManager:
             """,
             (peer_id,)
             )
-            conn.commit()
-            conn.close()
             logger.debug(f"Все заметки удалены для peer_id '{peer_id}'.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка при удалении всех заметок для peer_id '{peer_id}': {e}")
-            conn.close()
 
-    async def import_notes(self, from_cid: int, to_pid: int) -> None:
+    async def import_notes(self, from_cid: int, to_pid: int) -> int:
         """
         Импорт заметок из одного чата в другой.
         :param from_cid: Идентификатор исходного чата.
         :param to_pid: Идентификатор целевого чата.
+        :return: Количество скопированных заметок.
         """
-        async with self.lock:
-            await asyncio.get_event_loop().run_in_executor(
-                None,
-                self._import_notes_sync,
-                from_cid,
-                to_pid
-            )
+        imported = await self.db.write(
+            self._import_notes_sync,
+            from_cid,
+            to_pid
+        )
+        self._invalidate_peer(to_pid)
+        return imported
 
-    def _import_notes_sync(self, from_cid: int, to_pid: int) -> None:
+    def _import_notes_sync(self, conn: sqlite3.Connection, from_cid: int, to_pid: int) -> int:
         """
-        Синхронное копирование заметок из одного чата в другой.
+        Синхронное копирование заметок из одного чата в другой одним INSERT ... SELECT.
+        :return: Количество скопированных заметок.
         """
-        conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         try:
             cursor.execute("""
-                SELECT keyword, text FROM notes
+                INSERT INTO notes (peer_id, keyword, keyword_norm, text)
+                SELECT ?, keyword, keyword_norm, text FROM notes
                 WHERE peer_id = ?
+                ON CONFLICT(peer_id, keyword_norm) DO UPDATE SET text=excluded.text
             """,
-            (from_cid,)
+            (to_pid, from_cid)
             )
-            rows = cursor.fetchall()
-            for row in rows:
-                keyword, text = row
-                cursor.execute("""
-                    INSERT INTO notes (peer_id, keyword, text)
-                    VALUES (?, ?, ?)
-                    ON CONFLICT(peer_id, keyword) DO UPDATE SET text=excluded.text
-                """,
-                (to_pid, keyword, text)
-                )
-            conn.commit()
-            conn.close()
-            logger.debug(f"Заметки импортированы из peer_id '{from_cid}' в peer_id '{to_pid}'.")
+            logger.debug(f"Заметки импортированы из peer_id '{from_cid}' в peer_id '{to_pid}': {cursor.rowcount}.")
+            return cursor.rowcount
         except sqlite3.Error as e:
             logger.error(f"Ошибка при импорте заметок из peer_id '{from_cid}' в peer_id '{to_pid}': {e}")
-            conn.close()
+            conn.rollback()
+            return 0
+
+    async def bulk_import_notes(
+        self,
+        notes: Iterable[Tuple[int, str, str]],
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+        progress: Optional[Callable[[int], None]] = None,
+        defer_search_index: bool = False,
+    ) -> int:
+        """
+        Пакетный импорт заметок (создание или обновление).
+        Заметки читаются из итератора частями по chunk_size, каждая часть
+        записывается одним executemany в одной транзакции.
+        :param notes: Итератор (peer_id, keyword, text).
+        :param chunk_size: Размер части.
+        :param progress: Вызывается после каждой части с общим числом записанных заметок.
+        :param defer_search_index: Не обновлять поисковый индекс по каждой заметке,
+                                   а перестроить его целиком после импорта
+                                   (быстрее для больших импортов; до конца импорта
+                                   поиск не видит новые заметки).
+        :return: Количество записанных заметок.
+        """
+        total = 0
+        iterator = iter(notes)
+        if defer_search_index:
+            await self.db.write(self._drop_search_triggers)
+        try:
+            while True:
+                chunk = [
+                    (peer_id, keyword, normalize_keyword(keyword), text)
+                    for peer_id, keyword, text in islice(iterator, chunk_size)
+                ]
+                if not chunk:
+                    break
+                await self.db.write(self._bulk_import_sync, chunk)
+                for peer_id in {row[0] for row in chunk}:
+                    self._invalidate_peer(peer_id)
+                total += len(chunk)
+                if progress is not None:
+                    progress(total)
+        finally:
+            if defer_search_index:
+                await self.db.write(self._create_search_index)
+                await self.rebuild_search_index()
+        logger.debug(f"Пакетно импортировано заметок: {total}.")
+        return total
+
+    def _drop_search_triggers(self, conn: sqlite3.Connection):
+        for trigger in ("notes_fts_insert", "notes_fts_delete", "notes_fts_update"):
+            conn.execute(f"DROP TRIGGER IF EXISTS {trigger}")
+
+    def _bulk_import_sync(self, conn: sqlite3.Connection, rows: List[Tuple[int, str, str, str]]):
+        """
+        Синхронная запись части пакетного импорта.
+        """
+        conn.executemany("""
+            INSERT INTO notes (peer_id, keyword, keyword_norm, text)
+            VALUES (?, ?, ?, ?)
+            ON CONFLICT(peer_id, keyword_norm) DO UPDATE SET text=excluded.text
+        """,
+        rows
+        )
+
+    async def export_notes(
+        self,
+        peer_id: Optional[int] = None,
+        chunk_size: int = IMPORT_CHUNK_SIZE,
+    ) -> AsyncIterator[Tuple[int, str, str]]:
+        """
+        Потоковая выгрузка заметок, упорядоченных по чату и ключевому слову.
+        Заметки читаются частями по индексу (peer_id, keyword_norm), память не зависит от размера базы.
+        :param peer_id: Выгрузить только заметки этого чата (None — все).
+        :param chunk_size: Размер части.
+        :return: Асинхронный итератор (peer_id, keyword, text).
+        """
+        cursor = (peer_id if peer_id is not None else -(2 ** 63), "")
+        while True:
+            rows = await self.db.read(self._export_notes_sync, cursor, peer_id, chunk_size)
+            for row_peer_id, keyword, _, text in rows:
+                yield row_peer_id, keyword, text
+            if len(rows) < chunk_size:
+                break
+            cursor = (rows[-1][0], rows[-1][2])
+
+    def _export_notes_sync(
+        self,
+        conn: sqlite3.Connection,
+        cursor: Tuple[int, str],
+        peer_id: Optional[int],
+        chunk_size: int,
+    ) -> List[Tuple[int, str, str, str]]:
+        """
+        Синхронное чтение части выгрузки после курсора (peer_id, keyword_norm).
+        """
+        where = "(peer_id, keyword_norm) > (?, ?)"
+        params = cursor
+        if peer_id is not None:
+            where += " AND peer_id = ?"
+            params += (peer_id,)
+        return conn.execute(
+            f"""
+            SELECT peer_id, keyword, keyword_norm, text FROM notes
+            WHERE {where}
+            ORDER BY peer_id, keyword_norm
+            LIMIT ?
+            """,
+            (*params, chunk_size)
+        ).fetchall()
+
+    async def search_notes(self, query: str, peer_id: int, limit: int = SEARCH_RESULTS) -> List[Tuple[str, str]]:
+        """
+        Полнотекстовый поиск заметок чата.
+        Каждое слово запроса ищется как начало слова в названии или тексте заметки
+        (без различия "ё" и "е"),
+        результаты упорядочены по релевантности (bm25, совпадения в названии весомее).
+        :param query: Поисковый запрос.
+        :param peer_id: Идентификатор чата (peer_id).
+        :param limit: Максимальное количество результатов.
+        :return: Список (ключевое слово, фрагмент текста с выделенными совпадениями).
+        """
+        words = self.SEARCH_WORD_PATTERN.findall(fold_yo(query))
+        if not words:
+            return []
+        match = f"peer_id : {int(peer_id)} AND " + " AND ".join(f'{{keyword text}} : "{word}"*' for word in words)
+        return await self.db.read(self._search_notes_sync, match, limit)
+
+    def _search_notes_sync(self, conn: sqlite3.Connection, match: str, limit: int) -> List[Tuple[str, str]]:
+        """
+        Синхронный поиск по полнотекстовому индексу.
+        """
+        rows = conn.execute("""
+            SELECT notes.keyword, snippet(notes_fts, 2, '[', ']', '…', 12)
+            FROM notes_fts JOIN notes ON notes.id = notes_fts.rowid
+            WHERE notes_fts MATCH ?
+            ORDER BY bm25(notes_fts, 0.0, 10.0, 1.0)
+            LIMIT ?
+            """,
+            (match, limit)
+        ).fetchall()
+        logger.debug(f"Поиск заметок '{match}': найдено {len(rows)}.")
+        return rows
+
+    async def rebuild_search_index(self) -> None:
+        """
+        Перестроение полнотекстового индекса (например, после правки базы вручную).
+        """
+        await self.db.write(self._rebuild_search_index_sync)
 
     def parse_note(self, text: str) -> Tuple[Optional[str], Optional[str]]:
         """
@@ -313,6 +713,47 @@ class NoteManager:
         logger.debug("Не удалось распарсить заметку.")
         return None, None
 
+    def register_commands(self, router: CommandRouter, module: Optional[str] = "notes"):
+        """
+        Регистрация команд модуля заметок в маршрутизаторе.
+        :param router: Общий маршрутизатор команд.
+        :param module: Название модуля чата.
+        """
+        for trigger in ("заметка ", "!заметка "):
+            router.add(module, trigger, self._command_show_note)
+        for trigger in ("заметки", "!заметки", "/заметки"):
+            router.add(module, trigger, self._command_list_notes)
+            router.add(module, trigger + " по алфавиту", self._command_keyword_index, exact=True)
+        for trigger in ("новая заметка ", "!новая заметка "):
+            router.add(module, trigger, self._command_add_note)
+        for trigger in ("!удалить ", "/удалить "):
+            # "/удалить модуль" — команда администратора, а не удаление заметки
+            router.add(module, trigger, self._command_delete_note, pattern=self.DELETE_PATTERN)
+        for trigger in ("поиск заметок ", "!поиск заметок ", "/поиск заметок "):
+            router.add(module, trigger, self._command_search_notes)
+        router.add(module, "/перестроить поиск заметок", self._command_rebuild_search, exact=True, admin=True)
+        router.add(module, "/команды заметки", self._command_help, exact=True)
+        # "!название" и "/название" — поиск заметки, если это не команда другого модуля
+        for trigger in ("!", "/"):
+            router.add(module, trigger, self._command_find_note, fallback=True)
+
+        # АДМИНСКИЕ КОМАНДЫ ДЛЯ МОДУЛЯ ЗАМЕТОК ВРЕМЕННО НЕ РАБОТАЮТ
+        # "/удалить все заметки":
+        #     await self.delete_all_notes(peer_id)
+        #     return "Все заметки в этом чате были удалены"
+        # "/импорт заметок ":
+        #     ids = text[15:].split()
+        #     imported_ids = []
+        #     for num in ids:
+        #         if num.isdigit():
+        #             from_cid = int(num)
+        #             await self.import_notes(from_cid, peer_id)
+        #             imported_ids.append(num)
+        #     if imported_ids:
+        #         return "Заметки импортированы"
+        #     else:
+        #         return "Не указаны корректные peer_id для импорта."
+
     async def check_note_events(self, message) -> Optional[str]:
         """
         Обработка событий сообщений для работы с заметками.
@@ -327,111 +768,142 @@ class NoteManager:
             logger.debug("Пустое сообщение или отсутствует peer_id. Пропуск.")
             return None
 
-        lower_text = text.lower()
-
-        if lower_text.startswith("заметка "):
-            keyword = text[7:].strip()
-            logger.debug(f"Обработка команды 'заметка': keyword='{keyword}'")
-            note_text = await self.get_note_text(keyword, peer_id)
-            if note_text is None:
-                note_text = "Такой заметки не нашлось :("
-            return note_text
-
-        elif lower_text.startswith("!заметка "):
-            keyword = text[8:].strip()
-            logger.debug(f"Обработка команды '!заметка': keyword='{keyword}'")
-            note_text = await self.get_note_text(keyword, peer_id)
-            if note_text is None:
-                note_text = "Такой заметки не нашлось :("
-            return note_text
-
-        elif lower_text.startswith("заметки") or lower_text.startswith("!заметки") or lower_text.startswith("/заметки"):
-            logger.debug("Обработка команды просмотра всех заметок.")
-            keywords = await self.get_keywords(peer_id)
-            if keywords is None:
-                keywords = (
+        responses = await self.router.dispatch(message)
+        return responses[0] if responses else None
+
+    async def _command_show_note(self, message, keyword: str) -> Optional[str]:
+        keyword = keyword.strip()
+        logger.debug(f"Обработка команды 'заметка': keyword='{keyword}'")
+        note_text = await self.get_note_text(keyword, message['peer_id'])
+        if note_text is None:
+            note_text = "Такой заметки не нашлось :("
+            suggestions = await self.get_suggestions(keyword, message['peer_id'])
+            if suggestions:
+                note_text += "\nВозможно, вы имели в виду: " + ", ".join(suggestions)
+        return note_text
+
+    async def _command_list_notes(self, message, start: str) -> Union[str, dict, None]:
+        """
+        Страница списка заметок. Кнопки страниц присылают курсор в payload,
+        "заметки <буква>" открывает список с заданного начала.
+        """
+        peer_id = message['peer_id']
+        payload = self._parse_payload(message)
+        after = payload.get("notes_after")
+        before = payload.get("notes_before")
+        start = normalize_keyword(start) if after is None and before is None else ""
+        logger.debug(f"Обработка команды просмотра заметок: after='{after}', before='{before}', start='{start}'")
+        keywords, has_prev, has_next = await self.get_keywords_page(peer_id, after, before, start or None)
+        if not keywords:
+            if after is None and before is None and not start:
+                return (
                     "Вы еще не создали ни одной заметки. Чтобы создать заметку, напишите:\n\n"
                     "Новая заметка \"Название\"\nТекст заметки"
                 )
-            return keywords
-
-        elif lower_text.startswith("!новая заметка ") or lower_text.startswith("новая заметка "):
-            # Извлечение текста после команды
-            if lower_text.startswith("!новая заметка "):
-                command_length = len("!новая заметка ")
-            else:
-                command_length = len("новая заметка ")
-            note_command_text = text[command_length:].strip()
-            logger.debug(f"Обработка команды создания/обновления заметки: '{note_command_text}'")
-            keyword, note_text = self.parse_note(note_command_text)
-            if keyword and note_text:
-                updated = await self.add_note(keyword, note_text, peer_id)
-                response = f"Заметка {'обновлена' if updated else 'создана'}"
-                logger.debug(f"Заметка '{keyword}' {'обновлена' if updated else 'создана'} для peer_id '{peer_id}'.")
-                return response
-            else:
-                logger.debug("Некорректный формат команды создания заметки.")
-                return (
-                    "Необходимо указать название и текст новой заметки. Пример:\n"
-                    "Новая заметка \"Правила\" Текст правил"
-                )
-
-        elif (lower_text.startswith("!удалить ") or lower_text.startswith("/удалить ")) and "модуль" not in lower_text:
-            # Извлечение названия заметки для удаления
-            delete_command_text = text[9:].strip()
-            if not delete_command_text:
-                logger.debug("Необходимо указать название заметки для удаления.")
-                return "Необходимо указать название заметки для удаления."
-            keyword = delete_command_text
-            logger.debug(f"Обработка команды удаления заметки: keyword='{keyword}'")
-            deleted = await self.delete_note(keyword, peer_id)
-            if deleted:
-                response = f"Заметка '{keyword}' удалена."
-                logger.debug(f"Заметка '{keyword}' успешно удалена для peer_id '{peer_id}'.")
-            else:
-                response = f"Заметка '{keyword}' не найдена."
-                logger.debug(f"Заметка '{keyword}' не найдена для peer_id '{peer_id}'.")
+            return "Заметок дальше нет."
+        text = "Доступные заметки:\n- " + "\n- ".join(keyword for keyword, _ in keywords)
+        buttons = []
+        if has_prev:
+            buttons.append(("Заметки ◀", {"notes_before": self._cursor(keywords[0][1])}))
+        if has_next:
+            buttons.append(("Заметки ▶", {"notes_after": self._cursor(keywords[-1][1])}))
+        if not buttons:
+            return text
+        return {"text": text, "keyboard": create_keyboard([buttons], inline=True)}
+
+    async def _command_keyword_index(self, message, _) -> Optional[str]:
+        logger.debug("Обработка команды алфавитного указателя заметок.")
+        index = await self.get_keyword_index(message['peer_id'])
+        if not index:
+            return "Вы еще не создали ни одной заметки."
+        letters = ", ".join(f"{letter.upper()} ({count})" for letter, count in index)
+        return f"Заметки по алфавиту:\n{letters}\n\nСписок с нужной буквы: заметки <буква>"
+
+    @staticmethod
+    def _parse_payload(message) -> dict:
+        try:
+            payload = json.loads(message.get('payload') or "{}")
+        except ValueError:
+            return {}
+        return payload if isinstance(payload, dict) else {}
+
+    @staticmethod
+    def _cursor(keyword_norm: str) -> str:
+        # payload кнопки VK ограничен 255 байтами; при обрезанном курсоре
+        # длинное название может повториться на соседней странице
+        return keyword_norm.encode()[:CURSOR_BYTES].decode(errors='ignore')
+
+    async def _command_add_note(self, message, note_command_text: str) -> Optional[str]:
+        peer_id = message['peer_id']
+        note_command_text = note_command_text.strip()
+        logger.debug(f"Обработка команды создания/обновления заметки: '{note_command_text}'")
+        keyword, note_text = self.parse_note(note_command_text)
+        if keyword and note_text:
+            updated = await self.add_note(keyword, note_text, peer_id)
+            response = f"Заметка {'обновлена' if updated else 'создана'}"
+            logger.debug(f"Заметка '{keyword}' {'обновлена' if updated else 'создана'} для peer_id '{peer_id}'.")
             return response
-
-        elif lower_text == "/команды заметки":
-            logger.debug("Обработка команды '/команды заметки'.")
-            commands = (
-                "• Создание или обновление заметок:\n"
-                "Новая заметка \"Правила\" Текст\n<или>\n"
-                "Новая заметка Правила гильдии\nТекст с новой строки\n\n"
-                "• Удаление заметок:\n!удалить Правила гильдии\n\n"
-                "• Просмотр всех заметок:\n!заметки\n\n"
-                "• Просмотр одной заметки:\nЗаметка экспедиции\n<или>\n!экспедиции"
+        else:
+            logger.debug("Некорректный формат команды создания заметки.")
+            return (
+                "Необходимо указать название и текст новой заметки. Пример:\n"
+                "Новая заметка \"Правила\" Текст правил"
             )
-            return commands
-
-        # АДМИНСКИЕ КОМАНДЫ ДЛЯ МОДУЛЯ ЗАМЕТОК ВРЕМЕННО НЕ РАБОТАЮТ
-        # elif from_id == admin_id:
-        #     if lower_text == "/удалить все заметки":
-        #         await self.delete_all_notes(peer_id)
-        #         return "Все заметки в этом чате были удалены"
-
-        #     elif lower_text.startswith("/импорт заметок "):
-        #         ids = text[15:].split()
-        #         imported_ids = []
-        #         for num in ids:
-        #             if num.isdigit():
-        #                 from_cid = int(num)
-        #                 await self.import_notes(from_cid, peer_id)
-        #                 imported_ids.append(num)
-        #         if imported_ids:
-        #             return "Заметки импортированы"
-        #         else:
-        #             return "Не указаны корректные peer_id для импорта."
-
-        elif text.startswith("!") or text.startswith("/"):
-            keyword = text[1:].strip()
-            if keyword:
-                logger.debug(f"Обработка команды поиска заметки по ключевому слову '{keyword}'.")
-                note_text = await self.get_note_text(keyword, peer_id)
-                if note_text is not None:
-                    return note_text
-            logger.debug("Нет заметки для заданного ключевого слова.")
-            return None
 
+    async def _command_delete_note(self, message, match: re.Match) -> Optional[str]:
+        peer_id = message['peer_id']
+        # Извлечение названия заметки для удаления
+        keyword = match.group(1).strip()
+        if not keyword:
+            logger.debug("Необходимо указать название заметки для удаления.")
+            return "Необходимо указать название заметки для удаления."
+        logger.debug(f"Обработка команды удаления заметки: keyword='{keyword}'")
+        deleted = await self.delete_note(keyword, peer_id)
+        if deleted:
+            response = f"Заметка '{keyword}' удалена."
+            logger.debug(f"Заметка '{keyword}' успешно удалена для peer_id '{peer_id}'.")
+        else:
+            response = f"Заметка '{keyword}' не найдена."
+            logger.debug(f"Заметка '{keyword}' не найдена для peer_id '{peer_id}'.")
+        return response
+
+    async def _command_search_notes(self, message, query: str) -> Optional[str]:
+        query = query.strip()
+        logger.debug(f"Обработка команды поиска заметок: query='{query}'")
+        results = await self.search_notes(query, message['peer_id'])
+        if not results:
+            return "Заметок по запросу не нашлось :("
+        lines = ["Найденные заметки:"]
+        for keyword, snippet in results:
+            snippet = " ".join(snippet.split())
+            lines.append(f"- {keyword}: {snippet}" if snippet else f"- {keyword}")
+        return "\n".join(lines)
+
+    async def _command_rebuild_search(self, message, _) -> Optional[str]:
+        logger.debug("Обработка команды перестроения поиска заметок.")
+        await self.rebuild_search_index()
+        return "Поисковый индекс заметок перестроен."
+
+    async def _command_help(self, message, _) -> Optional[str]:
+        logger.debug("Обработка команды '/команды заметки'.")
+        commands = (
+            "• Создание или обновление заметок:\n"
+            "Новая заметка \"Правила\" Текст\n<или>\n"
+            "Новая заметка Правила гильдии\nТекст с новой строки\n\n"
+            "• Удаление заметок:\n!удалить Правила гильдии\n\n"
+            "• Просмотр всех заметок:\n!заметки\n<или с нужной буквы>\n!заметки К\n\n"
+            "• Алфавитный указатель заметок:\n!заметки по алфавиту\n\n"
+            "• Просмотр одной заметки:\nЗаметка экспедиции\n<или>\n!экспедиции\n\n"
+            "• Поиск по названиям и текстам заметок:\nПоиск заметок данж ключ"
+        )
+        return commands
+
+    async def _command_find_note(self, message, keyword: str) -> Optional[str]:
+        keyword = keyword.strip()
+        if keyword:
+            logger.debug(f"Обработка команды поиска заметки по ключевому слову '{keyword}'.")
+            note_text = await self.get_note_text(keyword, message['peer_id'])
+            if note_text is not None:
+                return note_text
+        logger.debug("Нет заметки для заданного ключевого слова.")
         return None
@@ -3,6 +3,8 @@
 import re
 from typing import Optional, Dict, Any
 from datetime import datetime
+from services.command_router import CommandRouter
+from modules.leaderboards import LeaderboardManager
 from utils.logger import logger
 
 
@@ -18,14 +20,174 @@ class ProfileManager:
         "luck": "🍀",     
     }
 
+    # Профиль игрового бота одним проходом: ID пользователя, уровень и строка
+    # характеристик в том порядке, в котором их присылает бот
+    PROFILE_PATTERN = re.compile(
+        r'\[id(\d+)\|.*?💀Уровень:\s*(\d+).*?👊(\d+)\s*🖐(\d+)\s*❤(\d+)\s*🍀(\d+)\s*🗡(\d+)\s*🛡(\d+)',
+        re.DOTALL,
+    )
+    PROFILE_FIELDS = ("user_id", "level", "strength", "agility", "endurance", "luck", "attack", "defense")
+    # Запасной разбор, если порядок полей другой: все поля одним finditer
+    FIELD_PATTERN = re.compile(
+        r'\[id(?P<user_id>\d+)\||(?P<stat>💀Уровень:\s*|👊|🖐|❤|🗡|🛡|🍀)(?P<value>\d+)'
+    )
+    # Характеристика по первому символу найденного маркера
+    STAT_BY_MARKER = {emoji: stat for stat, emoji in STAT_EMOJI.items()}
+    # Подстрока, без которой сообщение точно не является профилем
+    PROFILE_MARKER = "💀Уровень:"
+
+    # Команды истории профиля: "/прогресс [дней]", "/рост [дней]"
+    PROGRESS_PATTERN = re.compile(r'^/прогресс(?:\s+(\d+))?\s*$', re.IGNORECASE)
+    GROWTH_PATTERN = re.compile(r'^/рост(?:\s+(\d+))?\s*$', re.IGNORECASE)
+    DEFAULT_HISTORY_DAYS = 7
+
+    # Имя игрока из упоминания в профиле: "[id123|Имя]"
+    NAME_PATTERN = re.compile(r'\[id\d+\|([^\]]*)')
+    # Команды рейтингов: "/топ [характеристика] [N]", "/место [характеристика]"
+    TOP_PATTERN = re.compile(r'^/топ(?:\s+(\D\S*))?(?:\s+(\d+))?\s*$', re.IGNORECASE)
+    RANK_PATTERN = re.compile(r'^/место(?:\s+(\S+))?\s*$', re.IGNORECASE)
+    DEFAULT_TOP_SIZE = 10
+    MAX_TOP_SIZE = 50
+    # Названия характеристик в командах и в ответах ("#37 по удаче")
+    STAT_NAMES = {
+        "уровень": "level",
+        "ур": "level",
+        "сила": "strength",
+        "ловкость": "agility",
+        "выносливость": "endurance",
+        "атака": "attack",
+        "защита": "defense",
+        "удача": "luck",
+    }
+    STAT_TITLES = {
+        "level": "уровню",
+        "strength": "силе",
+        "agility": "ловкости",
+        "endurance": "выносливости",
+        "attack": "атаке",
+        "defense": "защите",
+        "luck": "удаче",
+    }
+
     def __init__(self, user_manager):
         """
         Инициализация менеджера профилей.
         :param user_manager: Экземпляр UserManager для работы с профилями.
         """
         self.user_manager = user_manager
+        self.leaderboards = LeaderboardManager(user_manager)
         logger.debug("Инициализация ProfileManager")
 
+    def register_commands(self, router: CommandRouter, game_bot_id: int, module: Optional[str] = "profiles"):
+        """
+        Регистрация в маршрутизаторе: модуль обрабатывает все сообщения игрового бота.
+        :param router: Общий маршрутизатор команд.
+        :param game_bot_id: ID игрового бота, присылающего профили.
+        :param module: Название модуля чата.
+        """
+        router.add_sender(module, game_bot_id, self._command_profile)
+        router.add(module, "/прогресс", self._command_progress, pattern=self.PROGRESS_PATTERN)
+        router.add(module, "/рост", self._command_growth, pattern=self.GROWTH_PATTERN)
+        router.add(module, "/топ", self._command_top, pattern=self.TOP_PATTERN)
+        router.add(module, "/место", self._command_rank, pattern=self.RANK_PATTERN)
+
+    async def _command_profile(self, message: Dict[str, Any], _) -> Optional[str]:
+        return await self.check_profile_events(message)
+
+    def _history_days(self, match: re.Match) -> int:
+        return max(1, int(match.group(1))) if match.group(1) else self.DEFAULT_HISTORY_DAYS
+
+    async def _command_progress(self, message: Dict[str, Any], match: re.Match) -> Optional[str]:
+        """
+        Изменение характеристик отправителя за последние N дней.
+        """
+        days = self._history_days(match)
+        change = await self.user_manager.get_profile_change(message.get('from_id'), days)
+        if not change:
+            return f"Недостаточно данных о профиле за последние {days} дн. Пришлите профиль ещё раз позже."
+        since = datetime.fromtimestamp(change["from_ts"]).strftime('%d.%m %H:%M')
+        stat_line = " ".join(
+            f"{emoji}{change[stat]:+d}" for stat, emoji in self.STAT_EMOJI.items()
+        )
+        return f"Изменения с {since}:\n{stat_line}"
+
+    async def _command_growth(self, message: Dict[str, Any], match: re.Match) -> Optional[str]:
+        """
+        Средний прирост характеристик отправителя в день за последние N дней.
+        """
+        days = self._history_days(match)
+        growth = await self.user_manager.get_profile_growth(message.get('from_id'), days)
+        if not growth:
+            return f"Недостаточно данных о профиле за последние {days} дн. Пришлите профиль ещё раз позже."
+        stat_line = " ".join(
+            f"{emoji}{growth[stat]:+.1f}" for stat, emoji in self.STAT_EMOJI.items()
+        )
+        return f"Прирост в день за {days} дн.:\n{stat_line}"
+
+    def _stat_from_command(self, name: Optional[str]) -> Optional[str]:
+        if not name:
+            return "level"
+        return self.STAT_NAMES.get(name.lower())
+
+    def _unknown_stat_message(self) -> str:
+        return "Неизвестная характеристика. Доступны: " + ", ".join(self.STAT_NAMES)
+
+    async def _command_top(self, message: Dict[str, Any], match: re.Match) -> Optional[str]:
+        """
+        Лучшие игроки чата по характеристике.
+        """
+        stat = self._stat_from_command(match.group(1))
+        if stat is None:
+            return self._unknown_stat_message()
+        limit = min(int(match.group(2)), self.MAX_TOP_SIZE) if match.group(2) else self.DEFAULT_TOP_SIZE
+        top = await self.leaderboards.get_top(message.get('peer_id'), stat, limit)
+        if not top:
+            return "В этом чате ещё не присылали профили."
+        emoji = self.STAT_EMOJI[stat]
+        lines = [f"Топ по {self.STAT_TITLES[stat]}:"]
+        for position, profile in enumerate(top, start=1):
+            name = profile.get("name") or f"id{profile['user_id']}"
+            lines.append(f"{position}. {name} — {emoji}{profile.get(stat) or 0}")
+        return "\n".join(lines)
+
+    async def _command_rank(self, message: Dict[str, Any], match: re.Match) -> Optional[str]:
+        """
+        Место отправителя в рейтинге чата по характеристике.
+        """
+        stat = self._stat_from_command(match.group(1))
+        if stat is None:
+            return self._unknown_stat_message()
+        rank = await self.leaderboards.get_rank(message.get('peer_id'), message.get('from_id'), stat)
+        if rank is None:
+            return "Вашего профиля ещё нет в рейтинге этого чата. Пришлите профиль."
+        position, total = rank
+        return f"Ты #{position} из {total} по {self.STAT_TITLES[stat]}"
+
+    @classmethod
+    def parse_profile(cls, text: str) -> Optional[Dict[str, int]]:
+        """
+        Разбор профиля за один проход по тексту
+        (для каждого поля берётся первое вхождение).
+        :param text: Текст сообщения.
+        :return: Словарь user_id и характеристик или None, если это не профиль.
+        """
+        if cls.PROFILE_MARKER not in text or "[id" not in text:
+            return None
+        match = cls.PROFILE_PATTERN.search(text)
+        if match:
+            return dict(zip(cls.PROFILE_FIELDS, map(int, match.groups())))
+
+        profile = {}
+        for match in cls.FIELD_PATTERN.finditer(text):
+            user_id = match.group("user_id")
+            if user_id is not None:
+                profile.setdefault("user_id", int(user_id))
+            else:
+                profile.setdefault(cls.STAT_BY_MARKER[match.group("stat")[0]], int(match.group("value")))
+        if len(profile) != len(cls.STAT_EMOJI) + 1:
+            return None
+        return profile
+
     async def check_profile_events(self, message: Dict[str, Any]) -> Optional[str]:
         """
         Обработка сообщений с профилями игроков.
@@ -40,73 +202,20 @@ class ProfileManager:
             logger.debug("Пустое сообщение. Пропуск.")
             return None
 
-        # Извлечение user_id из текста сообщения
-        user_id_match = re.search(r'\[id(\d+)\|', text)
-        if user_id_match:
-            user_id = int(user_id_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Регулярные выражения для извлечения полей
-        level_pattern = re.compile(r'💀Уровень:\s*(\d+)')
-        strength_pattern = re.compile(r'👊(\d+)')
-        agility_pattern = re.compile(r'🖐(\d+)')
-        endurance_pattern = re.compile(r'❤(\d+)')
-        attack_pattern = re.compile(r'🗡(\d+)')
-        defense_pattern = re.compile(r'🛡(\d+)')
-        luck_pattern = re.compile(r'🍀(\d+)')
-
-        # Извлечение уровня
-        level_match = level_pattern.search(text)
-        if level_match:
-            level = int(level_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение силы
-        strength_match = strength_pattern.search(text)
-        if strength_match:
-            strength = int(strength_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение ловкости
-        agility_match = agility_pattern.search(text)
-        if agility_match:
-            agility = int(agility_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение выносливости
-        endurance_match = endurance_pattern.search(text)
-        if endurance_match:
-            endurance = int(endurance_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение атаки
-        attack_match = attack_pattern.search(text)
-        if attack_match:
-            attack = int(attack_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение защиты
-        defense_match = defense_pattern.search(text)
-        if defense_match:
-            defense = int(defense_match.group(1))
-        else:
-            return None  # Возвращаем None вместо сообщения об ошибке
-
-        # Извлечение удачи
-        luck_match = luck_pattern.search(text)
-        if luck_match:
-            luck = int(luck_match.group(1))
-        else:
+        profile = self.parse_profile(text)
+        if profile is None:
             return None  # Возвращаем None вместо сообщения об ошибке
+        user_id = profile.pop("user_id")
+        strength = profile["strength"]
+        agility = profile["agility"]
+        endurance = profile["endurance"]
+        level = profile["level"]
+        attack = profile["attack"]
+        defense = profile["defense"]
+        luck = profile["luck"]
 
         # Получение существующего профиля
-        existing_profile = self.user_manager.get_profile(user_id)
+        existing_profile = await self.user_manager.get_profile(user_id)
 
         # Сравнение и сбор изменений
         changes = {}
@@ -142,8 +251,11 @@ class ProfileManager:
         except (ValueError, TypeError):
             formatted_date = last_updated_str  # Если формат неизвестен, оставить как есть
 
+        name_match = self.NAME_PATTERN.search(text)
+        name = name_match.group(1) if name_match else None
+
         # Обновление профиля
-        self.user_manager.update_profile(
+        await self.user_manager.update_profile(
             user_id,
             strength,
             agility,
@@ -151,19 +263,18 @@ class ProfileManager:
             level,
             attack,
             defense,
-            luck
+            luck,
+            chat_id=peer_id,
+            name=name,
         )
+        self.leaderboards.update(peer_id, user_id, name, profile)
 
-        # Получение обновлённого профиля
-        updated_profile = self.user_manager.get_profile(user_id)
-        
-
-        # Формирование ответа
+        # Формирование ответа (новые значения уже известны, повторно профиль не читается)
         response_lines = [f"Дата последнего обновления: {formatted_date}"]
         stat_line = ""
         for stat, emoji in self.STAT_EMOJI.items():
             if stat in changes:
-                current_value = updated_profile.get(stat, 0)
+                current_value = profile.get(stat, 0)
                 change = changes[stat]
                 if change > 0:
                     change_str = f"(+{change})"
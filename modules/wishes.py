@@ -3,9 +3,18 @@
 import re
 from typing import Optional, Dict, Any, List
 from datetime import datetime
+from services.database import get_database
+from services.command_router import CommandRouter
 from utils.logger import logger
 import sqlite3
-import os
+
+
+def normalize_item_name(name: str) -> str:
+    """
+    Нормализация названия предмета или псевдонима для поиска в каталоге:
+    без учёта регистра, лишних пробелов и различия "ё" и "е".
+    """
+    return " ".join(name.casefold().split()).replace("ё", "е")
 
 
 class WishManager:
@@ -27,6 +36,18 @@ class WishManager:
 
     }
 
+    # Неизменное начало каждой команды: по нему маршрутизатор выбирает шаблон
+    COMMAND_TRIGGERS = {
+        "add_wish": "/хочу",
+        "remove_wish": "/не",
+        "who_wants": "/кому",
+        "set_name_tagged": "/я",
+        "set_name": "/я",
+        "show_wishes": "/что",
+        "help": "/команды хотелки",
+        "delete_user": "/f",
+    }
+
     def __init__(self, db_path: str = 'data/wishes.db'):
         """
         Инициализация менеджера желаний.
@@ -34,17 +55,21 @@ class WishManager:
         :param db_path: Путь к базе данных SQLite.
         """
         self.db_path = db_path
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self.connection = sqlite3.connect(self.db_path, check_same_thread=False)
-        self.cursor = self.connection.cursor()
-        self.create_tables()
+        self.db = get_database(self.db_path)
+        self.db.write_sync(self.create_tables)
+        # Каталог предметов: {нормализованное название или псевдоним: item_id}
+        self.catalog: Dict[str, int] = self.db.read_sync(self._load_catalog)
+        logger.debug(f"Загружен каталог предметов: {len(self.catalog)} названий и псевдонимов")
+        # Собственный маршрутизатор для check_wish_events
+        self.router = CommandRouter()
+        self.register_commands(self.router)
         logger.debug("Инициализация WishManager")
 
-    def create_tables(self):
+    def create_tables(self, conn: sqlite3.Connection):
         """
         Создание таблиц в базе данных, если они не существуют.
         """
-        self.cursor.execute("""
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS users (
                 user_id INTEGER PRIMARY KEY,
                 display_name TEXT,
@@ -52,14 +77,14 @@ class WishManager:
             )
         """)
 
-        self.cursor.execute("""
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS items (
                 item_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 item_name TEXT UNIQUE NOT NULL
             )
         """)
 
-        self.cursor.execute("""
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS aliases (
                 alias_id INTEGER PRIMARY KEY AUTOINCREMENT,
                 item_id INTEGER,
@@ -68,7 +93,7 @@ class WishManager:
             )
         """)
 
-        self.cursor.execute("""
+        conn.execute("""
             CREATE TABLE IF NOT EXISTS wishes (
                 user_id INTEGER,
                 item_id INTEGER,
@@ -78,23 +103,44 @@ class WishManager:
             )
         """)
 
-        self.connection.commit()
         logger.debug("Таблицы в базе данных созданы или уже существуют.")
 
-    def add_item(self, item_name: str) -> int:
+    @staticmethod
+    def _load_catalog(conn: sqlite3.Connection) -> Dict[str, int]:
+        catalog = {}
+        for alias_name, item_id in conn.execute("SELECT alias_name, item_id FROM aliases"):
+            catalog[normalize_item_name(alias_name)] = item_id
+        # Название предмета важнее совпадающего с ним псевдонима
+        for item_name, item_id in conn.execute("SELECT item_name, item_id FROM items"):
+            catalog[normalize_item_name(item_name)] = item_id
+        return catalog
+
+    async def reload_catalog(self) -> None:
+        """
+        Перечитывает каталог предметов из базы, например после правки таблиц вручную.
+        """
+        self.catalog = await self.db.read(self._load_catalog)
+        logger.debug(f"Каталог предметов перезагружен: {len(self.catalog)} названий и псевдонимов")
+
+    async def add_item(self, item_name: str) -> int:
         """
         Добавление нового предмета в базу данных.
         :param item_name: Название предмета.
         :return: ID добавленного предмета.
         """
         item_name = item_name.lower()
-        self.cursor.execute("INSERT OR IGNORE INTO items (item_name) VALUES (?)", (item_name,))
-        self.connection.commit()
-        self.cursor.execute("SELECT item_id FROM items WHERE item_name = ?", (item_name,))
-        result = self.cursor.fetchone()
-        return result[0] if result else -1
 
-    def add_alias(self, item_name: str, alias_name: str) -> None:
+        def save(conn):
+            conn.execute("INSERT OR IGNORE INTO items (item_name) VALUES (?)", (item_name,))
+            return conn.execute("SELECT item_id FROM items WHERE item_name = ?", (item_name,)).fetchone()
+
+        result = await self.db.write(save)
+        if not result:
+            return -1
+        self.catalog[normalize_item_name(item_name)] = result[0]
+        return result[0]
+
+    async def add_alias(self, item_name: str, alias_name: str) -> None:
         """
         Добавление псевдонима для предмета.
         :param item_name: Название предмета.
@@ -102,32 +148,30 @@ class WishManager:
         """
         item_name = item_name.lower()
         alias_name = alias_name.lower()
-        self.cursor.execute("SELECT item_id FROM items WHERE item_name = ?", (item_name,))
-        result = self.cursor.fetchone()
+
+        def save(conn):
+            result = conn.execute("SELECT item_id FROM items WHERE item_name = ?", (item_name,)).fetchone()
+            if result:
+                conn.execute("INSERT OR IGNORE INTO aliases (item_id, alias_name) VALUES (?, ?)", (result[0], alias_name))
+            return result
+
+        result = await self.db.write(save)
         if result:
-            item_id = result[0]
-            self.cursor.execute("INSERT OR IGNORE INTO aliases (item_id, alias_name) VALUES (?, ?)", (item_id, alias_name))
-            self.connection.commit()
+            # Псевдоним мог уже существовать (INSERT OR IGNORE): каталог перечитывается целиком
+            await self.reload_catalog()
             logger.debug(f"Добавлен псевдоним '{alias_name}' для предмета '{item_name}'")
         else:
             logger.warning(f"Предмет '{item_name}' не найден. Псевдоним '{alias_name}' не добавлен.")
 
     def get_item_id(self, name: str) -> Optional[int]:
         """
-        Получение ID предмета по его названию или псевдониму.
+        Получение ID предмета по его названию или псевдониму (из каталога в памяти).
         :param name: Название или псевдоним предмета.
         :return: ID предмета или None, если не найден.
         """
-        name = name.lower()
-        self.cursor.execute("SELECT item_id FROM items WHERE item_name = ?", (name,))
-        result = self.cursor.fetchone()
-        if result:
-            return result[0]
-        self.cursor.execute("SELECT item_id FROM aliases WHERE alias_name = ?", (name,))
-        result = self.cursor.fetchone()
-        return result[0] if result else None
+        return self.catalog.get(normalize_item_name(name))
 
-    def add_wish(self, user_id: int, item_id: int) -> bool:
+    async def add_wish(self, user_id: int, item_id: int) -> bool:
         """
         Добавление предмета в список желаний пользователя.
         :param user_id: ID пользователя.
@@ -135,24 +179,22 @@ class WishManager:
         :return: True, если добавлено, False, если уже в списке.
         """
         try:
-            self.cursor.execute("INSERT INTO wishes (user_id, item_id) VALUES (?, ?)", (user_id, item_id))
-            self.connection.commit()
+            await self.db.execute("INSERT INTO wishes (user_id, item_id) VALUES (?, ?)", (user_id, item_id))
             logger.debug(f"Пользователь {user_id} добавил предмет {item_id} в свой список желаний.")
             return True
         except sqlite3.IntegrityError:
             logger.debug(f"Пользователь {user_id} уже имеет предмет {item_id} в своем списке желаний.")
             return False
 
-    def remove_wish(self, user_id: int, item_id: int) -> bool:
+    async def remove_wish(self, user_id: int, item_id: int) -> bool:
         """
         Удаление предмета из списка желаний пользователя.
         :param user_id: ID пользователя.
         :param item_id: ID предмета.
         :return: True, если удалено, False, если предмет не был в списке.
         """
-        self.cursor.execute("DELETE FROM wishes WHERE user_id = ? AND item_id = ?", (user_id, item_id))
-        self.connection.commit()
-        if self.cursor.rowcount > 0:
+        deleted = await self.db.execute("DELETE FROM wishes WHERE user_id = ? AND item_id = ?", (user_id, item_id))
+        if deleted > 0:
             logger.debug(f"Пользователь {user_id} удалил предмет {item_id} из своего списка желаний.")
             return True
         else:
@@ -160,19 +202,18 @@ class WishManager:
             return False
 
 
-    def get_users_with_wish(self, item_id: int) -> List[Dict[str, Any]]:
+    async def get_users_with_wish(self, item_id: int) -> List[Dict[str, Any]]:
         """
         Получение списка пользователей, желающих данный предмет.
         :param item_id: ID предмета.
         :return: Список словарей с информацией о пользователях.
         """
-        self.cursor.execute("""
+        results = await self.db.fetchall("""
             SELECT user_id, display_name, is_tagged FROM users
             WHERE user_id IN (
                 SELECT user_id FROM wishes WHERE item_id = ?
             )
         """, (item_id,))
-        results = self.cursor.fetchall()
         users = []
         for row in results:
             user = {
@@ -183,7 +224,7 @@ class WishManager:
             users.append(user)
         return users
 
-    def set_display_name(self, user_id: int, display_name: str, is_tagged: bool = False) -> None:
+    async def set_display_name(self, user_id: int, display_name: str, is_tagged: bool = False) -> None:
         """
         Установка отображаемого имени пользователя.
         :param user_id: ID пользователя.
@@ -192,49 +233,49 @@ class WishManager:
         """
         if is_tagged:
             display_name = f"[id{user_id}|{display_name}]"
-        self.cursor.execute("""
+        await self.db.execute("""
             INSERT INTO users (user_id, display_name, is_tagged)
             VALUES (?, ?, ?)
             ON CONFLICT(user_id) DO UPDATE SET
                 display_name=excluded.display_name,
                 is_tagged=excluded.is_tagged
         """, (user_id, display_name, int(is_tagged)))
-        self.connection.commit()
         logger.debug(f"Установлено имя для пользователя {user_id}: {display_name} (is_tagged={is_tagged})")
         
-    def delete_user(self, target_user_id: int) -> bool:
+    async def delete_user(self, target_user_id: int) -> bool:
         """
         Полное удаление пользователя из базы данных, включая его желания.
         :param target_user_id: ID пользователя для удаления.
         :return: True, если пользователь был удалён, False, если пользователь не найден.
         """
-        self.cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (target_user_id,))
-        user_exists = self.cursor.fetchone()
-        if not user_exists:
+        def delete(conn):
+            user_exists = conn.execute("SELECT user_id FROM users WHERE user_id = ?", (target_user_id,)).fetchone()
+            if not user_exists:
+                return False
+            # Удаление из таблицы wishes
+            conn.execute("DELETE FROM wishes WHERE user_id = ?", (target_user_id,))
+            # Удаление из таблицы users
+            conn.execute("DELETE FROM users WHERE user_id = ?", (target_user_id,))
+            return True
+
+        if not await self.db.write(delete):
             logger.debug(f"Пользователь {target_user_id} не найден в базе данных.")
             return False
-
-        # Удаление из таблицы wishes
-        self.cursor.execute("DELETE FROM wishes WHERE user_id = ?", (target_user_id,))
-        # Удаление из таблицы users
-        self.cursor.execute("DELETE FROM users WHERE user_id = ?", (target_user_id,))
-        self.connection.commit()
         logger.debug(f"Пользователь {target_user_id} полностью удалён из базы данных.")
         return True
 
 
-    def get_user_wishes(self, user_id: int) -> List[str]:
+    async def get_user_wishes(self, user_id: int) -> List[str]:
         """
         Получение списка желаний пользователя.
         :param user_id: ID пользователя.
         :return: Список названий предметов.
         """
-        self.cursor.execute("""
+        results = await self.db.fetchall("""
             SELECT items.item_name FROM items
             JOIN wishes ON items.item_id = wishes.item_id
             WHERE wishes.user_id = ?
         """, (user_id,))
-        results = self.cursor.fetchall()
         return [row[0] for row in results]
 
     async def check_wish_events(self, message: Dict[str, Any]) -> Optional[str]:
@@ -252,36 +293,52 @@ class WishManager:
             logger.debug("Пустое сообщение или отсутствует user_id. Пропуск.")
             return None
 
-        # Проверка на каждую команду
+        responses = await self.router.dispatch(message)
+        return responses[0] if responses else None
+
+    def register_commands(self, router: CommandRouter, module: Optional[str] = "wishes"):
+        """
+        Регистрация команд модуля желаний в маршрутизаторе.
+        :param router: Общий маршрутизатор команд.
+        :param module: Название модуля чата.
+        """
         for command, pattern in self.COMMAND_PATTERNS.items():
-            match = pattern.match(text)
-            if match:
-                if command == "add_wish":
-                    item_name = match.group(1).strip()
-                    return self.handle_add_wish(user_id, item_name)
-                elif command == "remove_wish":
-                    item_name = match.group(1).strip()
-                    return self.handle_remove_wish(user_id, item_name)
-                elif command == "who_wants":
-                    item_name = match.group(1).strip()
-                    return self.handle_who_wants(item_name)
-                elif command == "set_name_tagged":
-                    name = match.group(1).strip()
-                    return self.handle_set_name(user_id, name, is_tagged=True)
-                elif command == "set_name":
-                    name = match.group(1).strip()
-                    return self.handle_set_name(user_id, name, is_tagged=False)
-                elif command == "show_wishes":
-                    return self.handle_show_wishes(user_id)
-                elif command == "help":
-                    return self.handle_help()
-                elif command == "delete_user":
-                    target_user_id = int(match.group(1))
-                    return self.handle_delete_user(target_user_id)
-        # Если сообщение не соответствует ни одной команде, возвращаем None
-        return None
-
-    def handle_add_wish(self, user_id: int, item_name: str) -> Optional[str]:
+            router.add(module, self.COMMAND_TRIGGERS[command], self._make_command_handler(command), pattern=pattern)
+        router.add(module, "/обновить каталог", self._command_reload_catalog, exact=True, admin=True)
+
+    async def _command_reload_catalog(self, message: Dict[str, Any], _) -> Optional[str]:
+        await self.reload_catalog()
+        return f"Каталог предметов перезагружен: {len(self.catalog)} названий и псевдонимов."
+
+    def _make_command_handler(self, command: str):
+        async def handler(message: Dict[str, Any], match: re.Match) -> Optional[str]:
+            user_id = message.get('from_id')
+            if command == "add_wish":
+                item_name = match.group(1).strip()
+                return await self.handle_add_wish(user_id, item_name)
+            elif command == "remove_wish":
+                item_name = match.group(1).strip()
+                return await self.handle_remove_wish(user_id, item_name)
+            elif command == "who_wants":
+                item_name = match.group(1).strip()
+                return await self.handle_who_wants(item_name)
+            elif command == "set_name_tagged":
+                name = match.group(1).strip()
+                return await self.handle_set_name(user_id, name, is_tagged=True)
+            elif command == "set_name":
+                name = match.group(1).strip()
+                return await self.handle_set_name(user_id, name, is_tagged=False)
+            elif command == "show_wishes":
+                return await self.handle_show_wishes(user_id)
+            elif command == "help":
+                return self.handle_help()
+            elif command == "delete_user":
+                target_user_id = int(match.group(1))
+                return await self.handle_delete_user(target_user_id)
+
+        return handler
+
+    async def handle_add_wish(self, user_id: int, item_name: str) -> Optional[str]:
         """
         Обработка команды добавления желания.
         :param user_id: ID пользователя.
@@ -289,8 +346,7 @@ class WishManager:
         :return: Ответное сообщение или None.
         """
         # Проверка наличия пользователя в таблице users
-        self.cursor.execute("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
-        user_exists = self.cursor.fetchone()
+        user_exists = await self.db.fetchone("SELECT user_id FROM users WHERE user_id = ?", (user_id,))
         if not user_exists:
             return "Пожалуйста, установите своё имя с помощью команды /я перед добавлением желаний."
         
@@ -298,14 +354,14 @@ class WishManager:
         if not item_id:
             logger.debug(f"Предмет '{item_name}' не найден.")
             return f"Предмет '{item_name}' не найден."
-        success = self.add_wish(user_id, item_id)
+        success = await self.add_wish(user_id, item_id)
         if success:
             return f"Предмет '{item_name}' добавлен в ваш список желаний."
         else:
             return f"Предмет '{item_name}' уже в вашем списке желаний."
 
 
-    def handle_who_wants(self, item_name: str) -> Optional[str]:
+    async def handle_who_wants(self, item_name: str) -> Optional[str]:
         """
         Обработка команды просмотра, кто желает данный предмет.
         :param item_name: Название предмета или его псевдоним.
@@ -316,7 +372,7 @@ class WishManager:
             logger.debug(f"Предмет '{item_name}' не найден.")
             return f"Предмет '{item_name}' не найден."
 
-        users = self.get_users_with_wish(item_id)
+        users = await self.get_users_with_wish(item_id)
         if not users:
             return f"Никто не желает предмет '{item_name}'."
 
@@ -326,20 +382,20 @@ class WishManager:
         return response
 
 
-    def handle_delete_user(self, target_user_id: int) -> Optional[str]:
+    async def handle_delete_user(self, target_user_id: int) -> Optional[str]:
         """
         Обработка секретной команды удаления пользователя из базы данных.
         :param target_user_id: ID пользователя для удаления.
         :return: Ответное сообщение или None.
         """
-        success = self.delete_user(target_user_id)
+        success = await self.delete_user(target_user_id)
         if success:
             return f"Пользователь с ID {target_user_id} успешно удалён из базы данных."
         else:
             return f"Пользователь с ID {target_user_id} не найден в базе данных."
 
 
-    def handle_set_name(self, user_id: int, name: str, is_tagged: bool) -> Optional[str]:
+    async def handle_set_name(self, user_id: int, name: str, is_tagged: bool) -> Optional[str]:
         """
         Обработка команды установки отображаемого имени.
         :param user_id: ID пользователя.
@@ -347,23 +403,23 @@ class WishManager:
         :param is_tagged: Флаг, указывающий, нужно ли тегировать имя.
         :return: Ответное сообщение или None.
         """
-        self.set_display_name(user_id, name, is_tagged)
+        await self.set_display_name(user_id, name, is_tagged)
         return f"Ваше имя установлено как {name}."
 
-    def handle_show_wishes(self, user_id: int) -> Optional[str]:
+    async def handle_show_wishes(self, user_id: int) -> Optional[str]:
         """
         Обработка команды показа списка желаний пользователя.
         :param user_id: ID пользователя.
         :return: Ответное сообщение или None.
         """
-        wishes = self.get_user_wishes(user_id)
+        wishes = await self.get_user_wishes(user_id)
         if not wishes:
             return "Ты познал дзен и ничего не хочешь"
         wish_list = "\n".join([f"- {item}" for item in wishes])
         return f"Ваш список желаний:\n{wish_list}"
     
     
-    def handle_remove_wish(self, user_id: int, item_name: str) -> Optional[str]:
+    async def handle_remove_wish(self, user_id: int, item_name: str) -> Optional[str]:
         """
         Обработка команды удаления желания.
         :param user_id: ID пользователя.
@@ -375,7 +431,7 @@ class WishManager:
             logger.debug(f"Предмет '{item_name}' не найден.")
             return f"Предмет '{item_name}' не найден."
 
-        success = self.remove_wish(user_id, item_id)
+        success = await self.remove_wish(user_id, item_id)
         if success:
             return f"Предмет '{item_name}' удалён из вашего списка желаний."
         else:
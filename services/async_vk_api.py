@@ -0,0 +1,99 @@
+from typing import Optional, Dict, Any
+import aiohttp
+from config.settings import VK_API_VERSION, HTTP_POOL_SIZE
+from utils.logger import logger
+
+API_URL = "https://api.vk.com/method/"
+
+# Общая HTTP-сессия процесса (пул соединений переиспользуется всеми клиентами)
+_shared_session: Optional[aiohttp.ClientSession] = None
+
+
+def get_http_session() -> aiohttp.ClientSession:
+    """
+    Возвращает общую HTTP-сессию, создавая её при первом обращении.
+    Должна вызываться из работающего event loop.
+    """
+    global _shared_session
+    if _shared_session is None or _shared_session.closed:
+        connector = aiohttp.TCPConnector(limit=HTTP_POOL_SIZE, ttl_dns_cache=300)
+        _shared_session = aiohttp.ClientSession(connector=connector)
+        logger.debug("Создана общая HTTP-сессия")
+    return _shared_session
+
+
+async def close_http_session():
+    """
+    Закрывает общую HTTP-сессию.
+    """
+    global _shared_session
+    if _shared_session is not None and not _shared_session.closed:
+        await _shared_session.close()
+        logger.debug("Общая HTTP-сессия закрыта")
+    _shared_session = None
+
+
+class AsyncVkApiError(Exception):
+    """
+    Ошибка, возвращённая VK API (или HTTP-статус 429).
+    """
+
+    def __init__(self, code: int, message: str, method: Optional[str] = None):
+        super().__init__(f"[{code}] {message}")
+        self.code = code
+        self.message = message
+        self.method = method
+
+
+class AsyncVkApi:
+    def __init__(self, token: str, api_version: str = VK_API_VERSION, api_url: str = API_URL):
+        """
+        Асинхронный клиент VK API поверх общей HTTP-сессии.
+        :param token: Токен доступа (группы или пользователя).
+        :param api_version: Версия VK API.
+        :param api_url: Базовый адрес API (переопределяется в тестах).
+        """
+        self.token = token
+        self.api_version = api_version
+        self.api_url = api_url
+
+    async def method(self, method: str, values: Optional[Dict[str, Any]] = None) -> Any:
+        """
+        Вызов метода VK API.
+        :param method: Название метода, например 'messages.send'.
+        :param values: Параметры метода.
+        :return: Поле `response` из ответа VK.
+        """
+        params = dict(values or {})
+        params.setdefault("access_token", self.token)
+        params.setdefault("v", self.api_version)
+
+        session = get_http_session()
+        async with session.post(self.api_url + method, data=params) as resp:
+            if resp.status == 429:
+                raise AsyncVkApiError(429, "Too Many Requests", method)
+            data = await resp.json(content_type=None)
+
+        if "error" in data:
+            error = data["error"]
+            raise AsyncVkApiError(error.get("error_code", 0), error.get("error_msg", ""), method)
+        return data.get("response")
+
+    async def execute(self, code: str) -> Dict[str, Any]:
+        """
+        Вызов метода `execute`. В отличие от `method` возвращает ответ целиком,
+        чтобы вызывающий код видел `execute_errors` отдельных вызовов.
+        :param code: Код на VKScript.
+        :return: Словарь с полями `response` и (если были ошибки) `execute_errors`.
+        """
+        params = {"code": code, "access_token": self.token, "v": self.api_version}
+        session = get_http_session()
+        async with session.post(self.api_url + "execute", data=params) as resp:
+            if resp.status == 429:
+                raise AsyncVkApiError(429, "Too Many Requests", "execute")
+            data = await resp.json(content_type=None)
+
+        if "error" in data:
+            error = data["error"]
+            raise AsyncVkApiError(error.get("error_code", 0), error.get("error_msg", ""), "execute")
+        return data
@@ -1,7 +1,8 @@
-import os
 import sqlite3
 import json
-from typing import Optional, Dict, Any, List
+import copy
+from typing import Optional, Dict, Any, List, FrozenSet
+from services.database import get_database
 from utils.logger import logger
 
 
@@ -13,93 +14,191 @@ class ChatManager:
         """
         logger.debug("Инициализация ChatManager")
         self.db_path = db_path
+        self.db = get_database(db_path)
 
-        # Убедитесь, что директория для базы данных существует
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
+        # Кэш настроек чатов: {chat_id: settings} и {chat_id: frozenset(модулей)}.
+        # Заполняется при первом чтении, обновляется при каждой записи настроек.
+        self._settings_cache: Dict[int, Dict[str, Any]] = {}
+        self._modules_cache: Dict[int, FrozenSet[str]] = {}
 
         # Инициализация базы данных и таблиц
         self._initialize_database()
 
     def _initialize_database(self):
         """
-        Создаёт таблицы `chats` и `modules` в базе данных, если они ещё не существуют.
+        Создаёт таблицы `chats`, `modules` и `chat_modules` в базе данных, если они ещё не существуют.
         Таблица `chats` содержит `chat_id` и `settings` в формате JSON.
         Таблица `modules` содержит информацию о доступных модулях.
+        Таблица `chat_modules` содержит пары (чат, включённый модуль).
         """
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            # Создание таблицы `chats`
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS chats (
-                    chat_id INTEGER PRIMARY KEY,
-                    settings TEXT NOT NULL
-                )
-            """)
-            # Создание таблицы `modules`
-            cursor.execute("""
-                CREATE TABLE IF NOT EXISTS modules (
-                    module_name TEXT PRIMARY KEY,
-                    display_name TEXT NOT NULL,
-                    description TEXT NOT NULL
-                )
-            """)
-            conn.commit()
-            conn.close()
-            logger.debug("Таблицы 'chats' и 'modules' инициализированы в базе данных.")
+            self.db.write_sync(self._initialize_database_sync)
+            logger.debug("Таблицы 'chats', 'modules' и 'chat_modules' инициализированы в базе данных.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка инициализации базы данных: {e}")
 
-    def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
+    def _initialize_database_sync(self, conn: sqlite3.Connection):
+        cursor = conn.cursor()
+        # Создание таблицы `chats`
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chats (
+                chat_id INTEGER PRIMARY KEY,
+                settings TEXT NOT NULL
+            )
+        """)
+        # Создание таблицы `modules`
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS modules (
+                module_name TEXT PRIMARY KEY,
+                display_name TEXT NOT NULL,
+                description TEXT NOT NULL
+            )
+        """)
+        # Создание таблицы `chat_modules` и индекса для поиска чатов по модулю
+        cursor.execute("""
+            CREATE TABLE IF NOT EXISTS chat_modules (
+                chat_id INTEGER NOT NULL,
+                module_name TEXT NOT NULL,
+                PRIMARY KEY (chat_id, module_name)
+            )
+        """)
+        cursor.execute("""
+            CREATE INDEX IF NOT EXISTS idx_chat_modules_module_name
+            ON chat_modules (module_name)
+        """)
+        cursor.execute("PRAGMA user_version")
+        if cursor.fetchone()[0] < 1:
+            self._migrate_modules_from_settings(cursor)
+            cursor.execute("PRAGMA user_version = 1")
+
+    def _migrate_modules_from_settings(self, cursor: sqlite3.Cursor):
+        """
+        Однократный перенос списков модулей из JSON `settings` в таблицу `chat_modules`.
+        После переноса ключ `modules` из JSON удаляется.
+        """
+        cursor.execute("SELECT chat_id, settings FROM chats")
+        migrated = 0
+        for chat_id, settings_json in cursor.fetchall():
+            try:
+                settings = json.loads(settings_json)
+            except json.JSONDecodeError as e:
+                logger.error(f"Некорректные настройки чата {chat_id}, модули не перенесены: {e}")
+                continue
+            modules = settings.pop("modules", [])
+            cursor.executemany(
+                "INSERT OR IGNORE INTO chat_modules (chat_id, module_name) VALUES (?, ?)",
+                [(chat_id, module_name) for module_name in modules],
+            )
+            cursor.execute(
+                "UPDATE chats SET settings = ? WHERE chat_id = ?",
+                (json.dumps(settings, ensure_ascii=False), chat_id),
+            )
+            migrated += 1
+        logger.info(f"Модули {migrated} чатов перенесены в таблицу 'chat_modules'.")
+
+    async def get_chat_settings(self, chat_id: int) -> Dict[str, Any]:
         """
         Получает настройки для заданного чата.
         :param chat_id: Идентификатор чата.
         :return: Словарь настроек чата или пустой словарь, если настройки не найдены.
         """
+        if chat_id not in self._settings_cache:
+            await self._load_chat_settings(chat_id)
+        # Копия, чтобы изменения вызывающего кода не попадали в кэш мимо set_chat_settings
+        settings = copy.deepcopy(self._settings_cache.get(chat_id, {}))
+        modules = self._modules_cache.get(chat_id)
+        if modules:
+            settings["modules"] = sorted(modules)
+        return settings
+
+    async def get_enabled_modules(self, chat_id: int) -> FrozenSet[str]:
+        """
+        Возвращает множество включённых модулей чата из кэша, без обращения к БД.
+        :param chat_id: Идентификатор чата.
+        :return: frozenset названий модулей.
+        """
+        modules = self._modules_cache.get(chat_id)
+        if modules is None:
+            await self._load_chat_settings(chat_id)
+            modules = self._modules_cache.get(chat_id, frozenset())
+        return modules
+
+    async def _load_chat_settings(self, chat_id: int):
+        """
+        Читает настройки и модули чата из базы данных в кэш.
+        При ошибке кэш не заполняется, чтобы следующее обращение повторило чтение.
+        """
+        def load(conn: sqlite3.Connection):
+            row = conn.execute("SELECT settings FROM chats WHERE chat_id = ?", (chat_id,)).fetchone()
+            modules = conn.execute(
+                "SELECT module_name FROM chat_modules WHERE chat_id = ?", (chat_id,)
+            ).fetchall()
+            return row, frozenset(module_row[0] for module_row in modules)
+
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT settings FROM chats WHERE chat_id = ?", (chat_id,))
-            row = cursor.fetchone()
-            conn.close()
+            row, modules = await self.db.read(load)
             if row:
                 settings = json.loads(row[0])
-                logger.debug(f"Настройки для чата {chat_id} получены: {settings}")
-                return settings
+                settings.pop("modules", None)
+                logger.debug(f"Настройки для чата {chat_id} получены: {settings}, модули: {sorted(modules)}")
             else:
+                settings = {}
                 logger.debug(f"Настройки для чата {chat_id} не найдены.")
-                return {}
+            self._settings_cache[chat_id] = settings
+            self._modules_cache[chat_id] = modules
         except (sqlite3.Error, json.JSONDecodeError) as e:
             logger.error(f"Ошибка получения настроек для чата {chat_id}: {e}")
-            return {}
 
-    def get_chat_settings_string(self, chat_id: int) -> str:
+    def _update_cached_modules(self, chat_id: int, added: Optional[str] = None, removed: Optional[str] = None):
+        """
+        Обновляет кэш модулей после записи. Если чат ещё не в кэше, он загрузится при первом чтении.
+        """
+        modules = self._modules_cache.get(chat_id)
+        if modules is None:
+            return
+        if added:
+            modules = modules | {added}
+        if removed:
+            modules = modules - {removed}
+        self._modules_cache[chat_id] = modules
+
+    async def get_chat_settings_string(self, chat_id: int) -> str:
         """
         Формирует строку с перечнем подключенных модулей и именем чата в читаемом формате.
         :param chat_id: Идентификатор чата.
         :return: Строка, описывающая имя чата и подключенные модули.
         """
-        settings = self.get_chat_settings(chat_id)
+        settings = await self.get_chat_settings(chat_id)
         chat_name = settings.get("name", f"Чат #{chat_id}")
-        modules = settings.get("modules", [])
+
+        # Модули чата вместе с описаниями одним запросом
+        try:
+            rows = await self.db.fetchall("""
+                SELECT cm.module_name, m.display_name, m.description
+                FROM chat_modules cm
+                LEFT JOIN modules m ON m.module_name = cm.module_name
+                WHERE cm.chat_id = ?
+                ORDER BY cm.rowid
+            """, (chat_id,))
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка получения модулей для чата {chat_id}: {e}")
+            rows = []
 
         # Если нет модулей, возвращаем сообщение
-        if not modules:
+        if not rows:
             return f"{chat_name}:\nНет подключенных модулей"
 
-        # Получение информации о модулях из таблицы `modules`
         module_details = []
-        for module in modules:
-            module_info = self.get_module_info(module)
-            if module_info:
-                module_details.append(f"{module_info['display_name']}: {module_info['description']}")
+        for module_name, display_name, description in rows:
+            if display_name is not None:
+                module_details.append(f"{display_name}: {description}")
             else:
-                # Если информация о модуле не найдена, отображаем название из настроек
-                module_details.append(f"{module}: Описание недоступно")
+                # Если информация о модуле не найдена, отображаем название модуля
+                module_details.append(f"{module_name}: Описание недоступно")
 
         return f"{chat_name}:\nПодключенные модули:\n" + "\n".join(module_details)
 
-    def get_module_info(self, module_name: str) -> Optional[Dict[str, str]]:
+    async def get_module_info(self, module_name: str) -> Optional[Dict[str, str]]:
         """
         Получает информацию о модуле из таблицы `modules`.
         :param module_name: Название модуля.
@@ -107,11 +206,9 @@ class ChatManager:
         """
         logger.debug(f"Получение информации о модуле '{module_name}'")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("SELECT display_name, description FROM modules WHERE module_name = ?", (module_name,))
-            row = cursor.fetchone()
-            conn.close()
+            row = await self.db.fetchone(
+                "SELECT display_name, description FROM modules WHERE module_name = ?", (module_name,)
+            )
             if row:
                 info = {"display_name": row[0], "description": row[1]}
                 logger.debug(f"Информация о модуле '{module_name}': {info}")
@@ -123,63 +220,85 @@ class ChatManager:
             logger.error(f"Ошибка получения информации о модуле '{module_name}': {e}")
             return None
 
-    def set_chat_settings(self, chat_id: int, settings: Dict[str, Any]):
+    async def set_chat_settings(self, chat_id: int, settings: Dict[str, Any]):
         """
         Сохраняет настройки для заданного чата в базе данных.
+        Если в настройках есть ключ `modules`, список модулей чата заменяется целиком.
         :param chat_id: Идентификатор чата.
         :param settings: Словарь настроек чата.
         """
         logger.debug(f"Сохранение настроек для чата {chat_id}: {settings}")
-        try:
-            settings_json = json.dumps(settings, ensure_ascii=False)
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
+        settings = copy.deepcopy(settings)
+        modules = settings.pop("modules", None)
+
+        def save(conn: sqlite3.Connection):
+            conn.execute("""
                 INSERT INTO chats (chat_id, settings)
                 VALUES (?, ?)
                 ON CONFLICT(chat_id) DO UPDATE SET settings=excluded.settings
-            """, (chat_id, settings_json))
-            conn.commit()
-            conn.close()
+            """, (chat_id, json.dumps(settings, ensure_ascii=False)))
+            if modules is not None:
+                conn.execute("DELETE FROM chat_modules WHERE chat_id = ?", (chat_id,))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO chat_modules (chat_id, module_name) VALUES (?, ?)",
+                    [(chat_id, module_name) for module_name in modules],
+                )
+
+        try:
+            await self.db.write(save)
+            self._settings_cache[chat_id] = settings
+            if modules is not None:
+                self._modules_cache[chat_id] = frozenset(modules)
+            elif chat_id not in self._modules_cache:
+                # Настройки в кэше без модулей неполны — загрузим их при следующем чтении
+                self._settings_cache.pop(chat_id, None)
             logger.debug(f"Настройки для чата {chat_id} сохранены.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка сохранения настроек для чата {chat_id}: {e}")
 
-    def enable_module(self, chat_id: int, module_name: str):
+    async def enable_module(self, chat_id: int, module_name: str):
         """
         Включает указанный модуль для заданного чата.
         :param chat_id: Идентификатор чата.
         :param module_name: Название модуля для включения.
         """
         logger.debug(f"Включение модуля '{module_name}' для чата {chat_id}")
-        settings = self.get_chat_settings(chat_id)
-        modules = settings.get("modules", [])
-        if module_name not in modules:
-            modules.append(module_name)
-            settings["modules"] = modules
-            self.set_chat_settings(chat_id, settings)
+        try:
+            enabled = await self.db.execute(
+                "INSERT OR IGNORE INTO chat_modules (chat_id, module_name) VALUES (?, ?)",
+                (chat_id, module_name),
+            ) > 0
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка включения модуля '{module_name}' для чата {chat_id}: {e}")
+            return
+        self._update_cached_modules(chat_id, added=module_name)
+        if enabled:
             logger.debug(f"Модуль '{module_name}' включён для чата {chat_id}.")
         else:
             logger.debug(f"Модуль '{module_name}' уже включён для чата {chat_id}.")
 
-    def disable_module(self, chat_id: int, module_name: str):
+    async def disable_module(self, chat_id: int, module_name: str):
         """
         Отключает указанный модуль для заданного чата.
         :param chat_id: Идентификатор чата.
         :param module_name: Название модуля для отключения.
         """
         logger.debug(f"Отключение модуля '{module_name}' для чата {chat_id}")
-        settings = self.get_chat_settings(chat_id)
-        modules = settings.get("modules", [])
-        if module_name in modules:
-            modules.remove(module_name)
-            settings["modules"] = modules
-            self.set_chat_settings(chat_id, settings)
+        try:
+            disabled = await self.db.execute(
+                "DELETE FROM chat_modules WHERE chat_id = ? AND module_name = ?",
+                (chat_id, module_name),
+            ) > 0
+        except sqlite3.Error as e:
+            logger.error(f"Ошибка отключения модуля '{module_name}' для чата {chat_id}: {e}")
+            return
+        self._update_cached_modules(chat_id, removed=module_name)
+        if disabled:
             logger.debug(f"Модуль '{module_name}' отключён для чата {chat_id}.")
         else:
             logger.debug(f"Модуль '{module_name}' не был включён для чата {chat_id}.")
 
-    def get_chats_with_module(self, module_name: str) -> List[Dict[str, Any]]:
+    async def get_chats_with_module(self, module_name: str) -> List[Dict[str, Any]]:
         """
         Возвращает список чатов, в которых включен указанный модуль.
         :param module_name: Название модуля.
@@ -187,31 +306,27 @@ class ChatManager:
         """
         logger.debug(f"Получение списка чатов с модулем '{module_name}'")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
-                SELECT chat_id, settings FROM chats
-                WHERE JSON_EXTRACT(settings, '$.modules') LIKE ?
-            """, (f'%{module_name}%',))
-            rows = cursor.fetchall()
-            conn.close()
+            rows = await self.db.fetchall("""
+                SELECT cm.chat_id, JSON_EXTRACT(c.settings, '$.name')
+                FROM chat_modules cm
+                LEFT JOIN chats c ON c.chat_id = cm.chat_id
+                WHERE cm.module_name = ?
+            """, (module_name,))
             chats_with_module = []
-            for row in rows:
-                chat_id, settings_json = row
-                settings = json.loads(settings_json)
+            for chat_id, name in rows:
                 chat_info = {
                     "id": chat_id,
-                    "name": settings.get("name", f"Chat {chat_id}")
+                    "name": name if name is not None else f"Chat {chat_id}"
                 }
                 chats_with_module.append(chat_info)
                 logger.debug(f"Чат с модулем '{module_name}' добавлен в список: {chat_info}")
             logger.debug(f"Найдено {len(chats_with_module)} чатов с модулем '{module_name}'.")
             return chats_with_module
-        except (sqlite3.Error, json.JSONDecodeError) as e:
+        except sqlite3.Error as e:
             logger.error(f"Ошибка при получении чатов с модулем '{module_name}': {e}")
             return []
 
-    def add_module(self, module_name: str, display_name: str, description: str):
+    async def add_module(self, module_name: str, display_name: str, description: str):
         """
         Добавляет новый модуль в таблицу `modules`.
         :param module_name: Уникальное название модуля.
@@ -220,31 +335,23 @@ class ChatManager:
         """
         logger.debug(f"Добавление нового модуля '{module_name}'")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("""
+            await self.db.execute("""
                 INSERT INTO modules (module_name, display_name, description)
                 VALUES (?, ?, ?)
                 ON CONFLICT(module_name) DO UPDATE SET display_name=excluded.display_name, description=excluded.description
             """, (module_name, display_name, description))
-            conn.commit()
-            conn.close()
             logger.debug(f"Модуль '{module_name}' добавлен или обновлён в таблице 'modules'.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка добавления модуля '{module_name}': {e}")
 
-    def remove_module(self, module_name: str):
+    async def remove_module(self, module_name: str):
         """
         Удаляет модуль из таблицы `modules`.
         :param module_name: Название модуля для удаления.
         """
         logger.debug(f"Удаление модуля '{module_name}' из таблицы 'modules'")
         try:
-            conn = sqlite3.connect(self.db_path)
-            cursor = conn.cursor()
-            cursor.execute("DELETE FROM modules WHERE module_name = ?", (module_name,))
-            conn.commit()
-            conn.close()
+            await self.db.execute("DELETE FROM modules WHERE module_name = ?", (module_name,))
             logger.debug(f"Модуль '{module_name}' удалён из таблицы 'modules'.")
         except sqlite3.Error as e:
             logger.error(f"Ошибка удаления модуля '{module_name}': {e}")
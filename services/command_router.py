@@ -0,0 +1,162 @@
+import re
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple, Union
+from utils.logger import logger
+
+# Обработчик команды: корутина (message, args) -> ответ или None.
+# Ответ — текст или словарь {"text": ..., "keyboard": ...} для сообщения с клавиатурой.
+# args — результат pattern.match, если у маршрута есть шаблон, иначе текст после триггера.
+Handler = Callable[[Dict[str, Any], Any], Awaitable[Union[str, Dict[str, Any], None]]]
+
+
+class CommandRouter:
+    """
+    Общий реестр команд чатов.
+    Модули объявляют триггеры (начала сообщений), которые собираются в одно
+    префиксное дерево. Сообщение классифицируется за один проход по тексту:
+    каждый модуль получает только свой самый длинный подходящий маршрут,
+    а сообщения без команд отсекаются до обращения к модулям и базам.
+    """
+
+    def __init__(self):
+        self.root = self._new_node()
+        # Маршруты по ID отправителя (например, профили от игрового бота)
+        self.sender_routes: Dict[int, List[dict]] = {}
+        self.modules: List[Optional[str]] = []
+
+    @staticmethod
+    def _new_node():
+        return {"children": {}, "routes": []}
+
+    def add(
+        self,
+        module: Optional[str],
+        trigger: str,
+        handler: Handler,
+        exact: bool = False,
+        pattern: Optional[re.Pattern] = None,
+        admin: bool = False,
+        fallback: bool = False,
+    ):
+        """
+        Регистрирует команду.
+        :param module: Название модуля чата (None — команда работает всегда).
+        :param trigger: Начало сообщения (без учёта регистра).
+        :param handler: Обработчик команды.
+        :param exact: Сообщение должно полностью совпадать с триггером.
+        :param pattern: Регулярное выражение, которому должен соответствовать весь текст.
+        :param admin: Команда доступна только администраторам.
+        :param fallback: Запасной маршрут: срабатывает, только если сообщение
+                         не является командой какого-либо другого модуля.
+        """
+        node = self.root
+        for char in trigger.lower():
+            node = node["children"].setdefault(char, self._new_node())
+        node["routes"].append(
+            {
+                "module": module,
+                "trigger": trigger,
+                "handler": handler,
+                "exact": exact,
+                "pattern": pattern,
+                "admin": admin,
+                "fallback": fallback,
+            }
+        )
+        if module not in self.modules:
+            self.modules.append(module)
+
+    def add_sender(self, module: Optional[str], from_id: int, handler: Handler):
+        """
+        Регистрирует обработчик всех сообщений от указанного отправителя.
+        """
+        self.sender_routes.setdefault(from_id, []).append(
+            {"module": module, "handler": handler, "admin": False, "fallback": False}
+        )
+        if module not in self.modules:
+            self.modules.append(module)
+
+    def match(self, text: str, from_id: Optional[int] = None) -> List[Tuple[dict, Any]]:
+        """
+        Находит маршруты сообщения: для каждого модуля — самый длинный подходящий триггер.
+        :return: Список (маршрут, args) в порядке регистрации модулей.
+        """
+        text = text.strip()
+        lowered = text.lower()
+
+        # Узлы с маршрутами на пути сообщения по дереву, от коротких триггеров к длинным
+        passed = []
+        node = self.root
+        depth = 0
+        for char in lowered:
+            node = node["children"].get(char)
+            if node is None:
+                break
+            depth += 1
+            if node["routes"]:
+                passed.append((depth, node))
+
+        best: Dict[Optional[str], Tuple[dict, Any]] = {}
+        for route_depth, route_node in reversed(passed):
+            for route in route_node["routes"]:
+                if route["module"] in best:
+                    continue
+                if route["exact"] and route_depth != len(lowered):
+                    continue
+                if route["pattern"] is not None:
+                    args = route["pattern"].match(text)
+                    if not args:
+                        continue
+                else:
+                    args = text[route_depth:]
+                best[route["module"]] = (route, args)
+
+        if from_id is not None:
+            for route in self.sender_routes.get(from_id, ()):
+                best.setdefault(route["module"], (route, text))
+
+        return [best[module] for module in self.modules if module in best]
+
+    def is_command(self, text: str, from_id: Optional[int] = None) -> bool:
+        return bool(self.match(text, from_id))
+
+    def route(
+        self,
+        text: str,
+        from_id: Optional[int] = None,
+        modules=None,
+        is_admin: bool = False,
+    ) -> List[Tuple[dict, Any]]:
+        """
+        Маршруты сообщения с учётом подключенных модулей и прав отправителя.
+        :param modules: Подключенные модули чата (None — все).
+        :param is_admin: Отправитель — администратор.
+        """
+        matches = [
+            (route, args)
+            for route, args in self.match(text, from_id)
+            if (route["module"] is None or modules is None or route["module"] in modules)
+            and (is_admin or not route["admin"])
+        ]
+        if any(not route["fallback"] for route, _ in matches):
+            matches = [(route, args) for route, args in matches if not route["fallback"]]
+        return matches
+
+    async def dispatch(
+        self,
+        message: Dict[str, Any],
+        modules=None,
+        is_admin: bool = False,
+    ) -> List[Union[str, Dict[str, Any]]]:
+        """
+        Вызывает обработчики маршрутов сообщения.
+        :return: Непустые ответы обработчиков по порядку.
+        """
+        responses = []
+        for route, args in self.route(
+            message.get("text", ""), message.get("from_id"), modules, is_admin
+        ):
+            logger.debug(f"Команда модуля '{route['module']}': {route.get('trigger', 'по отправителю')}")
+            response = await route["handler"](message, args)
+            if response:
+                responses.append(response)
+        return responses
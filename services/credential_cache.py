@@ -0,0 +1,79 @@
+import time
+from collections import OrderedDict
+from typing import Dict, Any, Optional, Tuple
+from config.settings import CREDENTIAL_CACHE_SIZE, CREDENTIAL_CACHE_TTL
+from services.async_vk_api import AsyncVkApi
+from services.user_manager import UserManager
+from utils.logger import logger
+
+
+class CredentialCache:
+    """
+    LRU-кэш с временем жизни для данных авто бафа по ключу (user_id, group_chat_id):
+    расшифрованный токен, ID чата пользователя и готовый клиент VK API поверх
+    общей HTTP-сессии. Сбрасывается UserManager при изменении или удалении авто бафа.
+    """
+
+    def __init__(
+        self,
+        user_manager: UserManager,
+        max_size: int = CREDENTIAL_CACHE_SIZE,
+        ttl: float = CREDENTIAL_CACHE_TTL,
+    ):
+        """
+        :param user_manager: Менеджер пользователей, из которого загружаются токены.
+        :param max_size: Максимальное количество записей.
+        :param ttl: Время жизни записи в секундах.
+        """
+        self.user_manager = user_manager
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: "OrderedDict[Tuple[int, int], Dict[str, Any]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        user_manager.add_auto_buff_listener(self.invalidate)
+
+    async def get(self, user_id: int, group_chat_id: int) -> Optional[Dict[str, Any]]:
+        """
+        Возвращает данные авто бафа пользователя в чате.
+        :return: Словарь с ключами token, chat_id, api или None, если авто баф не настроен.
+        """
+        key = (user_id, group_chat_id)
+        entry = self._entries.get(key)
+        if entry is not None:
+            if time.monotonic() < entry["expires"]:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            del self._entries[key]
+
+        self.misses += 1
+        auto_buff = await self.user_manager.get_auto_buff_by_group_chat_id(
+            user_id, group_chat_id
+        )
+        if not auto_buff:
+            return None
+
+        entry = {
+            "token": auto_buff["token"],
+            "chat_id": auto_buff["chat_id"],
+            "api": AsyncVkApi(auto_buff["token"]),
+            "expires": time.monotonic() + self.ttl,
+        }
+        self._entries[key] = entry
+        if len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+        return entry
+
+    def invalidate(self, user_id: int, group_chat_id: Optional[int] = None):
+        """
+        Удаляет записи пользователя из кэша.
+        :param user_id: ID пользователя.
+        :param group_chat_id: ID чата; если не указан, удаляются все записи пользователя.
+        """
+        if group_chat_id is not None:
+            self._entries.pop((user_id, group_chat_id), None)
+        else:
+            for key in [key for key in self._entries if key[0] == user_id]:
+                del self._entries[key]
+        logger.debug(f"Кэш авто бафа сброшен для пользователя {user_id} ({group_chat_id})")
@@ -0,0 +1,144 @@
+import asyncio
+import os
+import sqlite3
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence
+from config.settings import DB_READERS
+from utils.logger import logger
+
+
+class Database:
+    """
+    Общий слой доступа к одному файлу SQLite.
+    Все записи выполняются по очереди в отдельном потоке-писателе,
+    чтения — параллельно в пуле потоков-читателей. У каждого потока своё
+    постоянное соединение, база работает в режиме WAL, поэтому читатели
+    не блокируются писателем. Ни один вызов SQLite не выполняется в потоке event loop.
+    """
+
+    def __init__(self, db_path: str, readers: int = DB_READERS):
+        """
+        :param db_path: Путь к файлу базы данных SQLite.
+        :param readers: Количество потоков-читателей.
+        """
+        self.db_path = db_path
+        os.makedirs(os.path.dirname(self.db_path) or ".", exist_ok=True)
+        name = os.path.splitext(os.path.basename(db_path))[0]
+        self._local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock = threading.Lock()
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"db_writer_{name}")
+        self._readers = ThreadPoolExecutor(max_workers=readers, thread_name_prefix=f"db_reader_{name}")
+        # Режим WAL включается соединением писателя при создании базы
+        self._writer.submit(self._get_connection).result()
+        logger.debug(f"База данных {db_path} открыта (WAL, читателей: {readers})")
+
+    def _get_connection(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            # Соединение используется только своим потоком, но закрывается из close()
+            conn = sqlite3.connect(self.db_path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            with self._connections_lock:
+                self._connections.append(conn)
+        return conn
+
+    def _run_write(self, fn: Callable, *args) -> Any:
+        conn = self._get_connection()
+        try:
+            result = fn(conn, *args)
+            conn.commit()
+            return result
+        except BaseException:
+            conn.rollback()
+            raise
+
+    def _run_read(self, fn: Callable, *args) -> Any:
+        return fn(self._get_connection(), *args)
+
+    async def write(self, fn: Callable, *args) -> Any:
+        """
+        Выполняет fn(conn, *args) в потоке-писателе в одной транзакции.
+        При исключении транзакция откатывается.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._writer, self._run_write, fn, *args)
+
+    async def read(self, fn: Callable, *args) -> Any:
+        """
+        Выполняет fn(conn, *args) в одном из потоков-читателей.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self._readers, self._run_read, fn, *args)
+
+    def write_sync(self, fn: Callable, *args) -> Any:
+        """
+        Синхронный вариант write: для создания таблиц при старте и для скриптов.
+        """
+        return self._writer.submit(self._run_write, fn, *args).result()
+
+    def read_sync(self, fn: Callable, *args) -> Any:
+        """
+        Синхронный вариант read: для загрузки кэшей при старте и для скриптов.
+        """
+        return self._readers.submit(self._run_read, fn, *args).result()
+
+    async def execute(self, sql: str, params: Sequence = ()) -> int:
+        """
+        Выполняет один изменяющий запрос.
+        :return: Количество затронутых строк.
+        """
+        return await self.write(lambda conn: conn.execute(sql, params).rowcount)
+
+    async def executemany(self, sql: str, seq_of_params: Iterable[Sequence]) -> int:
+        return await self.write(lambda conn: conn.executemany(sql, seq_of_params).rowcount)
+
+    async def fetchone(self, sql: str, params: Sequence = ()) -> Optional[tuple]:
+        return await self.read(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence = ()) -> List[tuple]:
+        return await self.read(lambda conn: conn.execute(sql, params).fetchall())
+
+    def close(self):
+        """
+        Дожидается завершения запросов и закрывает все соединения.
+        """
+        self._writer.shutdown(wait=True)
+        self._readers.shutdown(wait=True)
+        with self._connections_lock:
+            for conn in self._connections:
+                conn.close()
+            self._connections.clear()
+        logger.debug(f"База данных {self.db_path} закрыта")
+
+
+# Реестр баз процесса: все менеджеры одной базы работают через один экземпляр
+_databases: Dict[str, Database] = {}
+_databases_lock = threading.Lock()
+
+
+def get_database(db_path: str) -> Database:
+    """
+    Возвращает общий экземпляр Database для файла, создавая его при первом обращении.
+    :param db_path: Путь к файлу базы данных SQLite.
+    """
+    key = os.path.abspath(db_path)
+    with _databases_lock:
+        database = _databases.get(key)
+        if database is None:
+            database = Database(db_path)
+            _databases[key] = database
+        return database
+
+
+def close_databases():
+    """
+    Закрывает все открытые базы.
+    """
+    with _databases_lock:
+        for database in _databases.values():
+            database.close()
+        _databases.clear()
@@ -1,5 +1,6 @@
 from utils.logger import logger
 from utils.keyboard import create_keyboard
+from utils.buff_letters import BUFF_LETTERS
 import vk_api
 from vk_api.longpoll import VkLongPoll, VkEventType
 import asyncio
@@ -84,7 +85,7 @@ class DialogManager:
 
         elif state == "ask_buffs":
             # Валидация введенного списка бафов
-            valid_letters = set("азуэгдмнчо")
+            valid_letters = set(BUFF_LETTERS)
             buff_list = message.lower()
             if 1 <= len(buff_list) <= 6 and all(c in valid_letters for c in buff_list):
                 dialog["data"]["buff_list"] = buff_list
@@ -123,7 +124,7 @@ class DialogManager:
                     self.active_dialogs[user_id] = dialog
 
                     # Получаем список чатов с включенным модулем авто бафа
-                    chats = self.chat_manager.get_chats_with_module("auto_buff")
+                    chats = await self.chat_manager.get_chats_with_module("auto_buff")
                     if not chats:
                         return {
                             "text": "К сожалению, нет доступных чатов для авто бафа.",
@@ -242,8 +243,8 @@ class DialogManager:
 
                             # Диалог завершён, сохраняем данные в БД
                             token_owner_id = dialog["data"]["token_owner_id"]
-                            self.user_manager.add_user(user_id=token_owner_id)
-                            self.user_manager.set_auto_buff(
+                            await self.user_manager.add_user(user_id=token_owner_id)
+                            await self.user_manager.set_auto_buff(
                                 user_id=token_owner_id,
                                 chat_id=chat_id_for_user,
                                 group_chat_id=chat_id,
@@ -336,7 +337,7 @@ class DialogManager:
 
         if state == "start":
             # Получаем список чатов с включенным модулем авто бафа
-            chats = self.chat_manager.get_chats_with_module("auto_buff")
+            chats = await self.chat_manager.get_chats_with_module("auto_buff")
             if not chats:
                 self.active_dialogs.pop(user_id)
                 return {
@@ -378,10 +379,10 @@ class DialogManager:
                     chat_id = chat["id"]
                     # конец диалога
                     self.active_dialogs.pop(user_id)
-                    if self.user_manager.get_auto_buff_by_group_chat_id(
+                    if await self.user_manager.get_auto_buff_by_group_chat_id(
                         user_id, chat_id
                     ):
-                        self.user_manager.remove_auto_buff_by_group_chat_id(
+                        await self.user_manager.remove_auto_buff_by_group_chat_id(
                             user_id, chat_id
                         )
                         return {
@@ -0,0 +1,141 @@
+import asyncio
+from typing import Callable, Awaitable, Optional, List, Dict, Any
+from utils.logger import logger
+
+
+class EventDispatcher:
+    """
+    Раздаёт события long poll ограниченному числу обработчиков.
+    События шардируются по `peer_id`: у каждого шарда своя ограниченная очередь
+    и один воркер, поэтому сообщения одного чата обрабатываются строго по порядку,
+    а разные чаты — параллельно.
+    """
+
+    # Поведение при переполнении очереди шарда:
+    # block — ждать освобождения места (long poll приостанавливается);
+    # drop_oldest — выбросить самое старое событие шарда;
+    # shed — выбросить новое событие, если это не команда (команды ждут).
+    OVERFLOW_POLICIES = ("block", "drop_oldest", "shed")
+
+    def __init__(
+        self,
+        handler: Callable[[Any], Awaitable[None]],
+        workers: int = 8,
+        queue_size: int = 1000,
+        overflow_policy: str = "block",
+        is_command: Optional[Callable[[Any], bool]] = None,
+    ):
+        """
+        :param handler: Корутина обработки одного события.
+        :param workers: Количество воркеров (шардов).
+        :param queue_size: Максимальная длина очереди одного шарда.
+        :param overflow_policy: Политика переполнения, см. OVERFLOW_POLICIES.
+        :param is_command: Функция, определяющая, что событие является командой
+                           (используется политикой shed).
+        """
+        if overflow_policy not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Неизвестная политика переполнения: {overflow_policy}")
+        self.handler = handler
+        self.workers = max(1, workers)
+        self.queue_size = queue_size
+        self.overflow_policy = overflow_policy
+        self.is_command = is_command or (lambda event: True)
+
+        self.queues: List[asyncio.Queue] = [
+            asyncio.Queue(maxsize=queue_size) for _ in range(self.workers)
+        ]
+        self.tasks: List[asyncio.Task] = []
+
+        # Метрики
+        self.enqueued = 0
+        self.processed = 0
+        self.failed = 0
+        self.dropped = 0
+        self.max_depth = 0
+
+    def start(self):
+        """
+        Запускает воркеры. Вызывается из работающего event loop.
+        """
+        logger.debug(
+            f"Запуск {self.workers} воркеров событий (очередь {self.queue_size}, политика '{self.overflow_policy}')"
+        )
+        self.tasks = [
+            asyncio.create_task(self._worker(queue), name=f"event_worker_{i}")
+            for i, queue in enumerate(self.queues)
+        ]
+
+    async def stop(self):
+        """
+        Останавливает воркеры, необработанные события отбрасываются.
+        """
+        for task in self.tasks:
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+        self.tasks = []
+
+    @staticmethod
+    def get_peer_id(event) -> int:
+        message = getattr(event, "message", None)
+        if message:
+            return message.get("peer_id") or 0
+        return 0
+
+    async def submit(self, event):
+        """
+        Ставит событие в очередь его шарда с учётом политики переполнения.
+        """
+        queue = self.queues[self.get_peer_id(event) % self.workers]
+
+        if queue.full():
+            if self.overflow_policy == "drop_oldest":
+                queue.get_nowait()
+                queue.task_done()
+                self.dropped += 1
+                logger.warning("Очередь событий переполнена, самое старое событие отброшено")
+            elif self.overflow_policy == "shed" and not self.is_command(event):
+                self.dropped += 1
+                logger.warning("Очередь событий переполнена, сообщение без команды отброшено")
+                return
+
+        await queue.put(event)
+        self.enqueued += 1
+        depth = queue.qsize()
+        if depth > self.max_depth:
+            self.max_depth = depth
+
+    async def _worker(self, queue: asyncio.Queue):
+        while True:
+            event = await queue.get()
+            try:
+                await self.handler(event)
+                self.processed += 1
+            except Exception as e:
+                self.failed += 1
+                logger.error(f"Ошибка при обработке событий VK: {e}")
+            finally:
+                queue.task_done()
+
+    def get_metrics(self) -> Dict[str, Any]:
+        """
+        Текущие метрики очередей.
+        """
+        depths = [queue.qsize() for queue in self.queues]
+        return {
+            "depth": sum(depths),
+            "shard_depths": depths,
+            "max_depth": self.max_depth,
+            "enqueued": self.enqueued,
+            "processed": self.processed,
+            "failed": self.failed,
+            "dropped": self.dropped,
+        }
+
+    def get_metrics_string(self) -> str:
+        metrics = self.get_metrics()
+        return (
+            f"Очередь событий: {metrics['depth']} (макс. в шарде {metrics['max_depth']})\n"
+            f"По шардам: {' '.join(str(d) for d in metrics['shard_depths'])}\n"
+            f"Принято: {metrics['enqueued']}, обработано: {metrics['processed']}, "
+            f"ошибок: {metrics['failed']}, отброшено: {metrics['dropped']}"
+        )
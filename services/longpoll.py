@@ -0,0 +1,111 @@
+import asyncio
+from typing import List, AsyncIterator
+import aiohttp
+from vk_api.bot_longpoll import VkBotLongPoll, VkBotEvent
+from config.settings import LONGPOLL_WAIT
+from services.async_vk_api import AsyncVkApi, AsyncVkApiError, get_http_session
+from utils.logger import logger
+
+
+class AsyncBotLongPoll:
+    """
+    Асинхронный клиент Bots Long Poll.
+    Сам ведёт `server`/`key`/`ts` и возвращает те же объекты событий,
+    что и `vk_api.bot_longpoll.VkBotLongPoll`.
+    """
+
+    # Классы событий берём из vk_api, чтобы обработчики не заметили подмены
+    CLASS_BY_EVENT_TYPE = VkBotLongPoll.CLASS_BY_EVENT_TYPE
+    DEFAULT_EVENT_CLASS = VkBotEvent
+
+    # Пауза между повторными попытками при сетевых ошибках (в секундах)
+    RETRY_DELAY_MIN = 1
+    RETRY_DELAY_MAX = 30
+
+    def __init__(self, api: AsyncVkApi, group_id, wait: int = LONGPOLL_WAIT):
+        """
+        :param api: Экземпляр AsyncVkApi с токеном группы.
+        :param group_id: ID группы.
+        :param wait: Время ожидания ответа long poll сервера.
+        """
+        self.api = api
+        self.group_id = group_id
+        self.wait = wait
+
+        self.server = None
+        self.key = None
+        self.ts = None
+
+    def _parse_event(self, raw_event):
+        event_class = self.CLASS_BY_EVENT_TYPE.get(
+            raw_event["type"], self.DEFAULT_EVENT_CLASS
+        )
+        return event_class(raw_event)
+
+    async def update_longpoll_server(self, update_ts: bool = True):
+        """
+        Получает новые `server` и `key` (и `ts`, если нужно).
+        :param update_ts: Обновлять ли `ts`.
+        """
+        response = await self.api.method(
+            "groups.getLongPollServer", {"group_id": self.group_id}
+        )
+        self.server = response["server"]
+        self.key = response["key"]
+        if update_ts or self.ts is None:
+            self.ts = response["ts"]
+        logger.debug(f"Получен long poll сервер {self.server}, ts={self.ts}")
+
+    async def check(self) -> List[VkBotEvent]:
+        """
+        Один запрос к long poll серверу.
+        :return: Список событий (может быть пустым).
+        """
+        if self.server is None:
+            await self.update_longpoll_server()
+
+        params = {"act": "a_check", "key": self.key, "ts": self.ts, "wait": self.wait}
+        timeout = aiohttp.ClientTimeout(total=self.wait + 10)
+        session = get_http_session()
+        async with session.get(self.server, params=params, timeout=timeout) as resp:
+            response = await resp.json(content_type=None)
+
+        if "failed" not in response:
+            self.ts = response["ts"]
+            return [self._parse_event(raw_event) for raw_event in response["updates"]]
+
+        failed = response["failed"]
+        if failed == 1:
+            # История событий устарела или частично потеряна
+            logger.debug(f"Long poll: failed=1, новый ts={response['ts']}")
+            self.ts = response["ts"]
+        elif failed == 2:
+            # Истёк ключ, ts остаётся прежним
+            logger.debug("Long poll: failed=2, обновление ключа")
+            await self.update_longpoll_server(update_ts=False)
+        elif failed == 3:
+            # Информация утрачена, нужны новые key и ts
+            logger.debug("Long poll: failed=3, обновление ключа и ts")
+            await self.update_longpoll_server()
+        else:
+            logger.warning(f"Long poll: неизвестный код ошибки {failed}")
+            await self.update_longpoll_server()
+        return []
+
+    async def listen(self) -> AsyncIterator[VkBotEvent]:
+        """
+        Бесконечно слушает сервер. Сетевые ошибки не прерывают цикл,
+        отмена задачи (CancelledError) — прерывает.
+        """
+        delay = self.RETRY_DELAY_MIN
+        while True:
+            try:
+                events = await self.check()
+            except (aiohttp.ClientError, asyncio.TimeoutError, AsyncVkApiError, KeyError, ValueError) as e:
+                logger.error(f"Ошибка long poll, повтор через {delay} с: {e}")
+                await asyncio.sleep(delay)
+                delay = min(delay * 2, self.RETRY_DELAY_MAX)
+                continue
+            delay = self.RETRY_DELAY_MIN
+            for event in events:
+                yield event
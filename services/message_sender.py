@@ -0,0 +1,145 @@
+import asyncio
+import json
+import time
+from typing import Dict, Any, List, Optional, Tuple
+import aiohttp
+from services.async_vk_api import AsyncVkApi, AsyncVkApiError
+from utils.logger import logger
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты запросов: `rate` токенов в секунду, не больше `capacity` в запасе.
+    """
+
+    def __init__(self, rate: float, capacity: Optional[float] = None):
+        self.rate = rate
+        self.capacity = capacity if capacity is not None else rate
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+
+    async def acquire(self):
+        while True:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return
+            await asyncio.sleep((1 - self.tokens) / self.rate)
+
+
+class MessageSender:
+    """
+    Асинхронная очередь исходящих сообщений.
+    Накопившиеся сообщения отправляются пачками через `execute` (до 25 вызовов
+    за запрос), частота запросов ограничена токен-бакетом, ошибки флуда
+    повторяются с экспоненциальной задержкой.
+    """
+
+    MAX_BATCH = 25
+    # 6 — слишком много запросов в секунду, 9 — флуд-контроль,
+    # 29 — достигнут лимит метода, 429 — HTTP Too Many Requests
+    FLOOD_ERROR_CODES = {6, 9, 29, 429}
+    MAX_RETRIES = 5
+    RETRY_BASE_DELAY = 0.5
+
+    def __init__(self, api: AsyncVkApi, rate_limit: float = 20):
+        """
+        :param api: Клиент VK API с токеном группы.
+        :param rate_limit: Максимум запросов к API в секунду.
+        """
+        self.api = api
+        self.bucket = TokenBucket(rate_limit)
+        self.queue: asyncio.Queue = asyncio.Queue()
+        self.task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self.task = asyncio.create_task(self._run(), name="message_sender")
+
+    async def stop(self):
+        if self.task:
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+            self.task = None
+
+    def send(self, params: Dict[str, Any]) -> asyncio.Future:
+        """
+        Ставит вызов messages.send в очередь.
+        :param params: Параметры messages.send.
+        :return: Future с ID отправленного сообщения или None при ошибке.
+        """
+        future = asyncio.get_running_loop().create_future()
+        self.queue.put_nowait((params, future))
+        return future
+
+    async def _run(self):
+        while True:
+            batch = [await self.queue.get()]
+            while len(batch) < self.MAX_BATCH and not self.queue.empty():
+                batch.append(self.queue.get_nowait())
+            try:
+                await self._send_with_retries(batch)
+            except Exception as e:
+                logger.error(f"Ошибка при отправке сообщения: {e}")
+                self._resolve(batch, None)
+
+    async def _send_with_retries(self, batch: List[Tuple[Dict[str, Any], asyncio.Future]]):
+        pending = batch
+        for attempt in range(self.MAX_RETRIES + 1):
+            if attempt:
+                delay = self.RETRY_BASE_DELAY * 2 ** (attempt - 1)
+                logger.warning(f"Флуд-контроль VK, повтор {len(pending)} сообщений через {delay} с")
+                await asyncio.sleep(delay)
+            await self.bucket.acquire()
+            try:
+                pending = await self._send_batch(pending)
+            except AsyncVkApiError as e:
+                if e.code not in self.FLOOD_ERROR_CODES:
+                    raise
+            except (aiohttp.ClientError, asyncio.TimeoutError) as e:
+                logger.warning(f"Сетевая ошибка при отправке сообщений: {e}")
+            if not pending:
+                return
+        logger.error(f"Не удалось отправить {len(pending)} сообщений после {self.MAX_RETRIES} повторов")
+        self._resolve(pending, None)
+
+    async def _send_batch(self, batch):
+        """
+        Отправляет пачку одним запросом.
+        :return: Сообщения, которые нужно повторить из-за флуд-контроля.
+        """
+        if len(batch) == 1:
+            message_id = await self.api.method("messages.send", batch[0][0])
+            self._resolve(batch, message_id)
+            return []
+
+        calls = ",".join(
+            f"API.messages.send({json.dumps(params, ensure_ascii=False)})"
+            for params, _ in batch
+        )
+        data = await self.api.execute(f"return [{calls}];")
+        results = data.get("response") or [False] * len(batch)
+        # Ошибки идут в том же порядке, что и неудавшиеся вызовы
+        errors = iter(data.get("execute_errors", []))
+
+        retry = []
+        for item, result in zip(batch, results):
+            if result is not False:
+                self._resolve([item], result)
+                continue
+            error = next(errors, {})
+            if error.get("error_code") in self.FLOOD_ERROR_CODES:
+                retry.append(item)
+            else:
+                logger.error(
+                    f"Ошибка при отправке сообщения: [{error.get('error_code')}] {error.get('error_msg')}"
+                )
+                self._resolve([item], None)
+        return retry
+
+    @staticmethod
+    def _resolve(items, result):
+        for _, future in items:
+            if not future.done():
+                future.set_result(result)
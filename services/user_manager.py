@@ -1,23 +1,75 @@
+import asyncio
 import sqlite3
+import time
 from utils.logger import logger
-from utils.encryption import encrypt, decrypt
+from utils.encryption import encrypt, decrypt, encrypt_many, decrypt_many
+from utils.buff_letters import buff_mask
 import os
 from datetime import datetime
+from services.database import get_database
+from config.settings import (
+    USER_FLUSH_INTERVAL_MS,
+    USER_FLUSH_ROWS,
+    PROFILE_HISTORY_FULL_DAYS,
+    PROFILE_HISTORY_DAYS,
+)
+
+# Характеристики профиля в порядке столбцов таблиц profiles и profile_history
+PROFILE_STATS = ("strength", "agility", "endurance", "level", "attack", "defense", "luck")
+DAY_SECONDS = 86400
 
 
 class UserManager:
-    def __init__(self):
+    def __init__(self, db_path=os.path.join("data", "users.db")):
         logger.debug("Инициализация UserManager")
-        # Подключение к базе данных SQLite
-        self.db_path = os.path.join("data", "users.db")
-        os.makedirs(os.path.dirname(self.db_path), exist_ok=True)
-        self.connection = sqlite3.connect(self.db_path)
-        self.cursor = self.connection.cursor()
+        # Подключение к базе данных SQLite через общий слой
+        self.db_path = db_path
+        self.db = get_database(self.db_path)
+        # Подписчики на изменения авто бафа: callback(user_id, group_chat_id)
+        self.auto_buff_listeners = []
         self.create_tables()
+        # Роли всех известных пользователей {user_id: role_name}: add_user
+        # для известных пользователей и проверки ролей не обращаются к базе
+        self.roles = self.db.read_sync(self._load_roles)
+        # Новые пользователи, ожидающие пакетной записи
+        self.pending_users = []
+        self._flush_task = None
+        # Составы баферов {group_chat_id: {role: [бафер]}}, загружаются по чатам при первом обращении
+        self.rosters = {}
+        # Счётчик изменений составов: загрузка, во время которой состав менялся, повторяется
+        self._roster_version = 0
+        logger.debug(f"Загружено пользователей: {len(self.roles)}")
+
+    def add_auto_buff_listener(self, callback):
+        """
+        Подписывает callback(user_id, group_chat_id) на изменения авто бафа.
+        group_chat_id равен None, если затронуты все чаты пользователя.
+        """
+        self.auto_buff_listeners.append(callback)
+
+    def _notify_auto_buff_changed(self, user_id, group_chat_id=None):
+        for callback in self.auto_buff_listeners:
+            callback(user_id, group_chat_id)
+
+    @staticmethod
+    def _load_roles(conn: sqlite3.Connection):
+        return dict(conn.execute("SELECT user_id, role_name FROM users").fetchall())
+
+    async def reload_roles(self):
+        """
+        Перечитывает роли из базы, например после правки таблицы users внешним скриптом.
+        """
+        await self.flush_users()
+        self.roles = await self.db.read(self._load_roles)
+        logger.debug(f"Роли пользователей перезагружены: {len(self.roles)}")
 
     def create_tables(self):
+        self.db.write_sync(self._create_tables_sync)
+        logger.debug("Таблицы в базе данных созданы или уже существуют.")
+
+    def _create_tables_sync(self, conn: sqlite3.Connection):
         # Создание таблицы users
-        self.cursor.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS users (
                 user_id INTEGER PRIMARY KEY,
@@ -27,7 +79,7 @@ class UserManager:
         )
 
         # Создание таблицы auto_buff
-        self.cursor.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS auto_buff (
                 user_id INTEGER,
@@ -42,9 +94,16 @@ class UserManager:
             )
             """
         )
+        # Индекс для загрузки состава баферов чата
+        conn.execute(
+            """
+            CREATE INDEX IF NOT EXISTS idx_auto_buff_group_chat_role
+            ON auto_buff (group_chat_id, role)
+            """
+        )
 
         # Создание таблицы profiles с указанными полями
-        self.cursor.execute(
+        conn.execute(
             """
             CREATE TABLE IF NOT EXISTS profiles (
                 user_id INTEGER PRIMARY KEY,
@@ -61,129 +120,419 @@ class UserManager:
         """
         )
 
-        # Сохранение изменений
-        self.connection.commit()
-        logger.debug("Таблицы в базе данных созданы или уже существуют.")
+        # История профилей: только добавление, время — unix-время в секундах,
+        # таблица без rowid хранится прямо в индексе (user_id, ts)
+        conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS profile_history (
+                user_id INTEGER NOT NULL,
+                ts INTEGER NOT NULL,
+                strength INTEGER,
+                agility INTEGER,
+                endurance INTEGER,
+                level INTEGER,
+                attack INTEGER,
+                defense INTEGER,
+                luck INTEGER,
+                PRIMARY KEY (user_id, ts)
+            ) WITHOUT ROWID
+        """
+        )
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 1:
+            # Текущие профили становятся первыми снимками истории. last_updated хранится
+            # в местном времени без пояса, поэтому метка считается в Python, а не strftime('%s')
+            rows = conn.execute(
+                """
+                SELECT user_id, last_updated, strength, agility, endurance, level, attack, defense, luck
+                FROM profiles WHERE last_updated IS NOT NULL
+            """
+            ).fetchall()
+            conn.executemany(
+                """
+                INSERT OR IGNORE INTO profile_history (user_id, ts, strength, agility, endurance, level, attack, defense, luck)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (
+                    (user_id, int(datetime.fromisoformat(str(last_updated)).timestamp()), *stats)
+                    for user_id, last_updated, *stats in rows
+                ),
+            )
+            conn.execute("PRAGMA user_version = 1")
 
-    def add_user(self, user_id, role_name="user"):
-        # logger.debug(f"Добавление пользователя {user_id} с ролью {role_name}")
-        self.cursor.execute(
+        # Участники чатов для рейтингов: пользователи, чей профиль присылали в чат
+        conn.execute(
             """
-            INSERT OR IGNORE INTO users (user_id, role_name)
-            VALUES (?, ?)
-        """,
-            (user_id, role_name),
+            CREATE TABLE IF NOT EXISTS profile_chats (
+                chat_id INTEGER NOT NULL,
+                user_id INTEGER NOT NULL,
+                PRIMARY KEY (chat_id, user_id)
+            ) WITHOUT ROWID
+        """
         )
-        self.connection.commit()
+        if conn.execute("PRAGMA user_version").fetchone()[0] < 2:
+            # Имя игрока из профиля для вывода рейтингов
+            conn.execute("ALTER TABLE profiles ADD COLUMN name TEXT")
+            conn.execute("PRAGMA user_version = 2")
+
+    async def add_user(self, user_id, role_name="user"):
+        if user_id in self.roles:
+            return
+        # logger.debug(f"Добавление пользователя {user_id} с ролью {role_name}")
+        self.roles[user_id] = role_name
+        self.pending_users.append((user_id, role_name))
+        if len(self.pending_users) >= USER_FLUSH_ROWS:
+            await self.flush_users()
+        elif self._flush_task is None:
+            self._flush_task = asyncio.create_task(self._flush_users_later())
+
+    async def _flush_users_later(self):
+        await asyncio.sleep(USER_FLUSH_INTERVAL_MS / 1000)
+        self._flush_task = None
+        await self.flush_users()
+
+    async def flush_users(self):
+        """
+        Записывает накопленных новых пользователей одним запросом.
+        """
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            self._flush_task = None
+        if not self.pending_users:
+            return
+        users, self.pending_users = self.pending_users, []
+        try:
+            await self.db.executemany(
+                """
+                INSERT OR IGNORE INTO users (user_id, role_name)
+                VALUES (?, ?)
+            """,
+                users,
+            )
+        except Exception as e:
+            # Пользователи будут добавлены заново при следующем сообщении
+            for user_id, _ in users:
+                self.roles.pop(user_id, None)
+            logger.error(f"Ошибка при записи новых пользователей: {e}")
+            return
+        logger.debug(f"Записано новых пользователей: {len(users)}")
 
-    def set_auto_buff(
+    async def set_auto_buff(
         self, user_id, chat_id, group_chat_id, token, role, buff_list=None
     ):
         logger.debug(f"Настройка авто бафа для пользователя {user_id} в чате {chat_id}")
-        encrypted_token = encrypt(token)
         buff_list_str = buff_list if buff_list else ""
-        self.cursor.execute(
-            """
-            INSERT OR REPLACE INTO auto_buff (user_id, chat_id, group_chat_id, token, role, buff_list)
-            VALUES (?, ?, ?, ?, ?, ?)
-        """,
-            (user_id, chat_id, group_chat_id, encrypted_token, role, buff_list_str),
-        )
-        self.connection.commit()
 
-    def get_auto_buff_by_group_chat_id(self, user_id, group_chat_id):
+        def save(conn):
+            # Шифрование выполняется в потоке базы, а не в event loop
+            encrypted_token = encrypt(token)
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO auto_buff (user_id, chat_id, group_chat_id, token, role, buff_list)
+                VALUES (?, ?, ?, ?, ?, ?)
+            """,
+                (user_id, chat_id, group_chat_id, encrypted_token, role, buff_list_str),
+            )
+
+        await self.db.write(save)
+        # INSERT OR REPLACE может заменить запись пользователя в другом чате,
+        # поэтому сбрасываются все его записи
+        self._update_roster(user_id, chat_id, group_chat_id, role, buff_list_str)
+        self._notify_auto_buff_changed(user_id)
+
+    async def get_auto_buff_by_group_chat_id(self, user_id, group_chat_id):
         logger.debug(
             f"Получение настроек авто бафа для пользователя {user_id} в чате {group_chat_id}"
         )
-        self.cursor.execute(
-            """
-            SELECT token, role, chat_id, group_chat_id, buff_list FROM auto_buff WHERE user_id = ? AND group_chat_id = ?
-        """,
-            (user_id, group_chat_id),
-        )
-        result = self.cursor.fetchone()
-        if result:
-            token_encrypted, role, chat_id, group_chat_id, buff_list = result
-            token = decrypt(token_encrypted)
-            return {
-                "token": token,
-                "role": role,
-                "group_chat_id": group_chat_id,
-                "chat_id": chat_id,
-                "buff_list": buff_list,
-            }
-        return None
 
-    def remove_auto_buff_by_group_chat_id(self, user_id, group_chat_id):
+        def load(conn):
+            result = conn.execute(
+                """
+                SELECT token, role, chat_id, group_chat_id, buff_list FROM auto_buff WHERE user_id = ? AND group_chat_id = ?
+            """,
+                (user_id, group_chat_id),
+            ).fetchone()
+            if result:
+                token_encrypted, role, chat_id, group_chat_id_, buff_list = result
+                token = decrypt(token_encrypted)
+                return {
+                    "token": token,
+                    "role": role,
+                    "group_chat_id": group_chat_id_,
+                    "chat_id": chat_id,
+                    "buff_list": buff_list,
+                }
+            return None
+
+        return await self.db.read(load)
+
+    async def remove_auto_buff_by_group_chat_id(self, user_id, group_chat_id):
         logger.debug(
             f"Удаление авто бафа для пользователя {user_id} в чате {group_chat_id}"
         )
-        self.cursor.execute(
+        await self.db.execute(
             """
             DELETE FROM auto_buff WHERE user_id = ? AND group_chat_id = ?
         """,
             (user_id, group_chat_id),
         )
-        self.connection.commit()
+        self._update_roster(user_id, None, group_chat_id)
+        self._notify_auto_buff_changed(user_id, group_chat_id)
+
+    def _update_roster(self, user_id, chat_id, group_chat_id, role=None, buff_list=None):
+        """
+        Синхронизирует загруженные составы с записью auto_buff.
+        Удаляет записи, которые заменяет INSERT OR REPLACE (тот же чат группы
+        или тот же личный чат), и добавляет новую, если передана роль.
+        """
+        self._roster_version += 1
+        for roster_chat_id, roster in self.rosters.items():
+            for role_name, users in roster.items():
+                roster[role_name] = [
+                    user
+                    for user in users
+                    if user["user_id"] != user_id
+                    or (roster_chat_id != group_chat_id and user["chat_id"] != chat_id)
+                ]
+        roster = self.rosters.get(group_chat_id)
+        if roster is not None and role is not None:
+            roster.setdefault(role, []).append(self._make_roster_entry(user_id, buff_list, chat_id))
+
+    @staticmethod
+    def _make_roster_entry(user_id, buff_list, chat_id):
+        return {
+            "user_id": user_id,
+            "buff_list": buff_list,
+            "buff_mask": buff_mask(buff_list),
+            "chat_id": chat_id,
+        }
 
-    def get_all_auto_buffs(self, user_id):
+    async def _load_roster(self, group_chat_id):
+        while True:
+            version = self._roster_version
+            rows = await self.db.fetchall(
+                """
+                SELECT user_id, buff_list, chat_id, role FROM auto_buff WHERE group_chat_id = ?
+                ORDER BY rowid
+            """,
+                (group_chat_id,),
+            )
+            if version == self._roster_version:
+                break
+        roster = {}
+        for user_id, buff_list, chat_id, role in rows:
+            roster.setdefault(role, []).append(self._make_roster_entry(user_id, buff_list, chat_id))
+        self.rosters[group_chat_id] = roster
+        return roster
+
+    async def get_all_auto_buffs(self, user_id):
         logger.debug(f"Получение всех настроек авто бафа для пользователя {user_id}")
-        self.cursor.execute(
-            """
-            SELECT group_chat_id, chat_id, token, role, buff_list FROM auto_buff WHERE user_id = ?
-        """,
-            (user_id,),
-        )
-        results = self.cursor.fetchall()
-        auto_buffs = []
-        for row in results:
-            group_chat_id, chat_id, token_encrypted, role, buff_list = row
-            token = decrypt(token_encrypted)
-            auto_buffs.append(
-                {
-                    "token": token,
-                    "role": role,
-                    "chat_id": chat_id,
-                    "buff_list": buff_list,
-                    "group_chat_id": group_chat_id,
-                }
+
+        def load(conn):
+            results = conn.execute(
+                """
+                SELECT group_chat_id, chat_id, token, role, buff_list FROM auto_buff WHERE user_id = ?
+            """,
+                (user_id,),
+            ).fetchall()
+            tokens = decrypt_many(row[2] for row in results)
+            auto_buffs = []
+            for row, token in zip(results, tokens):
+                group_chat_id, chat_id, _, role, buff_list = row
+                auto_buffs.append(
+                    {
+                        "token": token,
+                        "role": role,
+                        "chat_id": chat_id,
+                        "buff_list": buff_list,
+                        "group_chat_id": group_chat_id,
+                    }
+                )
+            return auto_buffs
+
+        return await self.db.read(load)
+
+    async def rotate_auto_buff_tokens(self, batch_size=500):
+        """
+        Перешифровывает все токены в auto_buff текущим ключом.
+        Таблица обрабатывается порциями по rowid, каждая порция — отдельная транзакция.
+        Бот может работать во время перешифровки, только если он уже перезапущен
+        с новым ENCRYPTION_KEY и прежним ключом в ENCRYPTION_OLD_KEYS
+        (см. extra_scripts/rotate_encryption_key.py).
+        :param batch_size: Количество записей в одной порции.
+        :return: Количество перешифрованных токенов.
+        """
+
+        def rotate_batch(conn, last_rowid):
+            rows = conn.execute(
+                "SELECT rowid, token FROM auto_buff WHERE rowid > ? ORDER BY rowid LIMIT ?",
+                (last_rowid, batch_size),
+            ).fetchall()
+            # Расшифровка любым из известных ключей и шифрование текущим — порцией целиком
+            tokens = encrypt_many(decrypt_many(token for _, token in rows))
+            conn.executemany(
+                "UPDATE auto_buff SET token = ? WHERE rowid = ?",
+                [(token, rowid) for (rowid, _), token in zip(rows, tokens)],
             )
-        return auto_buffs
+            return rows[-1][0] if rows else None, len(rows)
+
+        total = 0
+        last_rowid = 0
+        while True:
+            last_rowid, count = await self.db.write(rotate_batch, last_rowid)
+            total += count
+            if last_rowid is None:
+                break
+            logger.debug(f"Перешифровано токенов: {total}")
+        return total
 
-    def update_profile(
-        self, user_id, strength, agility, endurance, level, attack, defense, luck
+    async def update_profile(
+        self, user_id, strength, agility, endurance, level, attack, defense, luck,
+        chat_id=None, name=None,
     ):
+        """
+        :param chat_id: Чат, в который прислан профиль (пользователь попадает в его рейтинги).
+        :param name: Имя игрока из профиля.
+        """
         logger.debug(f"Обновление профиля пользователя {user_id}")
         last_updated = datetime.now()
-        self.cursor.execute(
+        stats = (strength, agility, endurance, level, attack, defense, luck)
+
+        def save(conn):
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO profiles (user_id, strength, agility, endurance, level, attack, defense, luck, last_updated, name)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (user_id, *stats, last_updated, name),
+            )
+            if chat_id is not None:
+                conn.execute(
+                    "INSERT OR IGNORE INTO profile_chats (chat_id, user_id) VALUES (?, ?)",
+                    (chat_id, user_id),
+                )
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO profile_history (user_id, ts, strength, agility, endurance, level, attack, defense, luck)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+                (user_id, int(time.time()), *stats),
+            )
+            self._downsample_history(conn, user_id)
+
+        await self.db.write(save)
+
+    @staticmethod
+    def _downsample_history(conn, user_id):
+        """
+        Прореживание истории пользователя: снимки старше PROFILE_HISTORY_FULL_DAYS
+        остаются по одному на день (последний за день), старше PROFILE_HISTORY_DAYS удаляются.
+        """
+        now = int(time.time())
+        full_since = now - PROFILE_HISTORY_FULL_DAYS * DAY_SECONDS
+        conn.execute(
+            "DELETE FROM profile_history WHERE user_id = ? AND ts < ?",
+            (user_id, now - PROFILE_HISTORY_DAYS * DAY_SECONDS),
+        )
+        conn.execute(
+            """
+            DELETE FROM profile_history
+            WHERE user_id = ? AND ts < ? AND ts NOT IN (
+                SELECT MAX(ts) FROM profile_history
+                WHERE user_id = ? AND ts < ?
+                GROUP BY ts / ?
+            )
+        """,
+            (user_id, full_since, user_id, full_since, DAY_SECONDS),
+        )
+
+    async def get_chat_profiles(self, chat_id):
+        """
+        Профили пользователей, чей профиль присылали в чат.
+        :return: Список словарей с ключами user_id, name и характеристиками.
+        """
+        rows = await self.db.fetchall(
+            f"""
+            SELECT p.user_id, p.name, {", ".join("p." + stat for stat in PROFILE_STATS)}
+            FROM profile_chats pc JOIN profiles p ON p.user_id = pc.user_id
+            WHERE pc.chat_id = ?
+        """,
+            (chat_id,),
+        )
+        return [dict(zip(("user_id", "name") + PROFILE_STATS, row)) for row in rows]
+
+    async def get_profile_history(self, user_id, days=None):
+        """
+        Снимки профиля пользователя по возрастанию времени.
+        :param days: Только за последние N дней (по умолчанию вся история).
+        :return: Список словарей с ключом ts (unix-время) и характеристиками.
+        """
+        since = int(time.time()) - days * DAY_SECONDS if days else 0
+        rows = await self.db.fetchall(
             """
-            INSERT OR REPLACE INTO profiles (user_id, strength, agility, endurance, level, attack, defense, luck, last_updated)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            SELECT ts, strength, agility, endurance, level, attack, defense, luck
+            FROM profile_history WHERE user_id = ? AND ts >= ? ORDER BY ts
         """,
-            (
-                user_id,
-                strength,
-                agility,
-                endurance,
-                level,
-                attack,
-                defense,
-                luck,
-                last_updated,
-            ),
+            (user_id, since),
         )
-        self.connection.commit()
+        return [dict(zip(("ts",) + PROFILE_STATS, row)) for row in rows]
+
+    async def get_profile_change(self, user_id, days):
+        """
+        Изменение характеристик за последние N дней: последний снимок минус
+        состояние на начало периода — последний снимок не позже его начала,
+        а если такого нет, самый ранний снимок внутри периода.
+        :return: Словарь с ключами from_ts, to_ts и изменением каждой характеристики
+                 или None, если снимков меньше двух.
+        """
+        since = int(time.time()) - days * DAY_SECONDS
 
-    def get_profile(self, user_id):
+        def load(conn):
+            columns = ", ".join(PROFILE_STATS)
+            first = conn.execute(
+                f"SELECT ts, {columns} FROM profile_history WHERE user_id = ? AND ts <= ? ORDER BY ts DESC LIMIT 1",
+                (user_id, since),
+            ).fetchone()
+            if not first:
+                first = conn.execute(
+                    f"SELECT ts, {columns} FROM profile_history WHERE user_id = ? AND ts > ? ORDER BY ts LIMIT 1",
+                    (user_id, since),
+                ).fetchone()
+            last = conn.execute(
+                f"SELECT ts, {columns} FROM profile_history WHERE user_id = ? ORDER BY ts DESC LIMIT 1",
+                (user_id,),
+            ).fetchone()
+            return first, last
+
+        first, last = await self.db.read(load)
+        if not first or not last or first[0] == last[0]:
+            return None
+        change = {"from_ts": first[0], "to_ts": last[0]}
+        for index, stat in enumerate(PROFILE_STATS, start=1):
+            change[stat] = (last[index] or 0) - (first[index] or 0)
+        return change
+
+    async def get_profile_growth(self, user_id, days):
+        """
+        Средний прирост характеристик в день за последние N дней.
+        :return: Словарь {характеристика: прирост в день} или None, если данных недостаточно.
+        """
+        change = await self.get_profile_change(user_id, days)
+        if not change:
+            return None
+        # Начало периода может быть снимком до окна — прирост делится на фактический промежуток.
+        # Короткий промежуток считается за день, чтобы не экстраполировать случайные скачки
+        span_days = max(change["to_ts"] - change["from_ts"], DAY_SECONDS) / DAY_SECONDS
+        return {stat: change[stat] / span_days for stat in PROFILE_STATS}
+
+    async def get_profile(self, user_id):
         logger.debug(f"Получение профиля пользователя {user_id}")
-        self.cursor.execute(
+        result = await self.db.fetchone(
             """
             SELECT strength, agility, endurance, level, attack, defense, luck, last_updated
             FROM profiles WHERE user_id = ?
         """,
             (user_id,),
         )
-        result = self.cursor.fetchone()
         if result:
             strength, agility, endurance, level, attack, defense, luck, last_updated = (
                 result
@@ -200,46 +549,49 @@ class UserManager:
             }
         return None
 
-    def get_users_by_role_in_chat(self, role, group_chat_id):
-        self.cursor.execute(
-            """
-            SELECT user_id, buff_list, chat_id FROM auto_buff WHERE role = ? AND group_chat_id = ?
-        """,
-            (role, group_chat_id),
-        )
-        results = self.cursor.fetchall()
-        users = []
-        for row in results:
-            user_id, buff_list, chat_id = row
-            users.append(
-                {"user_id": user_id, "buff_list": buff_list, "chat_id": chat_id}
-            )
-        return users
-    
-    
+    async def get_users_by_role_in_chat(self, role, group_chat_id):
+        """
+        Баферы роли в чате из кэша составов.
+        :return: Список словарей user_id, buff_list, buff_mask, chat_id (не изменять).
+        """
+        roster = self.rosters.get(group_chat_id)
+        if roster is None:
+            roster = await self._load_roster(group_chat_id)
+        return list(roster.get(role, ()))
+
+    def get_role(self, user_id):
+        """
+        Роль пользователя из памяти или None, если пользователь неизвестен.
+        """
+        return self.roles.get(user_id)
+
     def is_admin(self, user_id):
-        self.cursor.execute("""
-            SELECT role_name FROM users WHERE user_id = ?""", (user_id,))
-        result = self.cursor.fetchone()
-        if result and result[0] == "admin":
-            return True
-        return False
-    
+        return self.roles.get(user_id) == "admin"
+
 
     def close(self):
-        # Закрытие соединения с базой данных
-        self.connection.close()
+        # Запись ожидающих пользователей и закрытие соединения с базой данных
+        if self.pending_users:
+            users, self.pending_users = self.pending_users, []
+            self.db.write_sync(
+                lambda conn: conn.executemany(
+                    "INSERT OR IGNORE INTO users (user_id, role_name) VALUES (?, ?)", users
+                )
+            )
+        self.db.close()
         logger.debug("Соединение с базой данных закрыто.")
-        
-        
 
-    def set_user_role(self, user_id, role_name):
+
+
+    async def set_user_role(self, user_id, role_name):
         """
         Устанавливает роль для пользователя в базе данных.
         :param user_id: ID пользователя.
         :param role_name: Название роли.
         """
-        self.cursor.execute(
+        # Пользователь может ещё ждать пакетной записи
+        await self.flush_users()
+        updated = await self.db.execute(
             """
             UPDATE users
             SET role_name = ?
@@ -247,5 +599,6 @@ class UserManager:
         """,
             (role_name, user_id),
         )
-        self.connection.commit()
+        if updated:
+            self.roles[user_id] = role_name
         logger.debug(f"Установлена роль '{role_name}' для пользователя {user_id}")
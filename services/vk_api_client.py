@@ -1,26 +1,44 @@
-import asyncio
-import vk_api
-from vk_api.bot_longpoll import VkBotLongPoll, VkBotEventType
-from config.settings import VK_API_TOKEN, VK_GROUP_ID
+from vk_api.bot_longpoll import VkBotEventType
+from vk_api.utils import get_random_id
+from config.settings import (
+    VK_API_TOKEN,
+    VK_GROUP_ID,
+    EVENT_WORKERS,
+    EVENT_QUEUE_SIZE,
+    EVENT_OVERFLOW_POLICY,
+    SEND_RATE_LIMIT,
+)
 from modules.auto_buff import AutoBuffManager
 from modules.notes import NoteManager
 from modules.profiles import ProfileManager
 from modules.wishes import WishManager
+from services.async_vk_api import AsyncVkApi, close_http_session
+from services.longpoll import AsyncBotLongPoll
+from services.event_dispatcher import EventDispatcher
+from services.message_sender import MessageSender
+from services.database import close_databases
+from services.command_router import CommandRouter
 from utils.logger import logger
-import concurrent.futures
+
+# ID игрового бота, чьи сообщения (профили) обрабатываются модулями
+GAME_BOT_ID = -183040898
 
 
 class VkApiClient:
     def __init__(self, dialog_manager, user_manager, chat_manager):
-        self.vk_session = vk_api.VkApi(token=VK_API_TOKEN)
-        self.vk = self.vk_session.get_api()
-        self.longpoll = VkBotLongPoll(self.vk_session, group_id=VK_GROUP_ID)
+        self.api = AsyncVkApi(VK_API_TOKEN)
+        self.sender = MessageSender(self.api, rate_limit=SEND_RATE_LIMIT)
+        self.longpoll = AsyncBotLongPoll(self.api, group_id=VK_GROUP_ID)
         self.dialog_manager = dialog_manager
         self.user_manager = user_manager
         self.chat_manager = chat_manager
-        self.executor = (
-            concurrent.futures.ThreadPoolExecutor()
-        )  # Инициализация пула потоков
+        self.dispatcher = EventDispatcher(
+            self.handle_event,
+            workers=EVENT_WORKERS,
+            queue_size=EVENT_QUEUE_SIZE,
+            overflow_policy=EVENT_OVERFLOW_POLICY,
+            is_command=self.is_command_event,
+        )
         
         # Инициализация модулей
         self.auto_buff_manager = AutoBuffManager(self.user_manager, self.chat_manager)
@@ -28,24 +46,41 @@ class VkApiClient:
         self.profile_manager = ProfileManager(self.user_manager)
         self.wish_manager = WishManager()
 
+        # Команды чатов: сначала админские, затем модули в порядке обработки
+        self.router = CommandRouter()
+        self.register_admin_commands()
+        self.auto_buff_manager.register_commands(self.router)
+        self.note_manager.register_commands(self.router)
+        self.profile_manager.register_commands(self.router, GAME_BOT_ID)
+        self.wish_manager.register_commands(self.router)
+
     async def start_listening(self):
         logger.info("Запуск прослушивания событий VK")
-        loop = (
-            asyncio.get_running_loop()
-        )  # Получаем текущий event loop в основном контексте
-
-        # Запуск синхронного longpoll.listen() в отдельном потоке
-        await loop.run_in_executor(self.executor, self._listen_and_handle_events, loop)
-
-    def _listen_and_handle_events(self, loop):
-        # Теперь передаём основной event loop и используем его
-        while True:
-            try:
-                for event in self.longpoll.listen():
-                    # Передаём event loop в run_coroutine_threadsafe
-                    asyncio.run_coroutine_threadsafe(self.handle_event(event), loop)
-            except Exception as e:
-                logger.error(f"Ошибка при обработке событий VK: {e}")
+        self.dispatcher.start()
+        self.sender.start()
+        try:
+            await self._listen_and_handle_events()
+        finally:
+            await self.dispatcher.stop()
+            await self.sender.stop()
+            await self.auto_buff_manager.scheduler.stop()
+            await self.user_manager.flush_users()
+            await close_http_session()
+            close_databases()
+
+    async def _listen_and_handle_events(self):
+        # Long poll работает прямо в event loop, отмена задачи останавливает цикл.
+        # При политике block заполненная очередь приостанавливает чтение long poll.
+        async for event in self.longpoll.listen():
+            await self.dispatcher.submit(event)
+
+    def is_command_event(self, event):
+        message = event.message
+        if not message:
+            return True
+        if message.get("peer_id", 0) < 2000000000:
+            return True
+        return self.router.is_command(message.get("text", ""), message.get("from_id"))
 
     async def handle_event(self, event):
         if event.type == VkBotEventType.MESSAGE_NEW:
@@ -54,7 +89,7 @@ class VkApiClient:
             from_id = message.get("from_id")
 
             # Обработка сообщений
-            self.user_manager.add_user(user_id=from_id)
+            await self.user_manager.add_user(user_id=from_id)
             if peer_id < 2000000000:
                 await self.handle_private_message(from_id, message)
             else:
@@ -67,11 +102,15 @@ class VkApiClient:
             if text.lower().startswith("роль") and len(text.split()) == 2 and message.get("fwd_messages", []) != []:
                 role = text.lower().split()[1]
                 target_id = message["fwd_messages"][0]["from_id"]
-                self.user_manager.set_user_role(target_id, role)
+                await self.user_manager.set_user_role(target_id, role)
                 self.send_message(
                     user_id, f"Роль пользователя {user_id} изменена на {role}"
                 )
                 return
+            if text.lower() == "обновить роли":
+                await self.user_manager.reload_roles()
+                self.send_message(user_id, "Роли пользователей перезагружены из базы")
+                return
         
         # Проверяем, есть ли активный диалог
         if user_id in self.dialog_manager.active_dialogs:
@@ -108,64 +147,81 @@ class VkApiClient:
         peer_id = message["peer_id"]
         user_id = message["from_id"]
         text = message["text"]
-        conversation_id = message["conversation_message_id"]
+
+        # Сообщения без команд отсекаются до обращения к модулям
+        if not self.router.is_command(text, user_id):
+            return
         logger.debug(f"Сообщение в чате {peer_id} от {user_id}: {text}")
-        
-        #админ-команды для чатов
-        if self.user_manager.is_admin(user_id):
+
+        is_admin = self.user_manager.is_admin(user_id)
+        if is_admin:
             logger.debug(f"Админ {user_id} в чате {peer_id}: {text}")
-            if text.lower() == '/модули':
-                self.send_message(
-                    peer_id,
-                    self.chat_manager.get_chat_settings_string(peer_id),
-                )
-            if text.lower().startswith('/добавить модуль'):
-                module_name = text.lower().split()[2]
-                self.chat_manager.enable_module(peer_id, module_name)
-                self.send_message(peer_id, self.chat_manager.get_chat_settings_string(peer_id))
-            if text.lower().startswith('/удалить модуль'):
-                module_name = text.lower().split()[2]
-                self.chat_manager.disable_module(peer_id, module_name)
-                self.send_message(peer_id, self.chat_manager.get_chat_settings_string(peer_id))
-            if text.lower().startswith('/имя'):
-                name_parts = text.split()[1:]  # Разбиваем строку и игнорируем первый элемент ('/имя')
-                name = ' '.join(name_parts) if name_parts else str(peer_id)  # Если нет имени, задаем дефолтное значение
-                # Обновляем или создаем настройки чата с новым именем
-                current_settings = self.chat_manager.get_chat_settings(peer_id) or {}
-                current_settings.update({"name": name})
-                self.chat_manager.set_chat_settings(peer_id, current_settings)
-                self.send_message(peer_id, self.chat_manager.get_chat_settings_string(peer_id))
 
-        
         # работа с модулями
-        modules = self.chat_manager.get_chat_settings(peer_id).get("modules", [])
-        if "auto_buff" in modules:
-            await self.auto_buff_manager.process_message(peer_id, conversation_id, text)
-        if "notes" in modules:
-            response = await self.note_manager.check_note_events(message)
-            if response:
-                self.send_message(peer_id, response)
-        if "profiles" in modules and user_id == -183040898:
-            response = await self.profile_manager.check_profile_events(message)
-            if response:
-                self.send_message(peer_id, response)
-        if 'wishes' in modules:
-            response = await self.wish_manager.check_wish_events(message)
-            if response:
+        modules = await self.chat_manager.get_enabled_modules(peer_id)
+        for response in await self.router.dispatch(message, modules, is_admin):
+            if isinstance(response, dict):
+                self.send_message(peer_id, response.get("text", ""), response.get("keyboard"))
+            else:
                 self.send_message(peer_id, response)
-        # Дополнительная обработка сообщений в чатах
+
+    def register_admin_commands(self):
+        #админ-команды для чатов
+        self.router.add(None, "/модули", self._command_modules, exact=True, admin=True)
+        self.router.add(None, "/добавить модуль", self._command_enable_module, admin=True)
+        self.router.add(None, "/удалить модуль", self._command_disable_module, admin=True)
+        self.router.add(None, "/метрики", self._command_metrics, exact=True, admin=True)
+        self.router.add(None, "/очередь бафов", self._command_buff_queue, exact=True, admin=True)
+        self.router.add(None, "/отменить бафы", self._command_cancel_buffs, exact=True, admin=True)
+        self.router.add(None, "/имя", self._command_chat_name, admin=True)
+
+    async def _command_modules(self, message, _):
+        return await self.chat_manager.get_chat_settings_string(message["peer_id"])
+
+    async def _command_enable_module(self, message, _):
+        peer_id = message["peer_id"]
+        module_name = message["text"].lower().split()[2]
+        await self.chat_manager.enable_module(peer_id, module_name)
+        return await self.chat_manager.get_chat_settings_string(peer_id)
+
+    async def _command_disable_module(self, message, _):
+        peer_id = message["peer_id"]
+        module_name = message["text"].lower().split()[2]
+        await self.chat_manager.disable_module(peer_id, module_name)
+        return await self.chat_manager.get_chat_settings_string(peer_id)
+
+    async def _command_metrics(self, message, _):
+        return self.dispatcher.get_metrics_string()
+
+    async def _command_buff_queue(self, message, _):
+        return self.auto_buff_manager.scheduler.get_backlog_string(message["peer_id"])
+
+    async def _command_cancel_buffs(self, message, _):
+        cancelled = self.auto_buff_manager.scheduler.cancel(message["peer_id"])
+        return f"Отменено отложенных бафов: {cancelled}"
+
+    async def _command_chat_name(self, message, _):
+        peer_id = message["peer_id"]
+        name_parts = message["text"].split()[1:]  # Разбиваем строку и игнорируем первый элемент ('/имя')
+        name = ' '.join(name_parts) if name_parts else str(peer_id)  # Если нет имени, задаем дефолтное значение
+        # Обновляем или создаем настройки чата с новым именем
+        current_settings = await self.chat_manager.get_chat_settings(peer_id) or {}
+        current_settings.update({"name": name})
+        await self.chat_manager.set_chat_settings(peer_id, current_settings)
+        return await self.chat_manager.get_chat_settings_string(peer_id)
 
     def send_message(self, peer_id, message, keyboard=None):
+        """
+        Ставит сообщение в очередь отправки, не блокируя event loop.
+        :return: Future с ID отправленного сообщения (None при ошибке);
+                 ожидать его не обязательно.
+        """
         logger.debug(f"Отправка сообщения {peer_id}: {message}")
-        try:
-            params = {
-                "peer_id": peer_id,
-                "message": message,
-                "random_id": vk_api.utils.get_random_id(),
-            }
-            if keyboard:
-                params["keyboard"] = keyboard
-            self.vk.messages.send(**params)
-        except Exception as e:
-            logger.error(f"Ошибка при отправке сообщения: {e}")
-            
+        params = {
+            "peer_id": peer_id,
+            "message": message,
+            "random_id": get_random_id(),
+        }
+        if keyboard:
+            params["keyboard"] = keyboard
+        return self.sender.send(params)
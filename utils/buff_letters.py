@@ -0,0 +1,20 @@
+# Буквы бафов апо и их битовые маски: набор бафов бафера хранится одним числом,
+# проверка «умеет ли бафер баф» — одна побитовая операция вместо поиска в строке
+BUFF_LETTERS = "азуэгдмнчо"
+
+LETTER_BITS = {letter: 1 << index for index, letter in enumerate(BUFF_LETTERS)}
+
+
+def buff_mask(buff_list):
+    """
+    Битовая маска набора бафов (неизвестные символы пропускаются).
+    :param buff_list: Строка букв бафов, например 'азу'.
+    """
+    mask = 0
+    for letter in buff_list or "":
+        mask |= LETTER_BITS.get(letter, 0)
+    return mask
+
+
+def letter_bit(letter):
+    return LETTER_BITS.get(letter, 0)
@@ -1,18 +1,29 @@
-from cryptography.fernet import Fernet
-from config.settings import ENCRYPTION_KEY
+from functools import lru_cache
+from typing import Iterable, List
+from cryptography.fernet import Fernet, MultiFernet
+from config.settings import ENCRYPTION_KEY, ENCRYPTION_OLD_KEYS
 import base64
 import hashlib
 
 
-# Генерация ключа для Fernet на основе ENCRYPTION_KEY
-def get_cipher():
+def _make_fernet(secret):
     # Преобразуем секретный ключ в 32-байтовый ключ для Fernet
-    key = hashlib.sha256(ENCRYPTION_KEY.encode()).digest()
+    key = hashlib.sha256(secret.encode()).digest()
     # Кодируем ключ в формате base64
     key = base64.urlsafe_b64encode(key)
     return Fernet(key)
 
 
+# Генерация ключа для Fernet на основе ENCRYPTION_KEY.
+# Шифр создаётся один раз: первым идёт текущий ключ (им шифруются новые данные),
+# за ним старые ключи из ENCRYPTION_OLD_KEYS (ими только расшифровываются).
+@lru_cache(maxsize=1)
+def get_cipher():
+    return MultiFernet(
+        [_make_fernet(ENCRYPTION_KEY)] + [_make_fernet(key) for key in ENCRYPTION_OLD_KEYS]
+    )
+
+
 def encrypt(plain_text):
     cipher = get_cipher()
     # Шифруем текст, преобразовав его в байты
@@ -27,3 +38,13 @@ def decrypt(encrypted_text):
     decrypted_text = cipher.decrypt(encrypted_text.encode())
     # Возвращаем исходный текст
     return decrypted_text.decode()
+
+
+def encrypt_many(plain_texts: Iterable[str]) -> List[str]:
+    cipher = get_cipher()
+    return [cipher.encrypt(text.encode()).decode() for text in plain_texts]
+
+
+def decrypt_many(encrypted_texts: Iterable[str]) -> List[str]:
+    cipher = get_cipher()
+    return [cipher.decrypt(text.encode()).decode() for text in encrypted_texts]
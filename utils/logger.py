@@ -1,4 +1,5 @@
 import logging
+import os
 from logging.handlers import RotatingFileHandler
 import sys
 from config.settings import LOGGING_LEVEL
@@ -15,7 +16,8 @@ console_handler = logging.StreamHandler(sys.stdout)
 console_handler.setLevel(LOGGING_LEVEL)
 console_handler.setFormatter(formatter)
 
-# Создание обработчика для записи в файл
+# Создание обработчика для записи в файл (директория логов в репозиторий не входит)
+os.makedirs('logs', exist_ok=True)
 file_handler = RotatingFileHandler('logs/bot.log', maxBytes=5*1024*1024, backupCount=5, encoding='utf-8')
 file_handler.setLevel(LOGGING_LEVEL)
 file_handler.setFormatter(formatter)
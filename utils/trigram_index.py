@@ -0,0 +1,73 @@
+from collections import Counter
+from heapq import nlargest
+from typing import Dict, List, Optional, Set
+
+
+def trigrams(text: str) -> Set[str]:
+    """
+    Триграммы строки; начало и конец дополняются пробелами,
+    чтобы первые и последние буквы весили больше.
+    """
+    padded = f"  {text} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class TrigramIndex:
+    """
+    Инвертированный индекс триграмм для поиска похожих строк (опечаток).
+    Похожесть — доля общих триграмм (коэффициент Жаккара); кандидаты берутся
+    только из списков триграмм запроса, без перебора всех строк.
+    """
+
+    def __init__(self):
+        # {триграмма: {ключ, ...}}
+        self.postings: Dict[str, Set[str]] = {}
+        # {ключ: (подпись для вывода, число триграмм ключа)}
+        self.keys: Dict[str, tuple] = {}
+
+    def add(self, key: str, label: Optional[str] = None):
+        """
+        :param key: Нормализованная строка, по которой ищется сходство.
+        :param label: Что возвращать в результатах (по умолчанию сам ключ).
+        """
+        if key in self.keys:
+            return
+        key_trigrams = trigrams(key)
+        self.keys[key] = (label or key, len(key_trigrams))
+        for trigram in key_trigrams:
+            self.postings.setdefault(trigram, set()).add(key)
+
+    def remove(self, key: str):
+        if self.keys.pop(key, None) is None:
+            return
+        for trigram in trigrams(key):
+            keys = self.postings.get(trigram)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self.postings[trigram]
+
+    def __len__(self):
+        return len(self.keys)
+
+    def search(self, query: str, limit: int = 3, threshold: float = 0.3) -> List[str]:
+        """
+        Ближайшие к запросу строки.
+        :param query: Нормализованный запрос.
+        :param limit: Максимальное количество результатов.
+        :param threshold: Минимальная похожесть (от 0 до 1).
+        :return: Подписи найденных строк по убыванию похожести.
+        """
+        query_trigrams = trigrams(query)
+        shared = Counter()
+        for trigram in query_trigrams:
+            keys = self.postings.get(trigram)
+            if keys:
+                shared.update(keys)
+        scored = []
+        for key, count in shared.items():
+            label, size = self.keys[key]
+            similarity = count / (len(query_trigrams) + size - count)
+            if similarity >= threshold:
+                scored.append((similarity, label))
+        return [label for _, label in nlargest(limit, scored)]